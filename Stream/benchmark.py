@@ -0,0 +1,496 @@
+import sys
+import time
+import argparse
+import logging
+import resource
+import numpy as np
+from gain import GAIN_MODES, DEFAULT_GAIN_MODE
+
+# ----------------------------
+# Default configuration
+DEFAULT_FS_IN = 20.0
+DEFAULT_TARGET_FS = 44100
+DEFAULT_BLOCK_SAMPLES = 200  # Typical SeedLink record at 20 Hz
+DEFAULT_BLOCKS = 30
+DEFAULT_PIPELINE_BLOCKS = 200
+DEFAULT_BLOCKSIZE = 2048
+DEFAULT_STATIONS = 16
+STARTUP_SCRIPTS = ("streamplayer3.py", "stationmonitor1.3.py", "statusviewer.py")
+# ----------------------------
+
+
+def synthetic_trace(n_samples, fs, seed=0):
+    """
+    Creates a band-limited test signal that looks roughly like a seismic trace.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / fs
+    data = (
+        np.sin(2 * np.pi * 0.2 * t)
+        + 0.5 * np.sin(2 * np.pi * 1.3 * t + 1.0)
+        + 0.2 * np.sin(2 * np.pi * 4.1 * t + 2.0)
+        + 0.05 * rng.standard_normal(n_samples)
+    )
+    return (data / np.max(np.abs(data))).astype(np.float32)
+
+
+def synthetic_traces(n_blocks, block_samples, fs, station="SYN"):
+    """
+    Cuts a synthetic signal into consecutive SeedLink-sized traces.
+    """
+    from obspy import Trace, UTCDateTime
+
+    data = synthetic_trace(n_blocks * block_samples, fs)
+    start = UTCDateTime(2025, 1, 1)
+    traces = []
+    for i in range(n_blocks):
+        trace = Trace((data[i * block_samples:(i + 1) * block_samples] * 1e5).astype(np.int32))
+        trace.stats.network, trace.stats.station, trace.stats.channel = "XX", station, "BHZ"
+        trace.stats.sampling_rate = fs
+        trace.stats.starttime = start + i * block_samples / fs
+        traces.append(trace)
+    return traces
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KB on Linux
+
+
+def metrics_record_cost_ns(n=100_000):
+    """Cost in ns of timing one stage (two timestamps and a record) with metrics.Metrics."""
+    from metrics import Metrics
+    m = Metrics(DEFAULT_TARGET_FS)
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        m.record("calibration", time.perf_counter_ns())
+    return (time.perf_counter_ns() - t0) / n
+
+
+def boundary_jump_ratio(blocks):
+    """
+    Compares the largest sample step across block boundaries with the largest
+    step inside blocks. About 1.0 means seamless, larger values mean clicks.
+    """
+    signal = np.concatenate(blocks)
+    steps = np.abs(np.diff(signal))
+    boundaries = np.cumsum([len(b) for b in blocks[:-1]]) - 1
+    inner = np.ones(len(steps), dtype=bool)
+    inner[boundaries] = False
+    return float(steps[boundaries].max() / steps[inner].max())
+
+
+def bench_resample(args):
+    """
+    Compares per-block resampy calls with the streaming polyphase resampler.
+    """
+    import resampy
+    from resampler import StreamingResampler
+
+    data = synthetic_trace(args.block_samples * args.blocks, args.fs_in)
+    blocks = [data[i:i + args.block_samples] for i in range(0, len(data), args.block_samples)]
+
+    # Warm up numba JIT and the polyphase table cache outside the timed region
+    resampy.resample(blocks[0], args.fs_in, args.target_fs)
+    StreamingResampler(args.fs_in, args.target_fs).process(blocks[0])
+
+    def run_resampy():
+        return [resampy.resample(b, args.fs_in, args.target_fs) for b in blocks]
+
+    def run_streaming():
+        r = StreamingResampler(args.fs_in, args.target_fs)
+        return [r.process(b) for b in blocks]
+
+    print(f"Resampling {args.blocks} blocks of {args.block_samples} samples, "
+          f"{args.fs_in} Hz -> {args.target_fs} Hz")
+    print(f"{'path':<12}{'out samples/s':>16}{'ms/block':>12}{'boundary jump':>16}")
+    for name, run in (("resampy", run_resampy), ("streaming", run_streaming)):
+        t0 = time.perf_counter()
+        out = run()
+        elapsed = time.perf_counter() - t0
+        n_out = sum(len(b) for b in out)
+        print(f"{name:<12}{n_out / elapsed:>16,.0f}{1000 * elapsed / len(blocks):>12.2f}"
+              f"{boundary_jump_ratio(out):>16.2f}")
+
+
+def bench_chain(args):
+    """
+    Compares the processing chain on native-rate samples (then resampled once)
+    with the same stages applied to the resampled block, as before.
+    """
+    from dsp import ProcessingChain, parse_chain
+    from resampler import StreamingResampler
+
+    stages = parse_chain(args.chain)
+    data = synthetic_trace(args.block_samples * args.blocks, args.fs_in) * 1e5
+    blocks = [data[i:i + args.block_samples] for i in range(0, len(data), args.block_samples)]
+
+    def run_native():
+        chain = ProcessingChain(stages, args.fs_in, args.target_fs, taper_ms=args.taper)
+        r = StreamingResampler(args.fs_in, args.target_fs)
+        dsp_time = 0.0
+        for b in blocks:
+            t0 = time.perf_counter()
+            x = chain.process(b)
+            dsp_time += time.perf_counter() - t0
+            y = r.process(x)
+            t0 = time.perf_counter()
+            chain.finish(y)
+            dsp_time += time.perf_counter() - t0
+        return dsp_time
+
+    def run_output_rate():
+        chain = ProcessingChain(stages, args.target_fs, args.target_fs, taper_ms=args.taper)
+        r = StreamingResampler(args.fs_in, args.target_fs)
+        dsp_time = 0.0
+        for b in blocks:
+            y = r.process(b)
+            t0 = time.perf_counter()
+            chain.process(y)
+            dsp_time += time.perf_counter() - t0
+        return dsp_time
+
+    run_native()  # Warm up filter design and window caches
+    print(f"Chain {','.join(stages)} (taper {args.taper} ms) on {args.blocks} blocks of "
+          f"{args.block_samples} samples, {args.fs_in} Hz -> {args.target_fs} Hz")
+    print(f"{'domain':<14}{'ms/block':>12}")
+    results = {name: run() for name, run in (("output rate", run_output_rate), ("native rate", run_native))}
+    for name, elapsed in results.items():
+        print(f"{name:<14}{1000 * elapsed / len(blocks):>12.3f}")
+    print(f"speed-up      {results['output rate'] / results['native rate']:>12.1f}x")
+
+
+def bench_pipeline(args):
+    """
+    Runs the processing chain of streamplayer3 (normalize -> resample -> taper ->
+    queue into the playback ring buffer) on replayed miniSEED or synthetic traces,
+    and reports blocks/s, per-block latency and peak RSS.
+    """
+    import streamplayer3 as player
+    from replay import load_traces, replay_traces
+    from ringbuffer import AudioRingBuffer
+
+    logging.getLogger().setLevel(logging.WARNING)  # Per-block log lines would dominate the timing
+    if args.metrics:
+        from metrics import Metrics
+        player.metrics = Metrics(args.target_fs)
+    if args.replay:
+        traces = load_traces(args.replay)
+    else:
+        traces = synthetic_traces(args.blocks, args.block_samples, args.fs_in)
+    if not traces:
+        print("No traces to replay.")
+        return
+
+    max_frames = max(len(tr.data) for tr in traces) * int(np.ceil(args.target_fs / min(tr.stats.sampling_rate for tr in traces)))
+    ring = AudioRingBuffer(2 * max_frames + args.blocksize)
+    out = np.zeros((args.blocksize, 1), dtype=np.float32)
+    buffers = {}
+    clients = {}
+    for trace in traces:
+        if trace.id not in clients:
+            buffers[trace.id] = player.BlockBuffer(4)
+            clients[trace.id] = player.WavDumpClient(
+                target_fs=args.target_fs, max_wav_files=0, block_delay=0, taper_ms=args.taper,
+                block_buffer=buffers[trace.id], resampler=args.resampler, gain=args.gain,
+                chain=args.chain,
+            )
+
+    latencies = []
+    produced = [0]
+
+    def handle(trace):
+        t0 = time.perf_counter()
+        clients[trace.id].on_data(trace)
+        block = buffers[trace.id].get(timeout=0)
+        if block is not None:
+            ring.write_all(block)
+            produced[0] += len(block)
+        latencies.append(time.perf_counter() - t0)
+        while ring.available():  # Null sink: drain outside the measured latency
+            ring.read_into(out)
+
+    t0 = time.perf_counter()
+    replay_traces(traces, {trace_id: handle for trace_id in clients}, args.pace)
+    elapsed = time.perf_counter() - t0
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"Pipeline: {len(latencies)} blocks from {len(clients)} stream(s), resampler={args.resampler}, gain={args.gain}, "
+          f"taper={args.taper} ms, pace={args.pace}")
+    print(f"  blocks/s            {len(latencies) / elapsed:12.1f}")
+    print(f"  audio x real time   {produced[0] / args.target_fs / elapsed:12.1f}")
+    print(f"  latency mean (ms)   {lat_ms.mean():12.2f}")
+    print(f"  latency p50 (ms)    {np.percentile(lat_ms, 50):12.2f}")
+    print(f"  latency p99 (ms)    {np.percentile(lat_ms, 99):12.2f}")
+    print(f"  latency max (ms)    {lat_ms.max():12.2f}")
+    print(f"  peak RSS (MB)       {peak_rss_mb():12.1f}")
+    if player.metrics is not None:
+        stages = player.metrics.summary()['stages']
+        for name, figures in stages.items():
+            print(f"  {name:<12} p50 {figures['p50_ms']:8.3f} ms  p99 {figures['p99_ms']:8.3f} ms")
+        # Run-to-run noise is larger than the timers' cost, so it is computed rather than compared
+        records = sum(figures['count'] for figures in stages.values())
+        cost_ns = metrics_record_cost_ns()
+        print(f"  metrics overhead    {100 * records * cost_ns / 1e9 / elapsed:11.2f}%  "
+              f"({records} records x {cost_ns / 1000:.2f} us)")
+
+
+def bench_workers(args):
+    """
+    Processes the blocks of many stations (chain, resampling) once in one thread
+    per station and then with a DSP pool of 1, 2, 4, ... worker processes, and
+    reports the throughput of each.
+    """
+    import os
+    import threading
+    from dsp import BlockProcessor, parse_chain
+    from dsp_pool import DspPool
+
+    logging.getLogger().setLevel(logging.WARNING)
+    config = {'target_fs': args.target_fs, 'stages': parse_chain(args.chain), 'gain': DEFAULT_GAIN_MODE,
+              'taper_ms': 0, 'bandpass': (0.5, 8.0), 'resampler': "streaming"}
+    stations = [synthetic_traces(args.blocks, args.block_samples, args.fs_in, station=f"S{i:03d}")
+                for i in range(args.stations)]
+    n_blocks = args.stations * args.blocks
+    max_workers = args.max_workers or os.cpu_count()
+    print(f"Workers: {args.stations} stations x {args.blocks} blocks of {args.block_samples} samples "
+          f"@ {args.fs_in:g} Hz -> {args.target_fs} Hz, chain={args.chain}, {os.cpu_count()} CPU(s)")
+
+    def threads():
+        def run(traces):
+            processor = BlockProcessor(**config)
+            for trace in traces:
+                processor.process(trace.id, trace.stats.sampling_rate, trace.stats.starttime, trace.data)
+        workers = [threading.Thread(target=run, args=(traces,)) for traces in stations]
+        t0 = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return time.perf_counter() - t0
+
+    def pool(n):
+        dsp_pool = DspPool(n, config)
+        lanes = [dsp_pool.lane() for _ in stations]
+        order_ok = [True]
+        last = {}
+
+        def done(data, starttime, key):
+            if key in last and starttime <= last[key]:
+                order_ok[0] = False
+            last[key] = starttime
+
+        # Warm up the workers (imports, filter design) outside the timing
+        for lane, traces in zip(lanes, stations):
+            tr = traces[0]
+            dsp_pool.submit(lane, "warmup", tr.stats.sampling_rate, tr.stats.starttime, tr.data, False, lambda *a: None)
+        dsp_pool.join()
+        t0 = time.perf_counter()
+        for i in range(args.blocks):
+            for lane, traces in zip(lanes, stations):
+                tr = traces[i]
+                dsp_pool.submit(lane, tr.id, tr.stats.sampling_rate, tr.stats.starttime, tr.data, False,
+                                lambda data, starttime, key=tr.id: done(data, starttime, key))
+        dsp_pool.join()
+        elapsed = time.perf_counter() - t0
+        dsp_pool.close()
+        return elapsed, order_ok[0]
+
+    elapsed = threads()
+    baseline = n_blocks / elapsed
+    print(f"  {'threads':<10} {baseline:10.1f} blocks/s   1.00x")
+    n = 1
+    while n <= max_workers:
+        elapsed, order_ok = pool(n)
+        rate = n_blocks / elapsed
+        print(f"  {f'{n} worker(s)':<10} {rate:10.1f} blocks/s {rate / baseline:6.2f}x"
+              f"{'' if order_ok else '   (ORDER VIOLATED)'}")
+        n *= 2
+
+
+def bench_features(args):
+    """
+    Computes the control features of many stations in one batched pass and one
+    station at a time, and reports the time per update.
+    """
+    from features import FeatureExtractor
+
+    extractor = FeatureExtractor()
+    rng = np.random.default_rng(0)
+    for i in range(args.stations):
+        extractor.push(f"{i:03d}", args.fs_in, rng.standard_normal(int(extractor.lta_s * args.fs_in)))
+    group = extractor.groups[args.fs_in]
+    ids, x, seen = group.windows(extractor.clock())
+
+    def batched():
+        extractor.compute()
+
+    def per_station():
+        for i, sid in enumerate(ids):
+            extractor.compute_group(args.fs_in, [sid], x[i:i + 1], seen[i:i + 1])
+
+    print(f"Features: {args.stations} stations @ {args.fs_in:g} Hz, {x.shape[1]} samples of history each")
+    for name, fn in (("batched", batched), ("per station", per_station)):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        ms = (time.perf_counter() - t0) / args.repeat * 1000
+        print(f"  {name:<12} {ms:10.3f} ms per update")
+
+
+def bench_timeshift(args):
+    """
+    Renders the last hours of a synthetic station at a speed factor, cold and from
+    the cache, and compares it with resampling the same data block by block at 1x.
+    """
+    from obspy import UTCDateTime
+    from dsp import BlockProcessor, parse_chain
+    from timeshift import TimeShiftRenderer
+
+    seconds = args.hours * 3600
+    n = int(seconds * args.fs_in)
+    data = synthetic_trace(n, args.fs_in)
+    renderer = TimeShiftRenderer(args.target_fs, seconds, args.speed)
+    start = UTCDateTime(2024, 1, 1)
+    for i in range(0, n, args.block_samples):
+        renderer.push("bench", "XX.BENCH..BHZ", args.fs_in, start + i / args.fs_in, data[i:i + args.block_samples])
+    renderer.warm_up()
+    history = renderer.histories["bench"]
+
+    print(f"Time-shift: {args.hours:g} h @ {args.fs_in:g} Hz ({history.data.nbytes / 1e6:.1f} MB history) "
+          f"at {args.speed:g}x -> {args.target_fs} Hz")
+    t0 = time.perf_counter()
+    audio = renderer.render("bench")
+    print(f"  {'render':<12} {(time.perf_counter() - t0) * 1000:10.1f} ms   {len(audio) / args.target_fs:.1f}s of audio")
+    t0 = time.perf_counter()
+    renderer.render("bench")
+    print(f"  {'cached':<12} {(time.perf_counter() - t0) * 1000:10.3f} ms")
+
+    processor = BlockProcessor(args.target_fs, parse_chain("gain"))
+    t0 = time.perf_counter()
+    for i in range(0, n, args.block_samples):
+        processor.process("bench", args.fs_in, start + i / args.fs_in, data[i:i + args.block_samples])
+    print(f"  {'blocks at 1x':<12} {(time.perf_counter() - t0) * 1000:10.1f} ms   {seconds:.0f}s of audio")
+
+
+def bench_startup(args):
+    """
+    Measures how long the scripts take to start (imports and argument parsing, all
+    that happens before they connect), lists their slowest imports, and times the
+    player's warm-up with an empty and a filled kernel cache.
+    """
+    import os
+    import subprocess
+    import tempfile
+    import statistics
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"Startup: {args.repeat} runs per script (--help)")
+    for script in STARTUP_SCRIPTS:
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, script, "--help"], cwd=here, stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - t0)
+        print(f"  {script:<22} median {statistics.median(times):6.2f}s   min {min(times):6.2f}s")
+        if args.imports:
+            out = subprocess.run([sys.executable, "-X", "importtime", script, "--help"], cwd=here,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+            top = []
+            for line in out.splitlines():
+                fields = line.split("|")
+                if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2][1:].startswith(" "):
+                    top.append((int(fields[1]), fields[2].strip()))  # Top-level imports only
+            for us, name in sorted(top, reverse=True)[:args.imports]:
+                print(f"      {name:<30} {us / 1e6:6.2f}s")
+
+    code = ("import sys; from dsp import warm_up, parse_chain; "
+            "print(warm_up({'target_fs': %d, 'stages': parse_chain(%r), 'resampler': sys.argv[1]}, [%r]))"
+            % (args.target_fs, args.chain, args.fs_in))
+    print(f"Warm-up: chain={args.chain}, {args.fs_in:g} Hz -> {args.target_fs} Hz (new process each)")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+        for resampler, label in (("streaming", ""), ("resampy", "empty cache"), ("resampy", "cached")):
+            out = subprocess.run([sys.executable, "-c", code, resampler], cwd=here, env=env,
+                                 stdout=subprocess.PIPE, text=True, check=True).stdout
+            print(f"  {resampler:<10} {label:<12} {float(out.split()[-1]):6.2f}s")
+
+
+def main():
+    """
+    Main function of the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks for the stream processing pipeline")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p = sub.add_parser("resample", help="Per-block resampy vs. streaming resampler")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Input sampling rate")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.add_argument("--block-samples", type=int, default=DEFAULT_BLOCK_SAMPLES, help="Samples per input block")
+    p.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help="Number of blocks")
+    p.set_defaults(func=bench_resample)
+
+    p = sub.add_parser("chain", help="Processing chain at the native rate vs. at the output rate")
+    p.add_argument("--chain", type=str, default="detrend,bandpass,gain,taper", help="Stages to run")
+    p.add_argument("--taper", type=int, default=50, help="Taper duration in milliseconds")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Input sampling rate")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.add_argument("--block-samples", type=int, default=DEFAULT_BLOCK_SAMPLES, help="Samples per input block")
+    p.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help="Number of blocks")
+    p.set_defaults(func=bench_chain)
+
+    p = sub.add_parser("pipeline", help="Replay through the streamplayer3 processing chain")
+    p.add_argument("--replay", nargs="+", default=None, help="miniSEED files to replay (default: synthetic traces)")
+    p.add_argument("--pace", choices=["realtime", "fast"], default="fast", help="Replay pacing")
+    p.add_argument("--resampler", choices=["streaming", "resampy"], default="streaming", help="Resampler to use")
+    p.add_argument("--taper", type=int, default=0, help="Taper duration in milliseconds")
+    p.add_argument("--gain", choices=GAIN_MODES, default=DEFAULT_GAIN_MODE, help="Gain mode")
+    p.add_argument("--chain", type=str, default="gain,taper", help="Processing stages")
+    p.add_argument("--metrics", action="store_true", help="Enable the per-stage timers (to measure their overhead)")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Sampling rate of synthetic traces")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.add_argument("--block-samples", type=int, default=DEFAULT_BLOCK_SAMPLES, help="Samples per synthetic trace")
+    p.add_argument("--blocks", type=int, default=DEFAULT_PIPELINE_BLOCKS, help="Number of synthetic traces")
+    p.add_argument("--blocksize", type=int, default=DEFAULT_BLOCKSIZE, help="Audio block size of the null sink")
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("workers", help="Throughput of the DSP worker pool vs. number of workers")
+    p.add_argument("--stations", type=int, default=DEFAULT_STATIONS, help="Number of stations")
+    p.add_argument("--max-workers", type=int, default=None, help="Largest pool to try (default: number of CPUs)")
+    p.add_argument("--chain", type=str, default="detrend,bandpass,gain,taper", help="Processing stages")
+    p.add_argument("--fs-in", type=float, default=100.0, help="Input sampling rate")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.add_argument("--block-samples", type=int, default=500, help="Samples per input block")
+    p.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help="Blocks per station")
+    p.set_defaults(func=bench_workers)
+
+    p = sub.add_parser("features", help="Batched vs. per-station feature extraction")
+    p.add_argument("--stations", type=int, default=64, help="Number of stations")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Native sampling rate")
+    p.add_argument("--repeat", type=int, default=50, help="Updates to time")
+    p.set_defaults(func=bench_features)
+
+    p = sub.add_parser("timeshift", help="Time-compressed render vs. block-by-block resampling at 1x")
+    p.add_argument("--hours", type=float, default=1.0, help="Hours of history to render")
+    p.add_argument("--speed", type=float, default=60.0, help="Speed factor")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Native sampling rate")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.add_argument("--block-samples", type=int, default=DEFAULT_BLOCK_SAMPLES, help="Samples per SeedLink record")
+    p.set_defaults(func=bench_timeshift)
+
+    p = sub.add_parser("startup", help="Start-up time of the scripts and the warm-up")
+    p.add_argument("--repeat", type=int, default=5, help="Runs per script")
+    p.add_argument("--imports", type=int, default=5, help="Slowest top-level imports to list per script (0 = none)")
+    p.add_argument("--chain", type=str, default="detrend,bandpass,gain,taper", help="Processing stages to warm up")
+    p.add_argument("--fs-in", type=float, default=DEFAULT_FS_IN, help="Native sampling rate to warm up")
+    p.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate")
+    p.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
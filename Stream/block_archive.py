@@ -0,0 +1,219 @@
+import os
+import glob
+import json
+import argparse
+import logging
+import numpy as np
+from obspy import UTCDateTime
+
+# ----------------------------
+# Default configuration
+DEFAULT_SEGMENT_SECONDS = 600  # Audio per segment file (float32: 106 MB at 44.1 kHz)
+DEFAULT_MAX_SEGMENTS = 12  # Segments kept per stream (0 = keep all); 2 hours, 1.3 GB per station at 44.1 kHz
+GAP_TOLERANCE_SECONDS = 0.01  # Start time deviation that still counts as continuous
+META_FILE = "archive.json"
+# ----------------------------
+
+# One sidecar index entry per block
+INDEX_DTYPE = np.dtype([
+    ("block_id", "<i8"),  # Running block number within the stream
+    ("start_ns", "<i8"),  # UTC start of the block, nanoseconds since 1970
+    ("offset", "<i8"),  # Sample offset within the segment
+    ("length", "<i8"),  # Number of samples
+    ("gap", "u1"),  # 1 if the block is silence for missing data or does not continue the previous one
+])
+
+
+def segment_paths(directory, number):
+    """Returns the data and index file paths of a segment."""
+    base = os.path.join(directory, f"segment_{number:06d}")
+    return base + ".f32", base + ".idx"
+
+
+class SegmentArchiveWriter:
+    """
+    Appends the blocks of one stream to large preallocated float32 segment files.
+
+    Each segment (segment_NNNNNN.f32) is raw float32 audio, preallocated for
+    `segment_seconds` and filled front to back. Next to it, segment_NNNNNN.idx
+    holds one INDEX_DTYPE entry per block. Only the oldest segments beyond
+    `max_segments` are deleted. When an existing archive is opened, segment and
+    block numbers continue after its last entries, so block ids stay unique
+    across restarts.
+    """
+
+    def __init__(self, directory, sample_rate, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                 max_segments=DEFAULT_MAX_SEGMENTS):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.segment_frames = int(segment_seconds * sample_rate)
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"sample_rate": sample_rate, "dtype": "float32", "segment_frames": self.segment_frames}, f)
+
+        existing = sorted(glob.glob(os.path.join(directory, "segment_*.f32")))
+        self.segment = int(os.path.basename(existing[-1])[8:14]) if existing else -1
+        self.block_id = 0
+        self.data = None
+        self.index_file = None
+        self.offset = 0
+        self.expected_start_ns = None
+        last = self.last_entry()
+        if last is not None:
+            self.block_id = int(last["block_id"]) + 1
+            self.expected_start_ns = int(last["start_ns"]) + int(round(int(last["length"]) * 1e9 / sample_rate))
+
+    def last_entry(self):
+        """Returns the newest index entry already in the archive, or None if there is none."""
+        for index_path in sorted(glob.glob(os.path.join(self.directory, "segment_*.idx")), reverse=True):
+            entries = np.fromfile(index_path, dtype=INDEX_DTYPE)
+            if len(entries):
+                return entries[-1]
+        return None
+
+    def open_segment(self, min_frames):
+        """Closes the current segment and starts the next one."""
+        self.close()
+        self.segment += 1
+        data_path, index_path = segment_paths(self.directory, self.segment)
+        frames = max(self.segment_frames, min_frames)
+        self.data = np.memmap(data_path, dtype=np.float32, mode="w+", shape=(frames,))
+        self.index_file = open(index_path, "ab")
+        self.offset = 0
+        if self.max_segments:
+            old = self.segment - self.max_segments
+            for path in segment_paths(self.directory, old):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def append(self, data, starttime, gap=None):
+        """
+        Appends one block.
+
+        Args:
+            data (np.ndarray): 1-D float32 samples at the archive's sample rate.
+            starttime (UTCDateTime): UTC time of the first sample.
+            gap (bool): Whether the block stands in for missing data. If None, it is
+                derived from the start time (the block does not continue the previous one).
+        """
+        n = len(data)
+        if self.data is None or self.offset + n > len(self.data):
+            self.open_segment(n)
+        self.data[self.offset:self.offset + n] = data
+
+        start_ns = UTCDateTime(starttime).ns
+        if gap is None:
+            gap = (self.expected_start_ns is not None
+                   and abs(start_ns - self.expected_start_ns) > GAP_TOLERANCE_SECONDS * 1e9)
+        entry = np.array([(self.block_id, start_ns, self.offset, n, gap)], dtype=INDEX_DTYPE)
+        self.index_file.write(entry.tobytes())
+        self.index_file.flush()
+
+        self.expected_start_ns = start_ns + int(round(n * 1e9 / self.sample_rate))
+        self.offset += n
+        self.block_id += 1
+
+    def close(self):
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+
+class SegmentArchiveReader:
+    """
+    Random access to a segment archive by time, through memory-mapped segments.
+
+    Slices are views into the memory maps, so nothing is copied until the caller
+    does so. Call refresh() to pick up blocks written since the last call.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.sample_rate = json.load(f)["sample_rate"]
+        self.maps = {}
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the sidecar indexes of all segments."""
+        entries, segments = [], []
+        for index_path in sorted(glob.glob(os.path.join(self.directory, "segment_*.idx"))):
+            entry = np.fromfile(index_path, dtype=INDEX_DTYPE)
+            entries.append(entry)
+            segments.append(np.full(len(entry), int(os.path.basename(index_path)[8:14])))
+        self.index = np.concatenate(entries) if entries else np.zeros(0, dtype=INDEX_DTYPE)
+        self.segments = np.concatenate(segments) if segments else np.zeros(0, dtype=np.int64)
+        self.end_ns = self.index["start_ns"] + np.round(self.index["length"] * 1e9 / self.sample_rate).astype(np.int64)
+        self.maps = {n: m for n, m in self.maps.items() if n in set(self.segments.tolist())}
+
+    def segment(self, number):
+        """Memory-maps a segment (read-only, once)."""
+        if number not in self.maps:
+            data_path, _ = segment_paths(self.directory, number)
+            self.maps[number] = np.memmap(data_path, dtype=np.float32, mode="r")
+        return self.maps[number]
+
+    def time_range(self):
+        """Returns the first and last time covered by the archive, or None if it is empty."""
+        if not len(self.index):
+            return None
+        return UTCDateTime(ns=int(self.index["start_ns"].min())), UTCDateTime(ns=int(self.end_ns.max()))
+
+    def slices(self, starttime, endtime):
+        """
+        Returns (start time, samples) for every block overlapping [starttime, endtime),
+        cut to the range. The samples are zero-copy views into the segments.
+        """
+        t0, t1 = UTCDateTime(starttime).ns, UTCDateTime(endtime).ns
+        result = []
+        for i in np.nonzero((self.index["start_ns"] < t1) & (self.end_ns > t0))[0]:
+            entry = self.index[i]
+            first = max(0, int(np.ceil((t0 - entry["start_ns"]) * self.sample_rate / 1e9)))
+            last = min(int(entry["length"]), int(np.ceil((t1 - entry["start_ns"]) * self.sample_rate / 1e9)))
+            if last <= first:
+                continue
+            offset = int(entry["offset"])
+            view = self.segment(int(self.segments[i]))[offset + first:offset + last]
+            start = UTCDateTime(ns=int(entry["start_ns"]) + int(round(first * 1e9 / self.sample_rate)))
+            result.append((start, view))
+        return result
+
+    def read(self, starttime, endtime):
+        """
+        Returns the samples of [starttime, endtime) as one array, with silence where
+        the archive has no data.
+        """
+        t0 = UTCDateTime(starttime)
+        n = int(round((UTCDateTime(endtime) - t0) * self.sample_rate))
+        out = np.zeros(max(n, 0), dtype=np.float32)
+        for start, view in self.slices(starttime, endtime):
+            pos = int(round((start - t0) * self.sample_rate))
+            k = min(len(view), n - pos)
+            if k > 0:
+                out[pos:pos + k] = view[:k]
+        return out
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Inspect a segment archive or export a time range to WAV")
+    parser.add_argument("directory", help="Archive directory of one stream (e.g. archive/01)")
+    parser.add_argument("--export", nargs=3, metavar=("START", "END", "WAV_FILE"), help="Export a UTC time range to a WAV file")
+    args = parser.parse_args()
+
+    reader = SegmentArchiveReader(args.directory)
+    span = reader.time_range()
+    if span is None:
+        print("📭 Archive is empty")
+    elif args.export:
+        import soundfile as sf
+        start, end, wav_file = args.export
+        sf.write(wav_file, reader.read(start, end), samplerate=int(reader.sample_rate), subtype="FLOAT")
+        logging.info(f"💾 Exported {start} - {end} to {wav_file}")
+    else:
+        print(f"📼 {len(reader.index)} blocks, {int(reader.index['gap'].sum())} gaps, "
+              f"{span[0]} - {span[1]} @ {reader.sample_rate} Hz")
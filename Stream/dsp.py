@@ -0,0 +1,340 @@
+import os
+import time
+import logging
+from functools import lru_cache
+import numpy as np
+from gain import GainControl, DEFAULT_GAIN_MODE
+from resampler import StreamingResampler
+from lazy_import import LazyModule
+
+# ----------------------------
+# Default configuration
+CHAIN_STAGES = ("detrend", "bandpass", "gain", "taper")
+DEFAULT_CHAIN = "gain,taper"
+DEFAULT_DETREND_SECONDS = 60.0  # Time constant of the running offset estimate
+DEFAULT_BANDPASS = (0.5, 8.0)  # Hz
+DEFAULT_BANDPASS_ORDER = 4
+DEFAULT_RESAMPLER = "streaming"  # "streaming" (stateful polyphase) or "resampy" (per block)
+WARMUP_SAMPLE_RATES = (20.0, 40.0, 50.0, 100.0)  # Common broadband rates, warmed up before the first record arrives
+WARMUP_SECONDS = 10.0  # Length of the noise block run through the chain per rate
+KERNEL_CACHE_DIR = "kernel_cache"  # Compiled resampy (numba) kernels, kept between runs
+# ----------------------------
+
+
+def load_resampy():
+    """
+    Imports resampy with numba's disk cache enabled for its kernels. resampy does
+    not ask numba to cache them, so without this every run compiles them again on
+    its first resample call (about 1-2 s). With the cache, only the very first run
+    on a machine compiles; later runs load the kernels from KERNEL_CACHE_DIR.
+    """
+    os.environ.setdefault("NUMBA_CACHE_DIR", os.path.abspath(KERNEL_CACHE_DIR))  # Read when numba is imported
+    import resampy
+    from resampy import interpn
+    try:
+        for kernel in (interpn._resample_loop_s, interpn._resample_loop_p):
+            kernel.enable_caching()
+        for gufunc in (interpn.resample_f_s, interpn.resample_f_p):
+            gufunc.gufunc_builder.cache = True
+            gufunc.gufunc_builder.nb_func.enable_caching()
+    except AttributeError as e:  # Internals of another resampy or numba version
+        logging.debug(f"resampy kernels are not cached: {e}")
+    return resampy
+
+
+# Heavy imports, only loaded when a stage or resampler needs them
+signal = LazyModule("scipy.signal")
+resampy = LazyModule("resampy", load_resampy)
+
+
+def parse_chain(value):
+    """
+    Parses a comma-separated list of stages (e.g. "detrend,bandpass,gain,taper").
+    """
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    for stage in stages:
+        if stage not in CHAIN_STAGES:
+            raise ValueError(f"Unknown processing stage {stage!r}, expected some of {CHAIN_STAGES}")
+    return stages
+
+
+@lru_cache(maxsize=32)
+def hann_edges(taper_len):
+    """
+    Fade-in and fade-out halves of a Hann window, computed once per length.
+    """
+    window = np.hanning(taper_len * 2).astype(np.float32)
+    fade_in, fade_out = window[:taper_len], window[taper_len:]
+    fade_in.flags.writeable = False
+    fade_out.flags.writeable = False
+    return fade_in, fade_out
+
+
+class Detrend:
+    """
+    Removes the slowly varying offset of a stream. The offset is tracked across
+    blocks (exponential average with time constant `seconds`) and subtracted as a
+    ramp, so consecutive blocks stay continuous.
+    """
+
+    def __init__(self, sample_rate, seconds=DEFAULT_DETREND_SECONDS):
+        self.sample_rate = sample_rate
+        self.seconds = seconds
+        self.offset = None
+
+    def reset(self):
+        self.offset = None
+
+    def process(self, data):
+        mean = float(np.mean(data))
+        if self.offset is None:
+            previous = self.offset = mean
+        else:
+            previous = self.offset
+            self.offset += (1.0 - np.exp(-len(data) / self.sample_rate / self.seconds)) * (mean - self.offset)
+        if previous == self.offset:
+            data -= self.offset
+        else:
+            data -= np.linspace(previous, self.offset, len(data) + 1, dtype=np.float32)[1:]
+        return data
+
+
+class Bandpass:
+    """
+    Butterworth band-pass (second-order sections) whose filter state is carried
+    from block to block. Falls back to a high-pass if `fmax` is at or above Nyquist.
+    """
+
+    def __init__(self, sample_rate, fmin=DEFAULT_BANDPASS[0], fmax=DEFAULT_BANDPASS[1], order=DEFAULT_BANDPASS_ORDER):
+        if fmax < sample_rate / 2:
+            self.sos = signal.butter(order, [fmin, fmax], btype="bandpass", fs=sample_rate, output="sos")
+        else:
+            logging.warning(f"⚠️ Band-pass upper corner {fmax} Hz is above Nyquist ({sample_rate / 2} Hz), using a high-pass")
+            self.sos = signal.butter(order, fmin, btype="highpass", fs=sample_rate, output="sos")
+        self.zi_unit = signal.sosfilt_zi(self.sos)
+        self.zi = None
+
+    def reset(self):
+        self.zi = None
+
+    def process(self, data):
+        if self.zi is None:
+            self.zi = self.zi_unit * data[0]  # Start in steady state instead of ringing
+        data[:], self.zi = signal.sosfilt(self.sos, data, zi=self.zi)
+        return data
+
+
+class Taper:
+    """
+    Applies a Hann fade-in and fade-out of `taper_ms` to each block, in place.
+    """
+
+    def __init__(self, sample_rate, taper_ms):
+        self.taper_len = int(sample_rate * taper_ms / 1000)
+
+    def reset(self):
+        pass
+
+    def process(self, data):
+        n = self.taper_len
+        if n == 0 or n * 2 >= len(data):
+            return data
+        fade_in, fade_out = hann_edges(n)
+        data[:n] *= fade_in
+        data[-n:] *= fade_out
+        return data
+
+
+class ProcessingChain:
+    """
+    Runs the processing stages of one stream on native-rate samples, in a buffer
+    that is allocated once and only grows for longer blocks.
+
+    The taper is the exception: if it is shorter than two native samples (a few ms
+    at 20 Hz), it has no effect at the native rate and is applied to the resampled
+    block instead, through finish(). It only touches the edge samples either way.
+
+    Args:
+        stages (list): Stage names in order, see CHAIN_STAGES.
+        fs_in (float): Native sample rate.
+        fs_out (float): Output sample rate (for the taper fallback).
+        gain (str): Mode of the gain stage, see gain.GAIN_MODES.
+        taper_ms (int): Taper duration in milliseconds.
+        bandpass (tuple): Corner frequencies in Hz.
+        metrics (metrics.Metrics): If set, every stage is timed.
+    """
+
+    def __init__(self, stages, fs_in, fs_out, gain=DEFAULT_GAIN_MODE, taper_ms=0, bandpass=DEFAULT_BANDPASS,
+                 metrics=None):
+        self.sample_rate = fs_in
+        self.metrics = metrics
+        self.stages = []
+        self.stage_names = []
+        self.output_stages = []
+        for name in stages:
+            if name == "detrend":
+                self.stages.append(Detrend(fs_in))
+            elif name == "bandpass":
+                self.stages.append(Bandpass(fs_in, *bandpass))
+            elif name == "gain":
+                self.stages.append(GainControl(gain, fs_in))
+                name = "normalize"
+            elif name == "taper" and taper_ms > 0:
+                taper = Taper(fs_in, taper_ms)
+                if taper.taper_len >= 2:
+                    self.stages.append(taper)
+                else:
+                    self.output_stages.append(Taper(fs_out, taper_ms))
+                    continue
+            else:
+                continue
+            self.stage_names.append(name)
+        self.buffer = np.zeros(0, dtype=np.float32)
+
+    def reset(self):
+        """Forgets the filter state, e.g. after a gap in the stream (the gain level is kept)."""
+        for stage in self.stages:
+            if not isinstance(stage, GainControl):
+                stage.reset()
+
+    def process(self, samples):
+        """
+        Converts one block to float32 and runs the native-rate stages on it.
+
+        Returns:
+            np.ndarray: A view into the chain's buffer, valid until the next call.
+        """
+        n = len(samples)
+        if n > len(self.buffer):
+            self.buffer = np.zeros(n, dtype=np.float32)
+        data = self.buffer[:n]
+        np.copyto(data, samples, casting="unsafe")
+        if n == 0:
+            return data
+        if self.metrics is None:
+            for stage in self.stages:
+                data = stage.process(data)
+            return data
+        for stage, name in zip(self.stages, self.stage_names):
+            t0 = time.perf_counter_ns()
+            data = stage.process(data)
+            self.metrics.record(name, t0)
+        return data
+
+    def finish(self, data):
+        """Runs the output-rate stages (if any) on a resampled block, in place."""
+        for stage in self.output_stages:
+            t0 = time.perf_counter_ns() if self.metrics is not None else 0
+            data = stage.process(data)
+            if self.metrics is not None:
+                self.metrics.record("taper", t0)
+        return data
+
+
+class BlockProcessor:
+    """
+    The DSP of one station: runs every block of a stream through its processing
+    chain at the native rate, resamples it once to the output rate and applies the
+    output-rate stages. Chain and resampler state are kept per stream and reset
+    when a block does not continue where the previous one ended.
+
+    Used by the player directly, or inside a worker process of dsp_pool.DspPool.
+
+    Args:
+        target_fs (int): Output sample rate.
+        stages (list): Stage names, see CHAIN_STAGES.
+        gain (str): Mode of the gain stage.
+        taper_ms (int): Taper duration in milliseconds.
+        bandpass (tuple): Corner frequencies in Hz.
+        resampler (str): "streaming" or "resampy".
+        metrics (metrics.Metrics): If set, the chain stages and the resampler are timed.
+    """
+
+    def __init__(self, target_fs, stages, gain=DEFAULT_GAIN_MODE, taper_ms=0, bandpass=DEFAULT_BANDPASS,
+                 resampler=DEFAULT_RESAMPLER, metrics=None):
+        self.target_fs = target_fs
+        self.stages = stages
+        self.gain = gain
+        self.taper_ms = taper_ms
+        self.bandpass = bandpass
+        self.resampler = resampler
+        self.metrics = metrics
+        self.chains = {}  # Stream key -> ProcessingChain
+        self.resamplers = {}  # Stream key -> StreamingResampler
+        self.next_start = {}  # Stream key -> expected start time of the next block
+
+    def process(self, key, fs_in, starttime, samples, gap=False):
+        """
+        Processes one block of stream `key`. Gap blocks are silence and skip the chain.
+
+        Returns:
+            tuple: (float32 block at target_fs, time of its first sample), where the
+            time accounts for the delay of the streaming resampler.
+        """
+        chain = self.chains.get(key)
+        if chain is None or chain.sample_rate != fs_in:
+            chain = self.chains[key] = ProcessingChain(
+                self.stages, fs_in, self.target_fs, self.gain, self.taper_ms, self.bandpass, self.metrics
+            )
+            self.resamplers.pop(key, None)
+        else:
+            expected = self.next_start.get(key)
+            if expected is not None and abs(starttime - expected) > 0.5 / fs_in:
+                logging.info(f"🔀 {key} does not continue the previous trace, resetting filters")
+                chain.reset()
+                if key in self.resamplers:
+                    self.resamplers[key].reset()
+        self.next_start[key] = starttime + len(samples) / fs_in
+
+        if gap:
+            data = np.zeros(len(samples), dtype=np.float32)
+            chain.reset()  # Let the filters start fresh on the data after the gap
+        else:
+            data = chain.process(samples)
+
+        # Resample to target_fs (the only step at the output rate)
+        if fs_in != self.target_fs:
+            t0 = time.perf_counter_ns() if self.metrics is not None else 0
+            data, starttime = self.resample(key, data, fs_in, starttime)
+            if self.metrics is not None:
+                self.metrics.record("resample", t0)
+        else:
+            data = data.copy()  # The chain reuses its buffer for the next block
+        return chain.finish(data), starttime
+
+    def resample(self, key, data, fs_in, starttime):
+        """
+        Resamples one block of stream `key` to target_fs. The streaming resampler
+        keeps its filter state per stream; its output lags the input by its delay.
+        """
+        if self.resampler == "resampy":
+            return resampy.resample(data, fs_in, self.target_fs), starttime
+
+        r = self.resamplers.get(key)
+        if r is None:
+            r = self.resamplers[key] = StreamingResampler(fs_in, self.target_fs)
+        return r.process(data), starttime - r.delay
+
+
+def warm_up(config, sample_rates=WARMUP_SAMPLE_RATES, seconds=WARMUP_SECONDS):
+    """
+    Does the one-time work of the first block of a stream ahead of time: runs a
+    block of noise per sample rate through a throwaway BlockProcessor, which loads
+    the modules of the chain, designs the filters, builds the resampler tables and
+    compiles (or loads from the kernel cache) the resampy kernels.
+
+    Args:
+        config (dict): Keyword arguments of BlockProcessor (without metrics).
+        sample_rates (iterable): Native sample rates to prepare.
+        seconds (float): Length of the noise block.
+
+    Returns:
+        float: Seconds it took.
+    """
+    t0 = time.perf_counter()
+    processor = BlockProcessor(**config)
+    rng = np.random.default_rng(0)
+    for fs in sample_rates:
+        samples = rng.standard_normal(max(int(seconds * fs), 1)).astype(np.float32)
+        processor.process(f"warmup_{fs:g}", fs, 0.0, samples)
+    return time.perf_counter() - t0
@@ -0,0 +1,192 @@
+import time
+import logging
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from obspy import UTCDateTime
+from dsp import BlockProcessor, warm_up
+
+# ----------------------------
+# Default configuration
+DEFAULT_SLOTS = 8  # Result slots per worker; a worker waits when all of them are in use
+DEFAULT_SLOT_SECONDS = 30.0  # Output audio per slot; longer blocks are sent through the queue instead
+DEFAULT_READY_TIMEOUT = 120.0  # Seconds to wait for the workers to start and warm up (a first numba compile takes a while)
+# ----------------------------
+
+
+def worker_main(config, tasks, results, free_slots, shm_name, slots, slot_len, warmup_rates=(), ready=None):
+    """
+    Runs in a worker process: processes the blocks of its streams in arrival order
+    and writes the output into a free slot of its shared-memory buffer.
+
+    Args:
+        config (dict): Keyword arguments of dsp.BlockProcessor.
+        tasks (multiprocessing.Queue): (task id, key, fs_in, start ns, samples, gap) items, None to stop.
+        results (multiprocessing.Queue): (task id, slot, length, start ns, data or error) items.
+        free_slots (multiprocessing.Queue): Indices of the slots the main process has read.
+        warmup_rates (tuple): Sample rates to warm up (dsp.warm_up) before the first block.
+        ready (multiprocessing.Event): Set once the worker is warmed up.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray((slots, slot_len), dtype=np.float32, buffer=shm.buf)
+    if warmup_rates:
+        warm_up(config, warmup_rates)
+    if ready is not None:
+        ready.set()
+    processor = BlockProcessor(**config)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, key, fs_in, start_ns, samples, gap = task
+            try:
+                data, starttime = processor.process(key, fs_in, UTCDateTime(ns=start_ns), samples, gap)
+            except Exception as e:
+                results.put((task_id, None, 0, 0, str(e)))
+                continue
+            if len(data) > slot_len:
+                results.put((task_id, None, len(data), starttime.ns, data))  # Too long for a slot: pickled
+                continue
+            slot = free_slots.get()
+            buffer[slot, :len(data)] = data
+            results.put((task_id, slot, len(data), starttime.ns, None))
+    finally:
+        del buffer
+        shm.close()
+
+
+class DspPool:
+    """
+    Runs the per-station DSP (dsp.BlockProcessor: chain, resampling, output-rate
+    stages) in worker processes, outside the GIL of the SeedLink and playback threads.
+
+    Each station is pinned to one worker ("lane"), which keeps the filter state of
+    its streams and processes its blocks in order; a result thread per worker hands
+    the results back in the same order. The native-rate input blocks are small and
+    go through a queue. The output blocks are written to a shared-memory buffer of
+    `slots` slots per worker and copied out once by the result thread, so the large
+    arrays are never pickled.
+
+    Args:
+        workers (int): Number of worker processes.
+        config (dict): Keyword arguments of dsp.BlockProcessor (without metrics).
+        slots (int): Result slots per worker.
+        slot_seconds (float): Output audio per slot.
+        metrics (metrics.Metrics): If set, the time from submit to result is recorded as "dsp_pool".
+        warmup_rates (tuple): Sample rates every worker warms up (dsp.warm_up) when it starts, see wait_ready().
+    """
+
+    def __init__(self, workers, config, slots=DEFAULT_SLOTS, slot_seconds=DEFAULT_SLOT_SECONDS, metrics=None,
+                 warmup_rates=()):
+        ctx = multiprocessing.get_context("spawn")  # No fork of a process that already runs threads
+        self.metrics = metrics
+        self.slot_len = int(slot_seconds * config["target_fs"])
+        self.lanes = []
+        self.next_lane = itertools.count()
+        self.task_ids = itertools.count()
+        for _ in range(workers):
+            shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_len * 4)
+            lane = {
+                'tasks': ctx.Queue(),
+                'results': ctx.Queue(),
+                'free_slots': ctx.Queue(),
+                'shm': shm,
+                'buffer': np.ndarray((slots, self.slot_len), dtype=np.float32, buffer=shm.buf),
+                'pending': {},  # Task id -> (callback, submit time)
+                'ready': ctx.Event(),
+            }
+            for slot in range(slots):
+                lane['free_slots'].put(slot)
+            lane['process'] = ctx.Process(
+                target=worker_main,
+                args=(config, lane['tasks'], lane['results'], lane['free_slots'], shm.name, slots, self.slot_len,
+                      tuple(warmup_rates), lane['ready']),
+                daemon=True,
+            )
+            lane['process'].start()
+            lane['thread'] = threading.Thread(target=self.collect, args=(lane,), daemon=True)
+            lane['thread'].start()
+            self.lanes.append(lane)
+        logging.info(f"🧮 DSP pool: {workers} worker process(es), {slots} x {slot_seconds:g}s result slots each")
+
+    def wait_ready(self, timeout=DEFAULT_READY_TIMEOUT):
+        """Waits until every worker has started and warmed up (False on timeout or a dead worker)."""
+        deadline = time.time() + timeout
+        for lane in self.lanes:
+            while not lane['ready'].wait(0.1):
+                if not lane['process'].is_alive():
+                    logging.error(f"❌ A DSP worker process died while starting (exit code {lane['process'].exitcode})")
+                    return False
+                if time.time() > deadline:
+                    logging.error(f"❌ DSP workers not ready after {timeout:g}s")
+                    return False
+        return True
+
+    def lane(self):
+        """Assigns the next worker (round robin); pass it to every submit() of one station."""
+        return next(self.next_lane) % len(self.lanes)
+
+    def submit(self, lane, key, fs_in, starttime, samples, gap, callback):
+        """
+        Queues one block. callback(data, starttime) is called from the lane's result
+        thread, in submit order, once the block is processed.
+        """
+        task_id = next(self.task_ids)
+        lane = self.lanes[lane]
+        lane['pending'][task_id] = (callback, time.perf_counter_ns())
+        lane['tasks'].put((task_id, key, fs_in, starttime.ns, np.asarray(samples), gap))
+
+    def collect(self, lane):
+        """Result thread of one worker."""
+        while True:
+            try:
+                task_id, slot, length, start_ns, payload = lane['results'].get()
+            except (EOFError, OSError, ValueError):
+                return  # Pool closed
+            callback, submitted = lane['pending'].pop(task_id)
+            if slot is not None:
+                data = lane['buffer'][slot, :length].copy()
+                lane['free_slots'].put(slot)
+            elif isinstance(payload, str):
+                logging.error(f"Processing failed: {payload}")
+                continue
+            else:
+                data = payload
+            if self.metrics is not None:
+                self.metrics.record("dsp_pool", submitted)
+            try:
+                callback(data, UTCDateTime(ns=start_ns))
+            except Exception as e:
+                logging.error(f"Error handing over a processed block: {e}")
+
+    def pending(self):
+        """Blocks submitted but not handed back yet."""
+        return sum(len(lane['pending']) for lane in self.lanes)
+
+    def join(self, timeout=None):
+        """Waits until every submitted block has been handed back (False on timeout or a dead worker)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.pending():
+            if deadline is not None and time.time() > deadline:
+                return False
+            if not all(lane['process'].is_alive() for lane in self.lanes):
+                logging.error("❌ A DSP worker process died, its blocks are lost")
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+        for lane in self.lanes:
+            lane['tasks'].put(None)
+        for lane in self.lanes:
+            lane['process'].join(timeout=5)
+            if lane['process'].is_alive():
+                lane['process'].terminate()
+            lane['buffer'] = None
+            lane['shm'].close()
+            lane['shm'].unlink()
+        self.lanes = []
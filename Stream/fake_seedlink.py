@@ -0,0 +1,117 @@
+import asyncio
+import argparse
+import logging
+from fnmatch import fnmatchcase
+from replay import expand_paths, load_records, record_info
+
+
+class FakeSeedLinkServer:
+    """
+    A minimal SeedLink server that replays miniSEED records, for exercising the
+    ingest engines without network access.
+
+    It understands HELLO, STATION, SELECT, DATA and END, then sends the matching
+    records as SeedLink packets, `interval` seconds apart. Like a real server, it
+    answers ERROR to STATION for a station none of its records belong to. With
+    `disconnect_after` set, it drops each connection after that many packets (to
+    test reconnects).
+    """
+
+    def __init__(self, records, host="127.0.0.1", port=0, interval=0.0, disconnect_after=None):
+        self.records = records
+        self.stations = {record_info(record)[:2] for record in records}  # (network, station) served
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.disconnect_after = disconnect_after
+        self.server = None
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        selection = []  # [network, station, [selectors], start sequence number]
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                words = line.decode("ascii").strip().split()
+                if not words:
+                    continue
+                cmd = words[0].upper()
+                if cmd == "HELLO":
+                    writer.write(b"SeedLink v3.1 (FakeSeedLink)\r\nfake_seedlink\r\n")
+                elif cmd == "STATION":
+                    net, sta = words[2] if len(words) > 2 else "*", words[1] if len(words) > 1 else ""
+                    if any(fnmatchcase(network, net) and fnmatchcase(station, sta) for network, station in self.stations):
+                        selection.append([net, sta, [], 0])
+                        writer.write(b"OK\r\n")
+                    else:
+                        writer.write(b"ERROR\r\n")
+                elif cmd == "SELECT":
+                    selection[-1][2].append(words[1] if len(words) > 1 else "*")
+                    writer.write(b"OK\r\n")
+                elif cmd in ("DATA", "FETCH"):
+                    if len(words) > 1:
+                        selection[-1][3] = int(words[1], 16)
+                    writer.write(b"OK\r\n")
+                elif cmd == "END":
+                    break
+                elif cmd == "BYE":
+                    return
+                else:
+                    writer.write(b"ERROR\r\n")
+                await writer.drain()
+
+            sent = 0
+            for seqnum, record in enumerate(self.records):
+                network, station, channel, _ = record_info(record)
+                for net, sta, selectors, first_seqnum in selection:
+                    if (fnmatchcase(network, net) and fnmatchcase(station, sta) and seqnum >= first_seqnum
+                            and any(fnmatchcase(channel, s[-3:]) for s in selectors or ["*"])):
+                        break
+                else:
+                    continue
+                writer.write(b"SL%06X" % (seqnum & 0xFFFFFF) + record)
+                await writer.drain()
+                sent += 1
+                if self.disconnect_after and sent >= self.disconnect_after:
+                    return
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+            await reader.read()  # Stay connected like a live server
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    records = load_records(expand_paths(args.files))
+    server = await FakeSeedLinkServer(records, args.host, args.port, args.interval).start()
+    logging.info(f"📡 Replaying {len(records)} records on {args.host}:{server.port}")
+    async with server.server:
+        await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Replay miniSEED files as a local SeedLink server")
+    parser.add_argument("files", nargs="+", help="miniSEED files to replay")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=18000, help="Port to listen on")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between packets")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n🛑 Fake SeedLink server stopped.")
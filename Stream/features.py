@@ -0,0 +1,166 @@
+import time
+import socket
+import logging
+import threading
+import numpy as np
+from status_channel import osc_message
+
+# ----------------------------
+# Default configuration
+DEFAULT_FEATURE_INTERVAL_SECONDS = 1.0  # How often the features are computed and sent
+DEFAULT_STA_SECONDS = 1.0  # Short-term window (STA, RMS envelope, peak)
+DEFAULT_LTA_SECONDS = 30.0  # Long-term window (LTA); also the history kept per station
+DEFAULT_FFT_SECONDS = 10.0  # Window of the dominant frequency estimate
+DEFAULT_TRIGGER_RATIO = 3.0  # STA/LTA above this counts as a trigger
+ACTIVE_SECONDS = 60.0  # Stations without data for this long are left out
+OSC_PREFIX = "/features"
+# ----------------------------
+
+
+class RateGroup:
+    """
+    Native-rate history of all stations with one sample rate: one row per station
+    in a 2-D ring buffer, so the features of all of them are computed in one pass.
+    """
+
+    def __init__(self, sample_rate, seconds):
+        self.sample_rate = sample_rate
+        self.capacity = max(int(seconds * sample_rate), 1)
+        self.rows = {}  # Station ID -> row
+        self.data = np.zeros((0, self.capacity), dtype=np.float64)
+        self.pos = np.zeros(0, dtype=np.int64)  # Next write index per row
+        self.seen = np.zeros(0, dtype=np.int64)  # Samples written per row (capped at capacity)
+        self.last_push = np.zeros(0, dtype=np.float64)
+
+    def row(self, sid):
+        r = self.rows.get(sid)
+        if r is None:
+            r = self.rows[sid] = len(self.rows)
+            self.data = np.vstack((self.data, np.zeros((1, self.capacity))))
+            self.pos = np.append(self.pos, 0)
+            self.seen = np.append(self.seen, 0)
+            self.last_push = np.append(self.last_push, 0.0)
+        return r
+
+    def push(self, sid, samples, now):
+        r = self.row(sid)
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        start = self.pos[r]
+        first = min(n, self.capacity - start)
+        self.data[r, start:start + first] = samples[:first]
+        self.data[r, :n - first] = samples[first:]
+        self.pos[r] = (start + n) % self.capacity
+        self.seen[r] = min(self.seen[r] + n, self.capacity)
+        self.last_push[r] = now
+
+    def windows(self, now):
+        """Station IDs, their histories (oldest sample first) and valid sample counts."""
+        active = now - self.last_push <= ACTIVE_SECONDS
+        ids = [sid for sid, r in self.rows.items() if active[r]]
+        rows = np.array([self.rows[sid] for sid in ids], dtype=np.int64)
+        index = (self.pos[rows, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        return ids, self.data[rows[:, None], index], self.seen[rows]
+
+
+class FeatureExtractor:
+    """
+    Control features of every station, computed at the native sample rate.
+
+    Players push the raw samples of every block (push() is cheap); compute() then
+    works on all stations of a sample rate at once, as one 2-D NumPy array:
+
+    - rms: RMS envelope over the last `sta_s` seconds (offset removed)
+    - sta_lta: ratio of short-term to long-term mean energy
+    - trigger: 1 while sta_lta is above `trigger_ratio`
+    - dominant_hz: frequency of the largest rFFT peak of the last `fft_s` seconds
+    - peak: largest absolute amplitude of the last `sta_s` seconds (counts)
+    """
+
+    def __init__(self, sta_s=DEFAULT_STA_SECONDS, lta_s=DEFAULT_LTA_SECONDS, fft_s=DEFAULT_FFT_SECONDS,
+                 trigger_ratio=DEFAULT_TRIGGER_RATIO, clock=time.time):
+        self.sta_s = sta_s
+        self.lta_s = lta_s
+        self.fft_s = fft_s
+        self.trigger_ratio = trigger_ratio
+        self.clock = clock
+        self.groups = {}  # Sample rate -> RateGroup
+        self.lock = threading.Lock()  # Held only to copy samples in or out
+        self.latest = {}
+
+    def push(self, sid, sample_rate, samples):
+        with self.lock:
+            group = self.groups.get(sample_rate)
+            if group is None:
+                group = self.groups[sample_rate] = RateGroup(sample_rate, max(self.lta_s, self.fft_s))
+            group.push(sid, samples, self.clock())
+
+    def compute(self):
+        """
+        Returns:
+            dict: Station ID -> feature name -> value, for all active stations.
+        """
+        now = self.clock()
+        with self.lock:
+            snapshots = [(group.sample_rate, *group.windows(now)) for group in self.groups.values()]
+        features = {}
+        for fs, ids, x, seen in snapshots:
+            if not ids:
+                continue
+            features.update(self.compute_group(fs, ids, x, seen))
+        self.latest = features
+        return features
+
+    def compute_group(self, fs, ids, x, seen):
+        n_total = x.shape[1]
+        valid = np.arange(n_total)[None, :] >= (n_total - seen)[:, None]  # Oldest part may be unfilled
+        count = np.maximum(valid.sum(axis=1), 1)
+        x = x - (x * valid).sum(axis=1, keepdims=True) / count[:, None]  # Remove the offset
+        x *= valid
+        energy = x * x
+
+        n_sta = max(int(self.sta_s * fs), 1)
+        sta = energy[:, -n_sta:].mean(axis=1)
+        lta = energy.sum(axis=1) / count
+        ratio = np.where(lta > 0, sta / np.where(lta > 0, lta, 1.0), 0.0)
+        peak = np.abs(x[:, -n_sta:]).max(axis=1)
+
+        n_fft = min(max(int(self.fft_s * fs), 2), n_total)
+        spectrum = np.abs(np.fft.rfft(x[:, -n_fft:] * np.hanning(n_fft)[None, :], axis=1))
+        dominant = np.fft.rfftfreq(n_fft, 1.0 / fs)[np.argmax(spectrum[:, 1:], axis=1) + 1]
+
+        return {
+            sid: {
+                'rms': round(float(np.sqrt(sta[i])), 3),
+                'sta_lta': round(float(ratio[i]), 3),
+                'trigger': int(ratio[i] > self.trigger_ratio),
+                'dominant_hz': round(float(dominant[i]), 3),
+                'peak': round(float(peak[i]), 3),
+            }
+            for i, sid in enumerate(ids)
+        }
+
+
+def feature_loop(extractor, osc=None, interval=DEFAULT_FEATURE_INTERVAL_SECONDS):
+    """
+    A thread that computes the features every `interval` seconds and sends them
+    as OSC messages "/features/<station id> rms sta_lta trigger dominant_hz peak".
+    """
+    out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if osc is not None else None
+    if osc is not None:
+        logging.info(f"🎛️ Sending features to {osc[0]}:{osc[1]} every {interval:g}s")
+    while True:
+        time.sleep(interval)
+        try:
+            features = extractor.compute()
+        except Exception as e:
+            logging.error(f"❌ Feature extraction failed: {e}")
+            continue
+        if out is None:
+            continue
+        for sid, f in features.items():
+            try:
+                out.sendto(osc_message(f"{OSC_PREFIX}/{sid}", f['rms'], f['sta_lta'], f['trigger'],
+                                       f['dominant_hz'], f['peak']), osc)
+            except OSError as e:
+                logging.debug(f"OSC send failed: {e}")
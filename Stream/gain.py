@@ -0,0 +1,106 @@
+import numpy as np
+
+# ----------------------------
+# Default configuration
+GAIN_MODES = ("peak", "rms", "percentile", "max")
+DEFAULT_GAIN_MODE = "peak"
+DEFAULT_PEAK_DECAY_SECONDS = 600.0  # Time for the peak reference to fall to 1/e after an event
+DEFAULT_TARGET_RMS = 0.2  # Output RMS of the AGC
+DEFAULT_ATTACK_SECONDS = 5.0  # AGC reaction to rising levels
+DEFAULT_RELEASE_SECONDS = 120.0  # AGC reaction to falling levels
+DEFAULT_MAX_GAIN = 1e6  # Limits the amplification of (near) silent input
+DEFAULT_PERCENTILE = 99.5
+DEFAULT_PERCENTILE_WINDOW_SECONDS = 600.0
+# ----------------------------
+
+
+class GainControl:
+    """
+    Normalizes consecutive blocks of one stream to roughly [-1, 1], at the native
+    sample rate (before resampling).
+
+    Modes:
+        "peak": divides by the largest absolute value seen, decaying exponentially
+            with `decay_s`, so the level recovers after a large event.
+        "rms": automatic gain control towards `target_rms`, following rising
+            levels with `attack_s` and falling levels with `release_s`.
+        "percentile": divides by the `percentile` of absolute values over the last
+            `window_s` seconds (kept in a preallocated ring).
+        "max": divides by the largest absolute value ever seen (the old behavior).
+
+    The gain is updated once per block and ramped linearly across the block, so
+    there are no steps at block boundaries. The output is clipped to [-1, 1].
+    """
+
+    def __init__(self, mode=DEFAULT_GAIN_MODE, sample_rate=20.0, decay_s=DEFAULT_PEAK_DECAY_SECONDS,
+                 target_rms=DEFAULT_TARGET_RMS, attack_s=DEFAULT_ATTACK_SECONDS, release_s=DEFAULT_RELEASE_SECONDS,
+                 percentile=DEFAULT_PERCENTILE, window_s=DEFAULT_PERCENTILE_WINDOW_SECONDS, max_gain=DEFAULT_MAX_GAIN):
+        if mode not in GAIN_MODES:
+            raise ValueError(f"Unknown gain mode {mode!r}, expected one of {GAIN_MODES}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.decay_s = decay_s
+        self.target_rms = target_rms
+        self.attack_s = attack_s
+        self.release_s = release_s
+        self.percentile = percentile
+        self.max_gain = max_gain
+        self.reference = 0.0  # Peak, mean square or percentile the gain is based on
+        self.gain = None  # Gain at the end of the previous block
+        if mode == "percentile":
+            self.history = np.zeros(max(1, int(window_s * sample_rate)), dtype=np.float32)
+            self.history_count = 0
+
+    def update(self, data):
+        """Updates the reference level with one block and returns the new gain."""
+        duration = len(data) / self.sample_rate
+        if self.mode == "max":
+            self.reference = max(self.reference, float(np.max(np.abs(data))))
+            level = self.reference
+        elif self.mode == "peak":
+            decayed = self.reference * np.exp(-duration / self.decay_s)
+            self.reference = max(decayed, float(np.max(np.abs(data))))
+            level = self.reference
+        elif self.mode == "rms":
+            mean_square = float(np.dot(data, data)) / len(data)
+            if self.gain is None:
+                self.reference = mean_square
+            else:
+                tau = self.attack_s if mean_square > self.reference else self.release_s
+                self.reference += (1.0 - np.exp(-duration / tau)) * (mean_square - self.reference)
+            level = np.sqrt(self.reference) / self.target_rms
+        else:
+            self.push_history(np.abs(data))
+            level = float(np.percentile(self.history[:min(self.history_count, len(self.history))], self.percentile))
+        return min(self.max_gain, 1.0 / level) if level > 0 else self.max_gain
+
+    def push_history(self, values):
+        """Writes absolute values into the percentile ring."""
+        size = len(self.history)
+        values = values[-size:]
+        start = self.history_count % size
+        first = min(len(values), size - start)
+        self.history[start:start + first] = values[:first]
+        self.history[:len(values) - first] = values[first:]
+        self.history_count += len(values)
+
+    def process(self, data):
+        """
+        Applies the gain to one block (in place, if it is a float32 array).
+
+        Args:
+            data (np.ndarray): 1-D float32 samples at the native sample rate.
+
+        Returns:
+            np.ndarray: The normalized block.
+        """
+        if len(data) == 0:
+            return data
+        gain = self.update(data)
+        previous = gain if self.gain is None else self.gain
+        self.gain = gain
+        if previous == gain:
+            data *= gain
+        else:
+            data *= np.linspace(previous, gain, len(data) + 1, dtype=np.float32)[1:]
+        return np.clip(data, -1.0, 1.0, out=data)
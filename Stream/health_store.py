@@ -0,0 +1,151 @@
+import time
+import sqlite3
+import argparse
+import threading
+
+# ----------------------------
+# Default configuration
+HEALTH_DB = "station_health.db"
+DEFAULT_BEST_DAYS = 7.0
+# Resolution (seconds per row) -> how long rows are kept (seconds)
+RESOLUTIONS = {
+    "minute": (60, 2 * 86400),
+    "hour": (3600, 60 * 86400),
+    "day": (86400, 5 * 365 * 86400),
+}
+# ----------------------------
+
+COLUMNS = ("blocks", "data_minutes", "latency_sum", "latency_count", "timeouts", "bad_packets")
+
+
+class HealthStore:
+    """
+    Per-station health history in a SQLite file.
+
+    Every minute the monitor adds one row per station (blocks, minutes of data,
+    summed arrival latency, timeouts, bad packets). The same figures are added to
+    the hourly and daily rows at once, so the rollups are always up to date and
+    queries over days only read a few rows per station. prune() drops rows older
+    than the retention of their resolution (see RESOLUTIONS).
+
+    Args:
+        path (str): Database file, created if missing.
+    """
+
+    def __init__(self, path=HEALTH_DB):
+        self.path = path
+        self.lock = threading.Lock()  # One connection, shared by the monitor's threads
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for table in RESOLUTIONS:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "station TEXT NOT NULL, ts INTEGER NOT NULL, "
+                "blocks INTEGER NOT NULL, data_minutes REAL NOT NULL, "
+                "latency_sum REAL NOT NULL, latency_count INTEGER NOT NULL, "
+                "timeouts INTEGER NOT NULL, bad_packets INTEGER NOT NULL, "
+                "PRIMARY KEY (station, ts)) WITHOUT ROWID"
+            )
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_ts ON {table} (ts)")
+        self.db.commit()
+
+    def record(self, rows, ts=None):
+        """
+        Adds one minute of figures.
+
+        Args:
+            rows (dict): Station ID -> dict with the keys in COLUMNS.
+            ts (float): Unix time of the minute (default: now).
+        """
+        ts = time.time() if ts is None else ts
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in COLUMNS)
+        with self.lock, self.db:
+            for table, (seconds, _) in RESOLUTIONS.items():
+                bucket = int(ts // seconds * seconds)
+                self.db.executemany(
+                    f"INSERT INTO {table} (station, ts, {', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    f"ON CONFLICT (station, ts) DO UPDATE SET {updates}",
+                    [(sid, bucket, *(row[c] for c in COLUMNS)) for sid, row in rows.items()],
+                )
+
+    def prune(self, now=None):
+        """Deletes rows that are past the retention of their resolution."""
+        now = time.time() if now is None else now
+        with self.lock, self.db:
+            for table, (_, keep) in RESOLUTIONS.items():
+                self.db.execute(f"DELETE FROM {table} WHERE ts < ?", (int(now - keep),))
+
+    def resolution_for(self, seconds):
+        """The finest resolution that still covers the last `seconds` seconds."""
+        for table, (row_seconds, keep) in RESOLUTIONS.items():
+            if 10 * row_seconds <= seconds <= keep:
+                return table
+        return "day"
+
+    def summary(self, days=DEFAULT_BEST_DAYS, now=None):
+        """
+        Availability and error figures per station over the last `days` days.
+
+        Returns:
+            list: Dicts ordered from the best station to the worst: most data,
+            then fewest timeouts, fewest bad packets and lowest latency.
+        """
+        now = time.time() if now is None else now
+        seconds = days * 86400
+        table = self.resolution_for(seconds)
+        with self.lock:
+            cursor = self.db.execute(
+                "SELECT station, SUM(data_minutes), SUM(blocks), SUM(timeouts), SUM(bad_packets), "
+                "SUM(latency_sum) / MAX(SUM(latency_count), 1) AS latency "
+                f"FROM {table} WHERE ts >= ? GROUP BY station "
+                "ORDER BY SUM(data_minutes) DESC, SUM(timeouts), SUM(bad_packets), latency",
+                (int(now - seconds),),
+            )
+            rows = cursor.fetchall()
+        return [{
+            'station': station,
+            'availability': round(min(data_minutes / (seconds / 60), 1.0), 4),
+            'blocks': blocks,
+            'timeouts': timeouts,
+            'bad_packets': bad_packets,
+            'latency_sec': round(latency, 2),
+        } for station, data_minutes, blocks, timeouts, bad_packets, latency in rows]
+
+    def best_stations(self, n, days=DEFAULT_BEST_DAYS, candidates=None):
+        """
+        IDs of the `n` healthiest stations over the last `days` days.
+
+        Args:
+            candidates (iterable): If given, only these station IDs are considered.
+        """
+        ranking = [row['station'] for row in self.summary(days)]
+        if candidates is not None:
+            candidates = set(candidates)
+            ranking = [sid for sid in ranking if sid in candidates]
+        return ranking[:n]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the station health history recorded by stationmonitor1.3.py")
+    parser.add_argument("--db", type=str, default=HEALTH_DB, help="Health database file")
+    parser.add_argument("--days", type=float, default=DEFAULT_BEST_DAYS, help="Period to summarize, in days")
+    parser.add_argument("--best", type=int, default=None, help="Only show the N best stations")
+    args = parser.parse_args()
+
+    store = HealthStore(args.db)
+    t0 = time.perf_counter()
+    rows = store.summary(args.days)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if args.best is not None:
+        rows = rows[:args.best]
+    print(f"{'ID':>6} {'Availability':>12} {'Blocks':>8} {'Timeouts':>8} {'Bad':>6} {'Latency (s)':>11}")
+    for row in rows:
+        print(f"{row['station']:>6} {row['availability']:>12.1%} {row['blocks']:>8} {row['timeouts']:>8} "
+              f"{row['bad_packets']:>6} {row['latency_sec']:>11}")
+    print(f"🕒 Query over {args.days:g} days took {elapsed_ms:.1f} ms")
+    store.close()
@@ -0,0 +1,113 @@
+import bisect
+import numpy as np
+
+# ----------------------------
+# Default configuration
+DEFAULT_JITTER_WINDOW_SECONDS = 30.0  # How far (stream time) late records may still be reordered
+DEFAULT_MAX_FILL_SECONDS = 60.0  # Longer gaps are not filled with silence; the timeline jumps instead
+# ----------------------------
+
+
+class JitterBuffer:
+    """
+    Puts the records of one stream on a sample-accurate timeline.
+
+    Records are keyed on their start time in whole samples. Duplicates and the
+    overlapping parts of records are dropped, records that arrive out of order are
+    held back and released in order, and a hole in the timeline is only given up
+    once the data buffered behind it spans more than `window_s`. Gaps up to
+    `max_fill_s` are then filled with silence; after longer gaps the timeline
+    continues at the next record ("resync"). A record that ends more than
+    `window_s` behind the timeline is not a late duplicate but a jump back in time
+    (station clock reset, or a server replaying older data): what is pending is
+    released and the timeline continues at that record, also as a "resync".
+
+    push() and flush() return segments as (start sample, samples, kind) with kind
+    "data", "gap" (silence in place of missing data) or "resync" (data after a
+    gap that was not filled). Start samples count from 1970-01-01 at the stream's rate.
+    """
+
+    def __init__(self, sample_rate, window_s=DEFAULT_JITTER_WINDOW_SECONDS, max_fill_s=DEFAULT_MAX_FILL_SECONDS):
+        self.sample_rate = sample_rate
+        self.window = int(window_s * sample_rate)
+        self.max_window = self.window
+        self.max_fill = int(max_fill_s * sample_rate)
+        self.next = None  # Start sample of the next segment to release
+        self.pending = []  # Sorted (start sample, arrival number, samples)
+        self.arrivals = 0
+        self.stats = {'records': 0, 'duplicates': 0, 'overlaps': 0, 'reordered': 0,
+                      'gaps': 0, 'gap_samples': 0, 'resyncs': 0}
+
+    def limit_window(self, seconds):
+        """Waits at most `seconds` (but never longer than window_s) for a missing record."""
+        self.window = min(int(seconds * self.sample_rate), self.max_window)
+
+    def sample_index(self, starttime):
+        """Start time (UTCDateTime) -> sample number since 1970-01-01."""
+        return int(round(starttime.ns * self.sample_rate / 1e9))
+
+    def push(self, starttime, samples):
+        """
+        Adds one record and returns the segments that are ready.
+
+        Args:
+            starttime (UTCDateTime): Time of the first sample.
+            samples (np.ndarray): The record's samples.
+        """
+        self.stats['records'] += 1
+        start = self.sample_index(starttime)
+        end = start + len(samples)
+        if self.next is None:
+            self.next = start
+        if self.next - end > self.max_window:
+            ready = self.release(force=True)
+            self.stats['resyncs'] += 1
+            self.next = end
+            return ready + [(start, samples, "resync")]
+        if end <= self.next:
+            self.stats['duplicates'] += 1
+            return []
+        if start < self.next:
+            self.stats['overlaps'] += 1
+            samples, start = samples[self.next - start:], self.next
+        if self.pending and start < self.pending[-1][0]:
+            self.stats['reordered'] += 1
+        self.arrivals += 1
+        bisect.insort(self.pending, (start, self.arrivals, samples))
+        return self.release()
+
+    def release(self, force=False):
+        """Releases pending records in order, filling or skipping holes that timed out."""
+        ready = []
+        while self.pending:
+            start, _, samples = self.pending[0]
+            end = start + len(samples)
+            if end <= self.next:  # Covered by what was released in the meantime
+                self.pending.pop(0)
+                self.stats['duplicates'] += 1
+                continue
+            kind = "data"
+            if start > self.next:
+                newest = max(s + len(x) for s, _, x in self.pending)
+                if not force and newest - self.next <= self.window:
+                    break  # Wait for the missing records
+                hole = start - self.next
+                if hole <= self.max_fill:
+                    self.stats['gaps'] += 1
+                    self.stats['gap_samples'] += hole
+                    ready.append((self.next, np.zeros(hole, dtype=np.float32), "gap"))
+                else:
+                    self.stats['resyncs'] += 1
+                    kind = "resync"
+                self.next = start
+            elif start < self.next:
+                self.stats['overlaps'] += 1
+                samples = samples[self.next - start:]
+            self.pending.pop(0)
+            ready.append((self.next, samples, kind))
+            self.next = end
+        return ready
+
+    def flush(self):
+        """Releases everything still pending, e.g. at the end of a replay."""
+        return self.release(force=True)
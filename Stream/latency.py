@@ -0,0 +1,127 @@
+import time
+import numpy as np
+
+# ----------------------------
+# Default configuration
+DEFAULT_JITTER_PERCENTILE = 99.0  # Arrival jitter percentile the buffer has to cover
+DEFAULT_MARGIN_SECONDS = 2.0  # Added on top of record length and jitter
+DEFAULT_INITIAL_TARGET_SECONDS = 30.0  # Target before the first arrival
+DEFAULT_MIN_ARRIVALS = 8  # Arrivals needed before the measured target is used
+DEFAULT_HISTORY = 512  # Arrivals kept for the percentile
+DEFAULT_MAX_PPM = 2000  # Largest playback rate correction (0.2 %)
+DEFAULT_PPM_PER_SECOND = 200  # Rate correction per second of latency error
+DEFAULT_INTEGRAL_SECONDS = 1800.0  # Time constant of the drift (integral) term
+DEFAULT_MAX_DRIFT_PPM = 500  # Largest clock drift the integral term may settle on
+DEFAULT_MAX_EXCESS_SECONDS = 60.0  # Beyond target + this, incoming blocks are dropped to catch up
+# ----------------------------
+
+
+class LatencyController:
+    """
+    Keeps the playback buffer of one stream at a target latency.
+
+    Every record's arrival is compared with the end time of its data. The lowest
+    delay seen is the transport delay; the rest is jitter. The target buffer is the
+    length of a record plus the chosen percentile of the jitter plus a margin
+    (two record lengths plus the margin until enough arrivals have been seen).
+
+    Blocks are stretched or squeezed by at most `max_ppm` (linear interpolation at
+    the output rate, continuous across blocks) so the buffer drifts back to the
+    target instead of growing. The correction has a proportional part and a slow
+    integral part that settles on the clock drift. Far above the target, whole blocks are dropped.
+
+    While the jitter buffer holds back data for a missing record, the playback
+    buffer drains. hold_s is how long it can wait for one without running the
+    buffer dry: the target minus the margin.
+    """
+
+    def __init__(self, sample_rate, percentile=DEFAULT_JITTER_PERCENTILE, margin_s=DEFAULT_MARGIN_SECONDS,
+                 initial_target_s=DEFAULT_INITIAL_TARGET_SECONDS, max_ppm=DEFAULT_MAX_PPM,
+                 ppm_per_second=DEFAULT_PPM_PER_SECOND, integral_s=DEFAULT_INTEGRAL_SECONDS,
+                 max_excess_s=DEFAULT_MAX_EXCESS_SECONDS,
+                 history=DEFAULT_HISTORY, clock=time.time):
+        self.sample_rate = sample_rate
+        self.percentile = percentile
+        self.margin_s = margin_s
+        self.max_ppm = max_ppm
+        self.ppm_per_second = ppm_per_second
+        self.integral_s = integral_s
+        self.max_excess_s = max_excess_s
+        self.clock = clock
+        self.delays = np.zeros(history, dtype=np.float64)  # Arrival time - data end time
+        self.durations = np.zeros(history, dtype=np.float64)  # Record lengths
+        self.count = 0
+        self.target_s = initial_target_s
+        self.jitter_p50_s = 0.0
+        self.jitter_p99_s = 0.0
+        self.queue_s = 0.0
+        self.ppm = 0.0
+        self.drift_ppm = 0.0  # Integral term: the clock drift between data and audio device
+        self.dropped_blocks = 0
+        self.last = None  # Last output sample of the previous block
+        self.pos = 0.0  # Read position of the next sample, relative to the start of the next block
+
+    def observe(self, trace):
+        """Records the arrival of one record (call as soon as it is received)."""
+        i = self.count % len(self.delays)
+        self.delays[i] = self.clock() - trace.stats.endtime.timestamp
+        self.durations[i] = trace.stats.npts / trace.stats.sampling_rate
+        self.count += 1
+        n = min(self.count, len(self.delays))
+        if self.count >= DEFAULT_MIN_ARRIVALS:
+            jitter = self.delays[:n] - self.delays[:n].min()
+            self.jitter_p50_s, self.jitter_p99_s = np.percentile(jitter, (50, self.percentile))
+            self.target_s = float(self.durations[:n].max() + self.jitter_p99_s + self.margin_s)
+        else:
+            self.target_s = float(2 * self.durations[:n].max() + self.margin_s)  # Until jitter can be measured
+
+    @property
+    def hold_s(self):
+        """Longest time a hole in the timeline may be waited for (see jitter.JitterBuffer)."""
+        return max(self.target_s - self.margin_s, 0.0)
+
+    def adjust(self, block, queue_s):
+        """
+        Resizes a block before it is queued, given the current buffer in seconds.
+
+        Returns:
+            np.ndarray: The block to queue, or None if it should be dropped.
+        """
+        self.queue_s = queue_s
+        error = queue_s - self.target_s
+        if error > self.max_excess_s:
+            self.dropped_blocks += 1
+            self.last, self.pos = None, 0.0
+            return None
+        proportional = error * self.ppm_per_second
+        if abs(proportional) < self.max_ppm:  # No integration while far off (e.g. at startup)
+            self.drift_ppm = float(np.clip(
+                self.drift_ppm + proportional * len(block) / self.sample_rate / self.integral_s,
+                -DEFAULT_MAX_DRIFT_PPM, DEFAULT_MAX_DRIFT_PPM,
+            ))
+        self.ppm = float(np.clip(proportional + self.drift_ppm, -self.max_ppm, self.max_ppm))
+        if self.ppm == 0.0 and self.pos == 0.0:
+            self.last = block[-1:]
+            return block
+
+        # Above the target the buffer shrinks: read faster, i.e. produce fewer samples
+        step = 1.0 + self.ppm * 1e-6
+        x = block if self.last is None else np.concatenate((self.last, block))
+        offset = 0 if self.last is None else 1  # Index of block[0] in x
+        positions = np.arange(self.pos + offset, len(x) - 1 + 1e-9, step)
+        out = np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+        self.last = block[-1:]
+        self.pos = (positions[-1] + step if len(positions) else self.pos + offset) - len(x)
+        return out
+
+    def status(self):
+        return {
+            'target_latency_sec': round(self.target_s, 2),
+            'queue_latency_sec': round(self.queue_s, 2),
+            'hole_hold_sec': round(self.hold_s, 2),
+            'jitter_p50_sec': round(float(self.jitter_p50_s), 2),
+            f'jitter_p{self.percentile:g}_sec': round(float(self.jitter_p99_s), 2),
+            'rate_correction_ppm': round(self.ppm, 1),
+            'drift_ppm': round(self.drift_ppm, 1),
+            'dropped_blocks': self.dropped_blocks,
+        }
@@ -0,0 +1,42 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stands in for a module that is only imported on first use, so that heavy
+    optional dependencies (scipy, resampy/numba, soundfile, sounddevice) do not
+    slow down the start of every script that might need them.
+
+        sf = LazyModule("soundfile")
+        sf.write(...)  # Imports soundfile here
+
+    Args:
+        name (str): Module to import.
+        loader (callable): Returns the module instead of importlib.import_module(name),
+            e.g. to configure it once after the import.
+    """
+
+    def __init__(self, name, loader=None):
+        self._name = name
+        self._loader = loader
+        self._module = None
+        self._lock = threading.Lock()  # First use may come from several threads at once
+
+    def load(self):
+        """Imports the module now (if it is not yet) and returns it."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._loader() if self._loader else importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self.loaded else ''}>"
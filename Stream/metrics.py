@@ -0,0 +1,245 @@
+import time
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+# ----------------------------
+# Default configuration
+SUB_BUCKETS = 16  # Buckets per power of two (about 4 % resolution)
+BATCH = 256  # Durations a thread collects before it sorts them into buckets (all at once, with NumPy)
+CALLBACK_SLOTS = 32768  # Audio callback durations held until a reader sorts them (minutes of callbacks in real time)
+MAX_EXPONENT = 40  # Values up to 2**40 ns (about 18 minutes)
+PROMETHEUS_BOUNDS = (  # Seconds, for the exported cumulative buckets
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# ----------------------------
+
+N_BUCKETS = (MAX_EXPONENT + 1) * SUB_BUCKETS
+# Upper bound of every bucket in ns
+BUCKET_UPPER_NS = np.array(
+    [2.0 ** (e - 1) * (1 + (s + 1) / SUB_BUCKETS) for e in range(MAX_EXPONENT + 1) for s in range(SUB_BUCKETS)]
+)
+
+
+def bucket_counts(values):
+    """Returns the bucket counts of an array of durations in ns."""
+    mantissa, exponent = np.frexp(np.maximum(values, 1).astype(np.float64))
+    index = exponent * SUB_BUCKETS + ((mantissa - 0.5) * (2 * SUB_BUCKETS)).astype(np.int64)
+    return np.bincount(np.clip(index, SUB_BUCKETS, N_BUCKETS - 1), minlength=N_BUCKETS)
+
+
+class LatencyHistogram:
+    """
+    A log-linear (HDR-style) histogram of durations in nanoseconds.
+
+    Every thread records into its own part, so recording needs no lock and no
+    counter is ever written by two threads. A record only appends the duration to
+    the thread's pending list; every BATCH durations are sorted into the buckets
+    at once, under the part's lock so that readers (which merge the parts, pending
+    durations included) never count a batch twice or not at all.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.parts = []  # [counts, total ns, max ns, pending durations, lock] per recording thread
+
+    def record(self, ns):
+        try:
+            pending = self.local.pending
+        except AttributeError:
+            pending = self.new_part()
+        pending.append(ns)
+        if len(pending) >= BATCH:
+            self.flush()
+
+    def new_part(self):
+        part = [np.zeros(N_BUCKETS, dtype=np.int64), 0, 0, [], threading.Lock()]
+        self.local.part = part
+        self.local.pending = part[3]
+        self.parts.append(part)
+        return part[3]
+
+    def flush(self):
+        """Sorts the calling thread's pending durations into its buckets."""
+        part = self.local.part
+        values = np.array(part[3], dtype=np.int64)
+        counts = bucket_counts(values)
+        with part[4]:
+            part[0] += counts
+            part[1] += int(values.sum())
+            part[2] = max(part[2], int(values.max()))
+            part[3] = self.local.pending = []
+
+    def merged(self):
+        """Returns (counts, total ns, max ns) over all threads."""
+        counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        total = maximum = 0
+        for part in list(self.parts):
+            with part[4]:
+                part_counts, part_total, part_max, pending = part[0].copy(), part[1], part[2], list(part[3])
+            counts += part_counts
+            total += part_total
+            maximum = max(maximum, part_max)
+            if pending:
+                values = np.array(pending, dtype=np.int64)
+                counts += bucket_counts(values)
+                total += int(values.sum())
+                maximum = max(maximum, int(values.max()))
+        return counts, total, maximum
+
+    def summary(self):
+        """Count, mean and percentiles in milliseconds."""
+        counts, total, maximum = self.merged()
+        n = int(counts.sum())
+        if n == 0:
+            return {'count': 0}
+        cumulative = np.cumsum(counts)
+        result = {'count': n, 'mean_ms': round(total / n / 1e6, 3)}
+        for q in (50, 90, 99, 99.9):
+            index = int(np.searchsorted(cumulative, q / 100 * n))
+            result[f'p{q:g}_ms'] = round(float(min(BUCKET_UPPER_NS[index], maximum)) / 1e6, 3)
+        result['max_ms'] = round(maximum / 1e6, 3)
+        return result
+
+
+class CallbackHistogram(LatencyHistogram):
+    """
+    A LatencyHistogram for the audio callback, which must never wait for a lock
+    or allocate.
+
+    Its one writer stores each duration in a preallocated ring of `slots` and
+    then advances a counter. Readers sort what was added since the last read into
+    the buckets. Only readers take the lock (among themselves). A reader keeps
+    away from the slots the writer may be filling; durations it was too late for
+    are left out and counted as missed.
+    """
+
+    def __init__(self, slots=CALLBACK_SLOTS):
+        self.slots = slots
+        self.ring = np.zeros(slots, dtype=np.int64)
+        self.written = 0  # Durations recorded (only the writer changes it)
+        self.read = 0  # Durations sorted into the buckets or missed (only readers change it)
+        self.missed = 0
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        self.total = self.maximum = 0
+        self.lock = threading.Lock()  # Between readers only
+
+    def record(self, ns):
+        self.ring[self.written % self.slots] = ns
+        self.written += 1
+
+    def merged(self):
+        with self.lock:
+            written = self.written
+            first = max(self.read, written - self.slots // 2)  # Older slots may be overwritten while they are copied
+            self.missed += first - self.read
+            if written > first:
+                values = self.ring[np.arange(first, written) % self.slots]
+                self.counts += bucket_counts(values)
+                self.total += int(values.sum())
+                self.maximum = max(self.maximum, int(values.max()))
+            self.read = written
+            return self.counts.copy(), self.total, self.maximum
+
+
+class Metrics:
+    """
+    Per-stage timers for the hot path and audio callback deadline counters.
+
+    Stages are created on first use. Callers only take timestamps and record
+    durations; they never log.
+
+    Args:
+        sample_rate (int): Output sample rate (to compute the callback deadline).
+        callback_status (dict): The player's counter of callbacks with PortAudio
+            status flags ({'flags': n, ...}), exported as well.
+    """
+
+    def __init__(self, sample_rate, callback_status=None):
+        self.sample_rate = sample_rate
+        self.callback_status = callback_status if callback_status is not None else {'flags': 0}
+        self.stages = {}
+        self.callback = CallbackHistogram()
+        self.deadline_misses = 0  # Callbacks that took longer than their audio lasts
+
+    def stage(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = self.stages.setdefault(name, LatencyHistogram())
+        return hist
+
+    def record(self, name, start_ns):
+        """Records the time since start_ns (from time.perf_counter_ns) for a stage."""
+        hist = self.stages.get(name) or self.stage(name)
+        hist.record(time.perf_counter_ns() - start_ns)
+
+    def callback_done(self, start_ns, frames):
+        """Called at the end of the audio callback."""
+        elapsed = time.perf_counter_ns() - start_ns
+        self.callback.record(elapsed)
+        if elapsed * self.sample_rate > frames * 1_000_000_000:
+            self.deadline_misses += 1
+
+    def summary(self):
+        """Stage and callback figures for status.json."""
+        return {
+            'stages': {name: hist.summary() for name, hist in list(self.stages.items())},
+            'callback': {
+                **self.callback.summary(),
+                'deadline_misses': self.deadline_misses,
+                'missed_records': self.callback.missed,
+                'status_flags': self.callback_status['flags'],
+            },
+        }
+
+    def prometheus(self):
+        """All figures in the Prometheus text exposition format."""
+        lines = [
+            "# HELP streamplayer_stage_seconds Time spent per processing stage.",
+            "# TYPE streamplayer_stage_seconds histogram",
+        ]
+        series = [(f'stage="{name}"', hist) for name, hist in list(self.stages.items())]
+        series.append(('stage="callback"', self.callback))
+        for labels, hist in series:
+            counts, total, _ = hist.merged()
+            cumulative = np.cumsum(counts)
+            for bound in PROMETHEUS_BOUNDS:
+                index = int(np.searchsorted(BUCKET_UPPER_NS, bound * 1e9, side="right")) - 1
+                value = int(cumulative[index]) if index >= 0 else 0
+                lines.append(f'streamplayer_stage_seconds_bucket{{{labels},le="{bound:g}"}} {value}')
+            lines.append(f'streamplayer_stage_seconds_bucket{{{labels},le="+Inf"}} {int(cumulative[-1])}')
+            lines.append(f"streamplayer_stage_seconds_sum{{{labels}}} {total / 1e9:.9f}")
+            lines.append(f"streamplayer_stage_seconds_count{{{labels}}} {int(cumulative[-1])}")
+        for name, help_text, value in (
+            ("streamplayer_callback_deadline_misses_total", "Audio callbacks slower than real time.", self.deadline_misses),
+            ("streamplayer_callback_status_flags_total", "Audio callbacks with PortAudio status flags.", self.callback_status['flags']),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serves metrics.prometheus() on http://host:port/metrics in a background thread.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"📈 Metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,102 @@
+import io
+import glob
+import time
+import struct
+import logging
+from obspy import read, UTCDateTime
+
+SL_RECORD_SIZE = 512
+
+
+def expand_paths(patterns):
+    """
+    Expands glob patterns (for quoted arguments) and keeps plain paths as they are.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def record_info(record):
+    """
+    Reads network, station, channel and start time from a miniSEED fixed header.
+    """
+    station = record[8:13].decode("ascii").strip()
+    channel = record[15:18].decode("ascii").strip()
+    network = record[18:20].decode("ascii").strip()
+    year, doy, hour, minute, second, _, fract = struct.unpack(">HHBBBBH", record[20:30])
+    starttime = UTCDateTime(year=year, julday=doy, hour=hour, minute=minute, second=second,
+                            microsecond=fract * 100)
+    return network, station, channel, starttime
+
+
+def load_records(paths):
+    """
+    Loads miniSEED files and re-packs them into 512-byte records (the SeedLink
+    payload size), sorted by start time across all files. Files that cannot be
+    read are skipped.
+    """
+    records = []
+    for path in paths:
+        try:
+            stream = read(path)
+        except Exception as e:
+            logging.error(f"❌ Cannot read {path}, skipped: {e}")
+            continue
+        for trace in stream:
+            if trace.data.dtype.kind == "i":
+                trace.data = trace.data.astype("int32")
+                encoding = "STEIM2"
+            else:
+                trace.data = trace.data.astype("float32")
+                encoding = "FLOAT32"
+            buf = io.BytesIO()
+            trace.write(buf, format="MSEED", reclen=SL_RECORD_SIZE, encoding=encoding, byteorder=">")
+            data = buf.getvalue()
+            records.extend(data[i:i + SL_RECORD_SIZE] for i in range(0, len(data), SL_RECORD_SIZE))
+    records.sort(key=lambda r: record_info(r)[3])
+    return records
+
+
+def load_traces(patterns):
+    """
+    Loads miniSEED files as the sequence of short traces a SeedLink client would
+    receive: one trace per 512-byte record, in order of start time.
+    """
+    records = load_records(expand_paths(patterns))
+    return [read(io.BytesIO(record), format="MSEED")[0] for record in records]
+
+
+def replay_traces(traces, callbacks, pace="realtime", stop=None):
+    """
+    Feeds traces to per-stream callbacks, like a SeedLink connection would.
+
+    Args:
+        traces (list): Traces in order of start time.
+        callbacks (dict): trace.id -> function called with each trace; other traces are skipped.
+        pace (str): "realtime" hands each trace over when its last sample would have
+            been recorded (relative to the first trace), "fast" as fast as possible.
+        stop (threading.Event): Optional event that ends the replay early.
+
+    Returns:
+        int: The number of traces handed over.
+    """
+    traces = [tr for tr in traces if tr.id in callbacks]
+    if not traces:
+        logging.warning("⚠️ Nothing to replay for the selected streams")
+        return 0
+    wall_start = time.monotonic()
+    data_start = traces[0].stats.endtime
+    count = 0
+    for trace in traces:
+        if stop is not None and stop.is_set():
+            break
+        if pace == "realtime":
+            delay = wall_start + (trace.stats.endtime - data_start) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        callbacks[trace.id](trace)
+        count += 1
+    return count
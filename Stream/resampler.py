@@ -0,0 +1,93 @@
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
+
+DEFAULT_HALF_WIDTH = 16  # Filter half-width in input samples (zero crossings per side)
+
+
+def resample_ratio(fs_in, fs_out):
+    """
+    Returns the resampling ratio as a reduced fraction up/down.
+    """
+    ratio = Fraction(fs_out).limit_denominator(1000) / Fraction(fs_in).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=None)
+def polyphase_table(up, down, half_width=DEFAULT_HALF_WIDTH):
+    """
+    Builds the polyphase table of a Blackman-windowed sinc interpolator.
+
+    Row p holds the taps that produce the output at fractional input position
+    p / up, so that upsampling by `up` is a single matrix product of the input
+    windows with the transposed table. Tables are cached per (up, down) pair.
+
+    Returns:
+        np.ndarray: float32 array of shape (up, taps).
+    """
+    cutoff = min(1.0, up / down)  # Anti-aliasing when decimating
+    half = int(np.ceil(half_width / cutoff))
+    taps = 2 * half
+    k = np.arange(taps) - (half - 1)
+    u = np.arange(up)[:, None] / up - k[None, :]
+    window = np.where(
+        np.abs(u) < half,
+        0.42 + 0.5 * np.cos(np.pi * u / half) + 0.08 * np.cos(2 * np.pi * u / half),
+        0.0,
+    )
+    table = cutoff * np.sinc(cutoff * u) * window
+    return table.astype(np.float32)
+
+
+class StreamingResampler:
+    """
+    Resamples consecutive blocks of one stream as if they were one continuous signal.
+
+    The last `taps - 1` input samples are kept between calls, so there are no edge
+    transients at block boundaries. The output lags the input by half a filter
+    length (`half_width` input samples), and each call returns exactly the output
+    samples that became computable with the new block.
+    """
+
+    def __init__(self, fs_in, fs_out, half_width=DEFAULT_HALF_WIDTH):
+        self.fs_in = fs_in
+        self.fs_out = fs_out
+        self.up, self.down = resample_ratio(fs_in, fs_out)
+        self.table_t = np.ascontiguousarray(polyphase_table(self.up, self.down, half_width).T)
+        self.taps = self.table_t.shape[0]
+        self.delay = (self.taps // 2) / fs_in  # Output lag in seconds
+        self.history = None
+        self.phase_count = 0  # Upsampled (rate fs_in * up) samples produced so far
+
+    def reset(self):
+        """Forgets the filter state, e.g. after a gap in the stream."""
+        self.history = None
+        self.phase_count = 0
+
+    def process(self, block):
+        """
+        Resamples the next block of the stream.
+
+        Args:
+            block (np.ndarray): 1-D float32 input samples at fs_in.
+
+        Returns:
+            np.ndarray: 1-D float32 output samples at fs_out.
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if len(block) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.history is None:
+            # Extend the first sample backwards instead of starting from zeros
+            self.history = np.full(self.taps - 1, block[0], dtype=np.float32)
+
+        extended = np.concatenate((self.history, block))
+        self.history = extended[-(self.taps - 1):]
+        windows = np.lib.stride_tricks.sliding_window_view(extended, self.taps)
+        upsampled = (windows @ self.table_t).ravel()
+
+        if self.down == 1:
+            return upsampled
+        start = (-self.phase_count) % self.down
+        self.phase_count += len(upsampled)
+        return upsampled[start::self.down]
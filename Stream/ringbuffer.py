@@ -0,0 +1,407 @@
+import time
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    A fixed-capacity float32 ring buffer for one producer thread and one consumer
+    (the audio callback).
+
+    The buffer is allocated once. The producer only advances `write_count` and the
+    consumer only advances `read_count`; both are plain integers that count samples
+    since start, so no lock is needed (each index has exactly one writer).
+
+    With a `lead` set (by the producer, see set_lead()), a consumer that has run
+    the buffer dry reads nothing until `lead` frames are buffered again, so
+    playback resumes with the same head start as at startup instead of running
+    dry again at every late block.
+    """
+
+    def __init__(self, capacity, channels=1, lead=0):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.write_count = 0
+        self.read_count = 0
+        self.lead = 0
+        self.set_lead(lead)
+        self.priming = False  # Ran dry, waiting for `lead` frames (only the consumer changes it)
+
+    def set_lead(self, frames):
+        """Sets the frames to buffer again after running dry (at most half the capacity)."""
+        self.lead = min(int(frames), self.capacity // 2)
+
+    def available(self):
+        """Number of frames ready to be read."""
+        return self.write_count - self.read_count
+
+    def min_available(self):
+        """Same as available() (there is only one channel), as in MultiChannelRingBuffer."""
+        return self.available()
+
+    def free(self):
+        """Number of frames that can be written without overwriting unread data."""
+        return self.capacity - (self.write_count - self.read_count)
+
+    def write(self, data):
+        """
+        Copies as many frames of `data` as fit into the buffer (producer side).
+
+        Args:
+            data (np.ndarray): Frames as shape (n,) for mono or (n, channels).
+
+        Returns:
+            int: The number of frames written.
+        """
+        if data.ndim == 1:
+            data = data[:, None]
+        n = min(len(data), self.free())
+        if n <= 0:
+            return 0
+        start = self.write_count % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        if n > first:
+            self.buffer[:n - first] = data[first:n]
+        self.write_count += n
+        return n
+
+    def write_all(self, data, poll_interval=0.05):
+        """
+        Writes all of `data`, waiting for the consumer to free space when the buffer is full.
+        """
+        offset = 0
+        while offset < len(data):
+            offset += self.write(data[offset:])
+            if offset < len(data):
+                time.sleep(poll_interval)
+
+    def read_into(self, out):
+        """
+        Copies up to len(out) frames into `out` (consumer side).
+        Uses at most two slice copies and allocates nothing.
+
+        Returns:
+            int: The number of frames copied. Frames after that are left untouched.
+        """
+        available = self.write_count - self.read_count
+        if self.priming:
+            if available < self.lead:
+                return 0
+            self.priming = False
+        n = min(len(out), available)
+        if n < len(out) and self.lead:
+            self.priming = True
+        if n <= 0:
+            return 0
+        start = self.read_count % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if n > first:
+            out[first:n] = self.buffer[:n - first]
+        self.read_count += n
+        return n
+
+
+class MultiChannelRingBuffer:
+    """
+    A fixed-capacity float32 ring buffer with one producer per channel and a single
+    consumer that reads all channels at once.
+
+    Every channel has its own write counter, but there is only one shared read
+    counter, so all channels are played on the same timeline. The consumer never
+    writes to the buffer: frames past a channel's write counter (taken before the
+    copy) read as silence, so a producer's frames can never be cleared under it.
+    A producer that has fallen behind the read position is moved ahead to its
+    channel's `lead` frames past it (see set_lead()), which gives it the same head
+    start as at startup; it clears the frames it skips, so they do not replay audio
+    from the previous lap.
+    """
+
+    def __init__(self, capacity, channels, lead=0):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.leads = np.zeros(channels, dtype=np.int64)
+        for channel in range(channels):
+            self.set_lead(lead, channel)
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.write_counts = np.zeros(channels, dtype=np.int64)
+        self.read_count = 0
+        self.short = np.zeros(channels, dtype=np.int64)  # Missing frames of the last read
+        self.gap_frames = np.zeros(channels, dtype=np.int64)  # Missing frames since start
+        self.valid = np.zeros(channels, dtype=np.int64)  # Frames of the last read that were written
+        self.frame_numbers = np.zeros((0, 1), dtype=np.int64)  # 0..n-1 as a column, grown on the first read
+        self.missing = np.zeros((0, channels), dtype=bool)  # Frames of the last read that were not written
+
+    def available(self, channel=None):
+        """
+        Number of frames ready to be read on a channel, or on the best-filled
+        channel if no channel is given.
+        """
+        if channel is None:
+            return max(0, int(self.write_counts.max()) - self.read_count)
+        return max(0, int(self.write_counts[channel]) - self.read_count)
+
+    def set_lead(self, frames, channel):
+        """Sets how far ahead a channel that fell behind resumes (at most half the capacity)."""
+        self.leads[channel] = min(int(frames), self.capacity // 2)
+
+    def min_available(self):
+        """Number of frames ready to be read on the least-filled channel."""
+        return max(0, int(self.write_counts.min()) - self.read_count)
+
+    def write(self, data, channel):
+        """
+        Copies as many frames of the 1-D `data` as fit into one channel (producer side).
+
+        Returns:
+            int: The number of frames written.
+        """
+        write_count = int(self.write_counts[channel])
+        read_count = self.read_count
+        if write_count < read_count:
+            lead = int(self.leads[channel])
+            write_count = read_count + lead
+            self.clear(read_count, lead, channel)
+        n = min(len(data), self.capacity - (write_count - self.read_count))
+        if n <= 0:
+            self.write_counts[channel] = write_count
+            return 0
+        start = write_count % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first, channel] = data[:first]
+        if n > first:
+            self.buffer[:n - first, channel] = data[first:n]
+        self.write_counts[channel] = write_count + n
+        return n
+
+    def write_all(self, data, channel, poll_interval=0.05):
+        """
+        Writes all of `data` to one channel, waiting for the consumer to free space.
+        """
+        offset = 0
+        while offset < len(data):
+            offset += self.write(data[offset:], channel)
+            if offset < len(data):
+                time.sleep(poll_interval)
+
+    def clear(self, count, n, channel):
+        """Zeroes n frames of one channel, starting at absolute frame `count`."""
+        start = count % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first, channel] = 0.0
+        if n > first:
+            self.buffer[:n - first, channel] = 0.0
+
+    def read_into(self, out):
+        """
+        Copies len(out) frames of every channel into `out` (shape frames x channels)
+        with at most two slice copies, silences the frames a channel had not written
+        when the read started, and updates the per-channel gap counters.
+        """
+        n = len(out)
+        np.subtract(self.read_count + n, self.write_counts, out=self.short)  # Before the copy: later writes are too late
+        np.clip(self.short, 0, n, out=self.short)
+        start = self.read_count % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if n > first:
+            out[first:] = self.buffer[:n - first]
+        if self.short.any():
+            if n > len(self.frame_numbers):  # Only on the first read (or a larger block size)
+                self.frame_numbers = np.arange(n, dtype=np.int64)[:, None]
+                self.missing = np.zeros((n, self.channels), dtype=bool)
+            np.subtract(n, self.short, out=self.valid)
+            np.greater_equal(self.frame_numbers[:n], self.valid, out=self.missing[:n])
+            np.copyto(out, 0.0, where=self.missing[:n])
+        self.gap_frames += self.short
+        self.read_count += n
+        return n
+
+
+UNDERRUN_STRATEGIES = ("silence", "hold-last", "crossfade-loop")
+
+
+def write_circular(history, pos, data):
+    """
+    Writes `data` into the circular buffer `history` at `pos` (keeping only its
+    last len(history) frames) and returns the position after it.
+    """
+    size = len(history)
+    if len(data) > size:
+        data = data[-size:]
+    k = min(len(data), size - pos)
+    history[pos:pos + k] = data[:k]
+    if len(data) > k:
+        history[:len(data) - k] = data[k:]
+    return (pos + len(data)) % size
+
+
+class UnderrunConcealer:
+    """
+    Fills the part of an audio callback buffer that the ring buffer could not supply,
+    without blocking and without allocating.
+
+    Strategies:
+        silence:        fade to zero.
+        hold-last:      hold the last played frame.
+        crossfade-loop: loop the most recently played audio, with a crossfaded seam.
+
+    Entering a gap fades from the last played frame into the concealment signal,
+    and when data resumes it fades from the concealment signal back into the data.
+
+    With remember=False, the caller keeps `history` and `history_pos` up to date
+    (see MultiChannelConcealer).
+    """
+
+    def __init__(self, strategy, channels, sample_rate, fade_ms=20, loop_ms=500, remember=True):
+        if strategy not in UNDERRUN_STRATEGIES:
+            raise ValueError(f"Unknown underrun strategy: {strategy}")
+        self.strategy = strategy
+        self.remembers = remember
+        self.fade_len = max(1, int(sample_rate * fade_ms / 1000))
+        self.ramp = np.linspace(0.0, 1.0, self.fade_len, dtype=np.float32)[:, None]
+        self.scratch = np.zeros((self.fade_len, channels), dtype=np.float32)
+        self.last = np.zeros(channels, dtype=np.float32)
+        self.in_gap = False
+        self.fade_out_pos = self.fade_len  # position in the fade into concealment
+        self.fade_in_pos = self.fade_len  # position in the fade back into data
+
+        # Recent output history and the loop built from it (crossfade-loop only)
+        self.loop_len = 0
+        if strategy == "crossfade-loop":
+            self.loop_len = max(2 * self.fade_len + 1, int(sample_rate * loop_ms / 1000))
+            self.history = np.zeros((self.loop_len, channels), dtype=np.float32)
+            self.history_pos = 0
+            self.loop = np.zeros((self.loop_len, channels), dtype=np.float32)
+            self.loop_pos = self.fade_len
+
+    def process(self, out, n):
+        """
+        Post-processes a callback buffer whose first n frames came from the ring buffer.
+        """
+        frames = len(out)
+        if n > 0:
+            if self.in_gap:
+                self.in_gap = False
+                self.fade_in_pos = 0
+            if self.fade_in_pos < self.fade_len:
+                k = min(n, self.fade_len - self.fade_in_pos)
+                conceal = self.scratch[:k]
+                self.fill(conceal)
+                seg = out[:k]
+                seg -= conceal
+                seg *= self.ramp[self.fade_in_pos:self.fade_in_pos + k]
+                seg += conceal
+                self.fade_in_pos += k
+            self.last[:] = out[n - 1]
+            if self.loop_len and self.remembers:
+                self.remember(out[:n])
+
+        if n < frames:
+            if not self.in_gap:
+                self.in_gap = True
+                self.fade_out_pos = 0
+                if self.loop_len:
+                    self.build_loop()
+            seg = out[n:]
+            self.fill(seg)
+            if self.fade_out_pos < self.fade_len:
+                k = min(len(seg), self.fade_len - self.fade_out_pos)
+                head = seg[:k]
+                head -= self.last
+                head *= self.ramp[self.fade_out_pos:self.fade_out_pos + k]
+                head += self.last
+                self.fade_out_pos += k
+
+    def fill(self, seg):
+        """Writes the concealment signal for the current strategy into seg."""
+        if self.strategy == "silence":
+            seg.fill(0.0)
+        elif self.strategy == "hold-last":
+            seg[:] = self.last
+        else:
+            i = 0
+            while i < len(seg):
+                k = min(len(seg) - i, self.loop_len - self.loop_pos)
+                seg[i:i + k] = self.loop[self.loop_pos:self.loop_pos + k]
+                i += k
+                self.loop_pos += k
+                if self.loop_pos >= self.loop_len:
+                    self.loop_pos = self.fade_len
+
+    def remember(self, data):
+        """Keeps the last loop_len played frames in the circular history."""
+        self.history_pos = write_circular(self.history, self.history_pos, data)
+
+    def build_loop(self):
+        """
+        Unrolls the history into the loop buffer and crossfades its tail into its head,
+        so that playing loop[fade_len:] repeatedly has no seam.
+        """
+        tail = self.loop_len - self.history_pos
+        self.loop[:tail] = self.history[self.history_pos:]
+        self.loop[tail:] = self.history[:self.history_pos]
+        x = self.fade_len
+        np.subtract(self.loop[:x], self.loop[-x:], out=self.scratch)
+        self.scratch *= self.ramp
+        self.loop[-x:] += self.scratch
+        self.loop_pos = x
+
+
+class MultiChannelConcealer:
+    """
+    Conceals the gaps of every channel of a MultiChannelRingBuffer separately,
+    with one single-channel UnderrunConcealer per channel, since stations run out
+    of data independently.
+
+    Only channels that are short of data, in a gap or fading back in go through
+    their concealer. For all others, the last frame (and for crossfade-loop the
+    recent history) is kept with one vectorized copy per callback.
+    """
+
+    def __init__(self, strategy, channels, sample_rate, fade_ms=20, loop_ms=500):
+        self.concealers = [UnderrunConcealer(strategy, 1, sample_rate, fade_ms, loop_ms, remember=False)
+                           for _ in range(channels)]
+        self.last = np.zeros(channels, dtype=np.float32)
+        self.busy = np.zeros(channels, dtype=bool)  # Handled by their concealer in this callback
+        self.idle = np.zeros(channels, dtype=bool)
+        self.active = np.zeros(channels, dtype=bool)  # In a gap or fading back in
+        self.in_gap = np.zeros(channels, dtype=bool)  # The last callback ended short of data
+        self.short_now = np.zeros(channels, dtype=bool)
+        self.entering = np.zeros(channels, dtype=bool)
+        self.loop_len = self.concealers[0].loop_len
+        if self.loop_len:
+            self.history = np.zeros((self.loop_len, channels), dtype=np.float32)
+            self.history_pos = 0
+        for i, concealer in enumerate(self.concealers):
+            concealer.last = self.last[i:i + 1]  # Views: the vectorized copies below update them too
+            if self.loop_len:
+                concealer.history = self.history[:, i:i + 1]
+
+    def process(self, out, short):
+        """
+        Post-processes a callback buffer (frames x channels) whose channel i is
+        missing its last short[i] frames (MultiChannelRingBuffer.short).
+
+        Returns:
+            int: The number of channels that ran out of data in this callback
+            (new gaps, like UnderrunConcealer.in_gap turning True).
+        """
+        frames = len(out)
+        np.greater(short, 0, out=self.short_now)
+        np.greater(self.short_now, self.in_gap, out=self.entering)
+        np.copyto(self.in_gap, self.short_now)
+        np.logical_or(short, self.active, out=self.busy)
+        if self.busy.any():
+            for i, concealer in enumerate(self.concealers):
+                if self.busy[i]:
+                    if self.loop_len:
+                        concealer.history_pos = self.history_pos
+                    concealer.process(out[:, i:i + 1], frames - int(short[i]))
+                    self.active[i] = concealer.in_gap or concealer.fade_in_pos < concealer.fade_len
+        np.logical_not(self.busy, out=self.idle)
+        np.copyto(self.last, out[-1], where=self.idle)
+        if self.loop_len:
+            self.history_pos = write_circular(self.history, self.history_pos, out)
+        return int(np.count_nonzero(self.entering))
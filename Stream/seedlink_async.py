@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from obspy.clients.seedlink.slpacket import SLPacket
+from seedlink_pool import matches_selector, record_stream
+
+# ----------------------------
+# Default configuration
+DEFAULT_QUEUE_SIZE = 64  # Traces buffered per stream before backpressure kicks in
+DEFAULT_OVERFLOW = "block"  # "block" (stop reading the socket) or "drop-oldest"
+DEFAULT_BACKOFF_INITIAL = 1.0  # Seconds before the first reconnect attempt
+DEFAULT_BACKOFF_MAX = 60.0  # Upper limit for the reconnect delay
+DEFAULT_NET_TIMEOUT = 120.0  # Reconnect if nothing arrives for this long
+DEFAULT_PORT = 18000
+SL_HEADER_SIZE = 8
+SL_RECORD_SIZE = 512
+# ----------------------------
+
+
+class SeedLinkProtocolError(Exception):
+    """
+    Raised when a SeedLink server answers with something unexpected.
+    """
+    pass
+
+
+class SeedLinkCommandRejected(SeedLinkProtocolError):
+    """
+    Raised when a SeedLink server answers a command with something other than OK
+    (e.g. ERROR for a station it does not serve).
+    """
+    pass
+
+
+def parse_server(server):
+    """
+    Splits "host:port" (port optional) into host and port.
+    """
+    host, sep, port = server.rpartition(":")
+    if not sep:
+        return server, DEFAULT_PORT
+    return host, int(port)
+
+
+class TraceStream:
+    """
+    Async iterator over the traces of one selected stream.
+
+    Traces are buffered in a bounded queue. With overflow="block" a full queue makes
+    the session stop reading from its socket until the consumer catches up; with
+    overflow="drop-oldest" the oldest buffered trace is discarded instead.
+    """
+
+    def __init__(self, server, network, station, channel, maxsize=DEFAULT_QUEUE_SIZE, overflow=DEFAULT_OVERFLOW):
+        self.server = server
+        self.selector = (network, station, channel)
+        self.queue = asyncio.Queue(maxsize)
+        self.overflow = overflow
+        self.received = 0
+        self.dropped = 0
+
+    async def put(self, trace):
+        self.received += 1
+        if self.overflow == "drop-oldest" and self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        await self.queue.put(trace)
+
+    def close(self):
+        """Ends the iteration once the buffered traces have been consumed."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        trace = await self.queue.get()
+        if trace is None:
+            raise StopAsyncIteration
+        return trace
+
+
+class AsyncSeedLinkEngine:
+    """
+    Runs all SeedLink sessions in one asyncio event loop.
+
+    Streams are subscribed per server before run() is called. There is one session
+    (TCP connection) per server, and it reconnects with exponential backoff. On a
+    reconnect it resumes every station after the last sequence number received.
+
+    If `on_event` is set, it is called in the event loop as on_event(server, kind,
+    stream) for "bad_packet" (stream is (network, station, channel) read from the
+    record header, or None) and "reconnect" (stream is None) events.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, overflow=DEFAULT_OVERFLOW,
+                 backoff_initial=DEFAULT_BACKOFF_INITIAL, backoff_max=DEFAULT_BACKOFF_MAX,
+                 net_timeout=DEFAULT_NET_TIMEOUT, on_event=None):
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.net_timeout = net_timeout
+        self.on_event = on_event
+        self.streams = {}  # server -> list of TraceStream
+        self.status = {}  # server -> connection counters
+        self.tasks = []
+
+    def subscribe(self, server, network, station, channel):
+        """
+        Selects a stream and returns the TraceStream to iterate over.
+        """
+        stream = TraceStream(server, network, station, channel, self.queue_size, self.overflow)
+        self.streams.setdefault(server, []).append(stream)
+        self.status.setdefault(server, {'connected': False, 'reconnects': 0, 'packets': 0, 'bad_packets': 0, 'rejected': []})
+        return stream
+
+    async def run(self):
+        """
+        Runs one session per server until stop() is called.
+        """
+        self.tasks = [asyncio.create_task(self.session(server, streams)) for server, streams in self.streams.items()]
+        try:
+            await asyncio.gather(*self.tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for streams in self.streams.values():
+                for stream in streams:
+                    stream.close()
+
+    def stop(self):
+        """Cancels all sessions (call from inside the event loop)."""
+        for task in self.tasks:
+            task.cancel()
+
+    async def session(self, server, streams):
+        """
+        Keeps one server connection alive: connect, handshake, read, and on any
+        failure wait with exponential backoff and try again.
+        """
+        host, port = parse_server(server)
+        status = self.status[server]
+        seqnums = {}  # (network, station) -> last sequence number received
+        attempt = 0
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.net_timeout)
+                accepted = await self.handshake(reader, writer, streams, seqnums, server, status)
+                status['connected'] = True
+                logging.info(f"🌍 {server}: {accepted} stream(s) connected")
+                routes = {}
+                while True:
+                    trace, seqnum = await self.read_packet(reader, server, status)
+                    if trace is None:
+                        continue
+                    attempt = 0
+                    seqnums[(trace.stats.network, trace.stats.station)] = seqnum
+                    targets = routes.get(trace.id)
+                    if targets is None:
+                        targets = routes[trace.id] = [s for s in streams if matches_selector(trace.stats, *s.selector)]
+                    for stream in targets:
+                        await stream.put(trace)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, SeedLinkProtocolError) as e:
+                logging.warning(f"⚠️ SeedLink session {server} lost: {e!r}")
+            finally:
+                status['connected'] = False
+                if writer is not None:
+                    writer.close()
+
+            delay = min(self.backoff_max, self.backoff_initial * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            attempt += 1
+            status['reconnects'] += 1
+            if self.on_event is not None:
+                self.on_event(server, "reconnect", None)
+            logging.info(f"🔄 Reconnecting to {server} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def command(self, reader, writer, line, expect_ok=True):
+        """Sends one SeedLink command and checks for OK."""
+        writer.write(line.encode("ascii") + b"\r\n")
+        await writer.drain()
+        if expect_ok:
+            response = (await asyncio.wait_for(reader.readline(), self.net_timeout)).strip()
+            if response != b"OK":
+                raise SeedLinkCommandRejected(f"{line!r} answered with {response!r}")
+
+    async def handshake(self, reader, writer, streams, seqnums, server, status):
+        """
+        HELLO, then STATION/SELECT/DATA for every station (multi-station mode), then END.
+
+        A station the server rejects (or whose selectors it all rejects) is left out
+        of this session, and the others are streamed; it is tried again on the next
+        reconnect. Only if every station is rejected does the handshake fail.
+
+        Returns:
+            int: The number of streams the server accepted.
+        """
+        writer.write(b"HELLO\r\n")
+        await writer.drain()
+        for _ in range(2):  # Server version and organization
+            await asyncio.wait_for(reader.readline(), self.net_timeout)
+
+        stations = {}
+        for stream in streams:
+            network, station, channel = stream.selector
+            stations.setdefault((network, station), []).append(channel)
+        accepted = 0
+        rejected = []
+        for (network, station), channels in stations.items():
+            try:
+                await self.command(reader, writer, f"STATION {station} {network}")
+            except SeedLinkCommandRejected as e:
+                logging.error(f"❌ {server}: station {network}.{station} rejected, skipped: {e}")
+                rejected.append(f"{network}.{station}")
+                continue
+            selected = 0
+            for channel in dict.fromkeys(channels):
+                try:
+                    await self.command(reader, writer, f"SELECT {channel}")
+                    selected += channels.count(channel)
+                except SeedLinkCommandRejected as e:
+                    logging.error(f"❌ {server}: {network}.{station} selector {channel} rejected, skipped: {e}")
+                    rejected.append(f"{network}.{station}.{channel}")
+            if not selected:
+                continue  # Without any selector, DATA would request every channel of the station
+            seqnum = seqnums.get((network, station))
+            await self.command(reader, writer, "DATA" if seqnum is None else f"DATA {(seqnum + 1) & 0xFFFFFF:06X}")
+            accepted += selected
+        status['rejected'] = rejected
+        if not accepted:
+            raise SeedLinkProtocolError(f"no station accepted ({', '.join(rejected)})")
+        await self.command(reader, writer, "END", expect_ok=False)
+        return accepted
+
+    async def read_packet(self, reader, server, status):
+        """
+        Reads one SeedLink packet.
+
+        Returns:
+            tuple: (trace, sequence number), or (None, None) for INFO and undecodable packets.
+        """
+        header = await asyncio.wait_for(reader.readexactly(SL_HEADER_SIZE), self.net_timeout)
+        if header.startswith(SLPacket.INFOSIGNATURE):
+            await asyncio.wait_for(reader.readexactly(SL_RECORD_SIZE), self.net_timeout)
+            return None, None
+        if not header.startswith(SLPacket.SIGNATURE):
+            raise SeedLinkProtocolError(f"unexpected data from server: {header!r}")
+        record = await asyncio.wait_for(reader.readexactly(SL_RECORD_SIZE), self.net_timeout)
+        status['packets'] += 1
+        packet = SLPacket(header + record, 0)
+        try:
+            return packet.get_trace(), packet.get_sequence_number()
+        except Exception as e:
+            status['bad_packets'] += 1
+            logging.warning(f"⚠️ bad packet {header!r}: {e}")
+            if self.on_event is not None:
+                self.on_event(server, "bad_packet", record_stream(record))
+            return None, None
+
+
+def start_async_ingest(stations, callbacks, queue_size=DEFAULT_QUEUE_SIZE, overflow=DEFAULT_OVERFLOW, on_event=None):
+    """
+    Drop-in alternative to seedlink_pool.start_shared_clients: runs all SeedLink
+    sessions in one event loop in a background thread.
+
+    Each station's callback runs in a worker thread, one trace at a time, so the
+    per-stream order is kept. While a callback is busy, that stream's queue fills
+    up and backpressure is applied.
+
+    Returns:
+        AsyncSeedLinkEngine: The engine (its status holds per-server counters).
+    """
+    engine = AsyncSeedLinkEngine(queue_size=queue_size, overflow=overflow, on_event=on_event)
+    subscriptions = [
+        (engine.subscribe(conf["server"], conf["network"], conf["station"], conf["channel"]), sid, callbacks[sid])
+        for sid, conf in stations.items()
+    ]
+
+    async def consume(stream, sid, callback, executor):
+        loop = asyncio.get_running_loop()
+        async for trace in stream:
+            try:
+                await loop.run_in_executor(executor, callback, trace)
+            except Exception as e:
+                logging.error(f"Error handling data of station {sid}: {e}")
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(subscriptions)))) as executor:
+            await asyncio.gather(
+                engine.run(),
+                *(consume(stream, sid, callback, executor) for stream, sid, callback in subscriptions),
+            )
+
+    threading.Thread(target=lambda: asyncio.run(main()), daemon=True).start()
+    return engine
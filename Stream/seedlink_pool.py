@@ -0,0 +1,189 @@
+import logging
+import threading
+from fnmatch import fnmatchcase
+from obspy.clients.seedlink.easyseedlink import EasySeedLinkClient
+from obspy.clients.seedlink.slpacket import SLPacket
+
+SEEDLINK_LOGGER = "obspy.clients.seedlink"  # Where obspy's SeedLinkConnection logs bad packets and reconnects
+
+clients_by_thread = {}  # Thread ident -> the SharedSeedLinkClient it runs
+
+
+def group_by_server(stations):
+    """
+    Groups station configurations by SeedLink server.
+
+    Args:
+        stations (dict): Station ID -> configuration with "server", "network", "station" and "channel".
+
+    Returns:
+        dict: Server -> list of (station ID, configuration), in the original order.
+    """
+    groups = {}
+    for sid, conf in stations.items():
+        groups.setdefault(conf["server"], []).append((sid, conf))
+    return groups
+
+
+def matches_selector(stats, network, station, channel):
+    """Checks whether trace stats match a (network, station, channel) selector (wildcards allowed)."""
+    return (fnmatchcase(stats.network, network)
+            and fnmatchcase(stats.station, station)
+            and fnmatchcase(stats.channel, channel))
+
+
+def record_stream(record):
+    """
+    Reads (network, station, channel) from the fixed header of a miniSEED record
+    without decoding the rest, so it also works for records that fail to decode.
+
+    Returns:
+        tuple: (network, station, channel), or None if the header is unreadable.
+    """
+    try:
+        station = bytes(record[8:13]).decode("ascii").strip()
+        channel = bytes(record[15:18]).decode("ascii").strip()
+        network = bytes(record[18:20]).decode("ascii").strip()
+    except UnicodeDecodeError:
+        return None
+    if not (station and channel and network):
+        return None
+    return network, station, channel
+
+
+class ConnectionEventHandler(logging.Handler):
+    """
+    Turns the "bad packet" and "reconnecting" messages of obspy's SeedLinkConnection
+    into events of the connection they come from.
+
+    obspy logs them from the thread that runs the connection, so the thread ident
+    finds the client, and the packet that failed is still at the send pointer of
+    its buffer. Records are not formatted and no lock is taken, so an error storm
+    on one server does not hold up the other connections.
+    """
+
+    def handle(self, record):
+        # Skips Handler.handle(), which would serialize all threads on the handler lock
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        client = clients_by_thread.get(record.thread)
+        if client is None or client.on_event is None or not isinstance(record.msg, str):
+            return
+        if record.msg.startswith("bad packet"):
+            state = client.conn.state
+            start = state.sendptr + SLPacket.SLHEADSIZE
+            client.on_event(client.server, "bad_packet", record_stream(state.databuf[start:start + SLPacket.SLRECSIZE]))
+        elif "reconnecting" in record.msg:
+            client.on_event(client.server, "reconnect", None)
+
+
+def install_event_handler():
+    """Adds the ConnectionEventHandler to obspy's SeedLink logger (once)."""
+    logger = logging.getLogger(SEEDLINK_LOGGER)
+    if not any(isinstance(h, ConnectionEventHandler) for h in logger.handlers):
+        logger.addHandler(ConnectionEventHandler())
+    if logger.getEffectiveLevel() > logging.WARNING:
+        logger.setLevel(logging.WARNING)  # Reconnects are logged as warnings
+
+
+class SharedSeedLinkClient(EasySeedLinkClient):
+    """
+    One SeedLink connection that carries all selected streams of a server.
+
+    Consumers register a callback per stream; incoming traces are routed to them by
+    trace.id. The route for each trace.id is resolved once and then looked up directly.
+
+    Args:
+        server (str): SeedLink server, e.g. "geofon.gfz.de:18000".
+        on_event (callable): If set, called as on_event(server, kind, stream) for
+            "bad_packet" (stream is (network, station, channel) or None) and
+            "reconnect" (stream is None) events of this connection.
+    """
+
+    def __init__(self, server, on_event=None):
+        super().__init__(server)
+        self.server = server
+        self.on_event = on_event
+        self.consumers = {}  # (network, station, channel) selector -> list of callbacks
+        self.routes = {}  # trace.id -> list of callbacks
+
+    def add_consumer(self, network, station, channel, on_data):
+        """
+        Selects a stream on this connection (once) and registers a callback for its traces.
+        """
+        key = (network, station, channel)
+        if key not in self.consumers:
+            self.select_stream(network, station, channel)
+            self.consumers[key] = []
+        self.consumers[key].append(on_data)
+        self.routes.clear()
+
+    def resolve(self, trace):
+        """Finds the callbacks whose selector matches the trace (wildcards allowed)."""
+        callbacks = []
+        for selector, consumer_callbacks in self.consumers.items():
+            if matches_selector(trace.stats, *selector):
+                callbacks.extend(consumer_callbacks)
+        if not callbacks:
+            logging.warning(f"⚠️ No consumer for {trace.id} on {self.server}, ignoring it")
+        return callbacks
+
+    def on_data(self, trace):
+        callbacks = self.routes.get(trace.id)
+        if callbacks is None:
+            callbacks = self.routes[trace.id] = self.resolve(trace)
+        for callback in callbacks:
+            # One failing consumer must not take down the other streams on this connection
+            try:
+                callback(trace)
+            except Exception as e:
+                logging.error(f"Error handling {trace.id}: {e}")
+
+
+def run_shared_client(server, consumers, on_event=None):
+    """
+    Connects to one server, selects all streams of its consumers and runs the connection.
+
+    Args:
+        server (str): SeedLink server, e.g. "geofon.gfz.de:18000".
+        consumers (list): (configuration, callback) pairs for the streams on this server.
+        on_event (callable): Error event callback, see SharedSeedLinkClient.
+    """
+    thread_id = threading.get_ident()
+    try:
+        client = SharedSeedLinkClient(server, on_event)
+        for conf, on_data in consumers:
+            client.add_consumer(conf["network"], conf["station"], conf["channel"], on_data)
+        logging.info(f"🌍 {server}: {len(client.consumers)} stream(s) on one connection")
+        clients_by_thread[thread_id] = client
+        client.run()
+    except Exception as e:
+        logging.error(f"SeedLink connection to {server} failed: {e}")
+    finally:
+        clients_by_thread.pop(thread_id, None)
+
+
+def start_shared_clients(stations, callbacks, on_event=None):
+    """
+    Starts one SeedLink connection (and thread) per distinct server.
+
+    Args:
+        stations (dict): Station ID -> configuration.
+        callbacks (dict): Station ID -> function called with each trace of that station.
+        on_event (callable): If set, receives the bad packet and reconnect events of
+            every connection, see SharedSeedLinkClient.
+
+    Returns:
+        list: The started threads.
+    """
+    if on_event is not None:
+        install_event_handler()
+    threads = []
+    for server, entries in group_by_server(stations).items():
+        consumers = [(conf, callbacks[sid]) for sid, conf in entries]
+        thread = threading.Thread(target=run_shared_client, args=(server, consumers, on_event), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
@@ -1,19 +1,33 @@
+import os
 import json
+import argparse
 import threading
 import time
 import logging
-from datetime import datetime, timedelta
-from obspy.clients.seedlink.easyseedlink import EasySeedLinkClient
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+import numpy as np
 from obspy import UTCDateTime
 from rich.console import Console
 from rich.table import Table
 from rich.live import Live
+from seedlink_pool import start_shared_clients
+from seedlink_async import start_async_ingest
+from health_store import HealthStore, HEALTH_DB
+from status_channel import StatusPublisher, parse_osc_target
 
 STATIONS_FILE = "stations.json"
 REPORT_FILE = "station_monitor_report.json"
+STATUS_SOCKET = "station_monitor.sock"  # Unix socket that pushes report changes to statusviewer.py
+BLOCK_WINDOW_SECONDS = 600  # "Blocks 10min"
+DATA_WINDOW_SECONDS = 3600  # "Data 60min"
+TIMEOUT_SECONDS = 60  # A station without data for this long counts as disconnected
+HISTORY_INTERVAL_SECONDS = 60  # One row per station and minute in the health history
+PRUNE_INTERVAL_SECONDS = 3600
 
 # In-memory structure for station info
 station_stats = {}
+unattributed_bad_packets = {}  # Server -> bad packets whose stream could not be read
 
 # Lock for thread-safe writing
 lock = threading.Lock()
@@ -22,74 +36,229 @@ console = Console()
 # Track script start time for uptime display
 script_start_time = datetime.utcnow()
 
-# Log handler to catch "bad packet" messages
-class BadPacketCounter(logging.Handler):
-    def emit(self, record):
-        msg = self.format(record)
-        if "bad packet" in msg:
-            with lock:
-                for sid, s in station_stats.items():
-                    if s["code"] in msg or s["server"] in msg:
-                        s["bad_packets"] += 1
-                        break
-
-# Attach handler to obspy logger
-logger = logging.getLogger("obspy")
-logger.setLevel(logging.ERROR)
-logger.addHandler(BadPacketCounter())
-
-class MonitorClient(EasySeedLinkClient):
+class RollingWindow:
+    """
+    Sum of values over the last `seconds` seconds, in one bucket per second.
+
+    The buckets are a fixed NumPy array used as a ring. Adding a value and reading
+    the sum are O(1) (amortized: buckets that leave the window are cleared as time
+    moves on).
+    """
+    __slots__ = ("buckets", "now", "total")
+
+    def __init__(self, seconds):
+        self.buckets = np.zeros(seconds, dtype=np.float64)
+        self.now = None  # Latest second (Unix time) the buckets are up to date with
+        self.total = 0.0
+
+    def advance(self, second):
+        if self.now is None:
+            self.now = second
+            return
+        if second <= self.now:
+            return
+        size = len(self.buckets)
+        if second - self.now >= size:
+            self.buckets.fill(0.0)
+            self.total = 0.0
+        else:
+            leaving = np.arange(self.now + 1, second + 1) % size  # Buckets last used `size` seconds ago
+            self.total -= self.buckets[leaving].sum()
+            self.buckets[leaving] = 0.0
+        self.now = second
+
+    def add(self, second, value):
+        self.advance(second)
+        self.buckets[second % len(self.buckets)] += value
+        self.total += value
+
+    def sum(self, second):
+        self.advance(second)
+        return max(self.total, 0.0)
+
+
+class StationStats:
+    """
+    Counters of one station. Everything is a fixed-size aggregate, so memory does
+    not grow with the number of packets.
+    """
+    __slots__ = ("name", "code", "server", "connected", "sample_rate", "min_samples", "max_samples",
+                 "blocks", "data_seconds", "timeouts", "last_data_time", "bad_packets", "reconnects",
+                 "total_blocks", "total_data_seconds", "latency_sum", "latency_count")
+
+    def __init__(self, name, code, server):
+        self.name = name
+        self.code = code
+        self.server = server
+        self.connected = False
+        self.sample_rate = None
+        self.min_samples = None
+        self.max_samples = None
+        self.blocks = RollingWindow(BLOCK_WINDOW_SECONDS)
+        self.data_seconds = RollingWindow(DATA_WINDOW_SECONDS)
+        self.timeouts = 0
+        self.last_data_time = None  # Unix time
+        self.bad_packets = 0  # Only written by the thread of the station's connection
+        self.reconnects = 0
+        # Running totals, the health history stores their per-minute differences
+        self.total_blocks = 0
+        self.total_data_seconds = 0.0
+        self.latency_sum = 0.0  # Arrival time - data end time, summed over records
+        self.latency_count = 0
+
+    def totals(self):
+        return {
+            "blocks": self.total_blocks,
+            "data_minutes": self.total_data_seconds / 60,
+            "latency_sum": self.latency_sum,
+            "latency_count": self.latency_count,
+            "timeouts": self.timeouts,
+            "bad_packets": self.bad_packets,
+        }
+
+    def report(self, now):
+        """Aggregates for the table and the JSON report."""
+        second = int(now)
+        return {
+            "name": self.name,
+            "code": self.code,
+            "server": self.server,
+            "connected": self.connected,
+            "sample_rate": self.sample_rate,
+            "min_samples": self.min_samples,
+            "max_samples": self.max_samples,
+            "blocks_last_10min": int(self.blocks.sum(second)),
+            "data_minutes_last_60min": round(self.data_seconds.sum(second) / 60, 2),
+            "timeouts": self.timeouts,
+            "last_data_time": None if self.last_data_time is None
+            else datetime.fromtimestamp(self.last_data_time, timezone.utc).isoformat(),
+            "bad_packets": self.bad_packets,
+            "reconnects": self.reconnects,
+        }
+
+
+class ConnectionEvents:
+    """
+    Counts the bad packets and reconnects reported by the SeedLink connections on
+    the stations they belong to.
+
+    Lookups go through an index built once from stations.json: (server, network,
+    station, channel) for bad packets and server for reconnects. Each counter is
+    only written by the thread of its connection, so no lock is needed and an error
+    storm on one server does not stall the others.
+    """
+
+    def __init__(self, stations):
+        self.selectors = {}  # Server -> [((network, station, channel) selector, StationStats)]
+        self.by_server = {}  # Server -> [StationStats]
+        for sid, conf in stations.items():
+            selector = (conf["network"], conf["station"], conf["channel"])
+            self.selectors.setdefault(conf["server"], []).append((selector, station_stats[sid]))
+            self.by_server.setdefault(conf["server"], []).append(station_stats[sid])
+        self.by_stream = {}  # (server, network, station, channel) -> [StationStats], filled on first use
+        for server in self.by_server:
+            unattributed_bad_packets.setdefault(server, 0)  # Counters only change from here on, keys are never added
+
+    def resolve(self, server, stream):
+        targets = [stats for selector, stats in self.selectors.get(server, ())
+                   if all(fnmatchcase(value, pattern) for value, pattern in zip(stream, selector))]
+        self.by_stream[(server, *stream)] = targets
+        return targets
+
+    def on_event(self, server, kind, stream):
+        if kind == "reconnect":
+            for stats in self.by_server.get(server, ()):
+                stats.reconnects += 1
+        elif kind == "bad_packet":
+            targets = None
+            if stream is not None:
+                targets = self.by_stream.get((server, *stream))
+                if targets is None:
+                    targets = self.resolve(server, stream)
+            if targets:
+                for stats in targets:
+                    stats.bad_packets += 1
+            else:
+                unattributed_bad_packets[server] = unattributed_bad_packets.get(server, 0) + 1
+
+
+# obspy logs every bad packet; ConnectionEvents counts them, so keep them off the console
+logging.getLogger("obspy").addHandler(logging.NullHandler())
+
+class MonitorClient:
+    # Per-station consumer; its on_data is registered on the shared connection of the server
     def __init__(self, station_id, conf):
-        super().__init__(conf["server"])
         self.station_id = station_id
         self.conf = conf
         self.key = f"{conf['network']}.{conf['station']}.{conf['channel']}"
-        self.select_stream(conf["network"], conf["station"], conf["channel"])
 
         # Initialize station metrics
-        station_stats[station_id] = {
-            "name": conf.get("name", ""),
-            "code": self.key,
-            "server": conf["server"],
-            "connected": False,
-            "sample_rate": None,
-            "min_samples": None,
-            "max_samples": None,
-            "blocks_last_10min": [],
-            "data_minutes_last_60min": [],
-            "timeouts": 0,
-            "last_data_time": None,
-            "bad_packets": 0
-        }
+        self.stats = station_stats[station_id] = StationStats(conf.get("name", ""), self.key, conf["server"])
 
     def on_data(self, trace):
-        now = datetime.utcnow()
+        now = time.time()
+        second = int(now)
         data_len = len(trace.data)
         fs = trace.stats.sampling_rate
-        duration_min = data_len / fs / 60
 
         with lock:
-            s = station_stats[self.station_id]
-            s["connected"] = True
-            s["sample_rate"] = fs
-            s["min_samples"] = min(s["min_samples"] or data_len, data_len)
-            s["max_samples"] = max(s["max_samples"] or 0, data_len)
-            s["last_data_time"] = now
-            s["blocks_last_10min"].append((now, 1))
-            s["data_minutes_last_60min"].append((now, duration_min))
-
-
-def cleanup_stats():
-    now = datetime.utcnow()
+            s = self.stats
+            s.connected = True
+            s.sample_rate = fs
+            s.min_samples = min(s.min_samples or data_len, data_len)
+            s.max_samples = max(s.max_samples or 0, data_len)
+            s.last_data_time = now
+            s.blocks.add(second, 1)
+            s.data_seconds.add(second, data_len / fs)
+            s.total_blocks += 1
+            s.total_data_seconds += data_len / fs
+            s.latency_sum += now - trace.stats.endtime.timestamp
+            s.latency_count += 1
+
+
+def check_timeouts(now):
+    """
+    Marks stations without data for TIMEOUT_SECONDS as disconnected and counts the timeout.
+    """
     for s in station_stats.values():
-        s["blocks_last_10min"] = [(t, c) for t, c in s["blocks_last_10min"] if t > now - timedelta(minutes=10)]
-        s["data_minutes_last_60min"] = [(t, m) for t, m in s["data_minutes_last_60min"] if t > now - timedelta(minutes=60)]
+        if s.last_data_time is not None and now - s.last_data_time > TIMEOUT_SECONDS:
+            if s.connected:
+                s.timeouts += 1
+            s.connected = False
 
-        if s["last_data_time"] is not None:
-            if now - s["last_data_time"] > timedelta(seconds=60):
-                if s["connected"]:
-                    s["timeouts"] += 1
-                s["connected"] = False
+
+def collect_report():
+    """Aggregated figures of all stations (no raw events)."""
+    now = time.time()
+    with lock:
+        check_timeouts(now)
+        return {sid: s.report(now) for sid, s in station_stats.items()}
+
+
+def history_loop(store):
+    """
+    Adds every station's figures of the last minute to the health history.
+    """
+    previous = {}
+    last_prune = 0.0
+    while True:
+        time.sleep(HISTORY_INTERVAL_SECONDS - time.time() % HISTORY_INTERVAL_SECONDS)
+        now = time.time()
+        with lock:
+            check_timeouts(now)
+            totals = {sid: s.totals() for sid, s in station_stats.items()}
+        rows = {}
+        for sid, current in totals.items():
+            before = previous.get(sid)
+            rows[sid] = current if before is None else {k: v - before[k] for k, v in current.items()}
+        previous = totals
+        try:
+            store.record(rows, now - HISTORY_INTERVAL_SECONDS)  # Row of the minute that just ended
+            if now - last_prune >= PRUNE_INTERVAL_SECONDS:
+                store.prune(now)
+                last_prune = now
+        except Exception as e:
+            logging.error(f"❌ Could not write health history: {e}")
 
 
 def format_uptime():
@@ -100,7 +269,9 @@ def format_uptime():
     return f"{days:03}:{hours:02}:{minutes:02}:{seconds:02}"
 
 
-def generate_table():
+def generate_table(report=None):
+    if report is None:
+        report = collect_report()
     uptime_str = format_uptime()
     table = Table(title=f"📡 Station Monitoring — Uptime {uptime_str}", show_lines=True)
     table.add_column("ID", style="cyan", no_wrap=True)
@@ -114,52 +285,81 @@ def generate_table():
     table.add_column("Data 60min (min)", justify="right")
     table.add_column("Timeouts", justify="right", style="red")
     table.add_column("Bad Packets", justify="right", style="magenta")
+    table.add_column("Reconnects", justify="right")
 
-    with lock:
-        cleanup_stats()
-        for sid, s in station_stats.items():
-            table.add_row(
-                sid,
-                s['name'],
-                s['code'],
-                s['server'],
-                "✅" if s['connected'] else "❌",
-                str(s['sample_rate'] or "-"),
-                f"{s['min_samples'] or '-'} / {s['max_samples'] or '-'}",
-                str(len(s['blocks_last_10min'])),
-                f"{round(sum(m for _, m in s['data_minutes_last_60min']), 2)}",
-                str(s['timeouts']),
-                str(s['bad_packets'])
-            )
+    for sid, s in report.items():
+        table.add_row(
+            sid,
+            s['name'],
+            s['code'],
+            s['server'],
+            "✅" if s['connected'] else "❌",
+            str(s['sample_rate'] or "-"),
+            f"{s['min_samples'] or '-'} / {s['max_samples'] or '-'}",
+            str(s['blocks_last_10min']),
+            f"{s['data_minutes_last_60min']}",
+            str(s['timeouts']),
+            str(s['bad_packets']),
+            str(s['reconnects'])
+        )
+    unattributed = [(server, count) for server, count in list(unattributed_bad_packets.items()) if count]
+    if unattributed:
+        table.caption = "Bad packets of unknown stream: " + ", ".join(f"{server} {count}" for server, count in unattributed)
 
     return table
 
 
-def report_loop():
+def report_loop(publisher=None):
     with Live(generate_table(), refresh_per_second=1, console=console) as live:
         while True:
             time.sleep(5)
-            with lock:
-                with open(REPORT_FILE, "w", encoding="utf-8") as f:
-                    json.dump(station_stats, f, indent=2, default=str)
-            live.update(generate_table())
+            report = collect_report()
+            tmp_file = f"{REPORT_FILE}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp_file, REPORT_FILE)
+            if publisher is not None:
+                publisher.publish(report)
+            live.update(generate_table(report))
 
 
-def start_monitoring():
+def start_monitoring(ingest="threads", history_db=HEALTH_DB, publisher=None):
     with open(STATIONS_FILE, "r", encoding="utf-8") as f:
         stations = json.load(f)
 
-    for sid, conf in stations.items():
-        client = MonitorClient(sid, conf)
-        thread = threading.Thread(target=client.run, daemon=True)
-        thread.start()
+    # One SeedLink connection per server instead of one per station
+    clients = {sid: MonitorClient(sid, conf) for sid, conf in stations.items()}
+    callbacks = {sid: client.on_data for sid, client in clients.items()}
+    events = ConnectionEvents(stations)
+    if ingest == "asyncio":
+        start_async_ingest(stations, callbacks, on_event=events.on_event)
+    else:
+        start_shared_clients(stations, callbacks, on_event=events.on_event)
 
-    threading.Thread(target=report_loop, daemon=True).start()
+    threading.Thread(target=report_loop, args=(publisher,), daemon=True).start()
+    if history_db:
+        threading.Thread(target=history_loop, args=(HealthStore(history_db),), daemon=True).start()
 
     while True:
         time.sleep(1)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monitor the SeedLink stations in stations.json")
+    parser.add_argument("--ingest", choices=["threads", "asyncio"], default="threads", help="'threads' runs one blocking SeedLink client thread per server, 'asyncio' runs all sessions in one event loop")
+    parser.add_argument("--history-db", type=str, default=HEALTH_DB, help="SQLite file for the per-minute station health history ('' to disable)")
+    parser.add_argument("--status-socket", type=str, default=STATUS_SOCKET, help="Unix socket that pushes report changes to statusviewer.py ('' to disable)")
+    parser.add_argument("--status-osc", type=str, default=None, metavar="HOST:PORT", help="Also send every report change as OSC messages (/stationmonitor/...) over UDP")
+    args = parser.parse_args()
+
     console.print("🚀 Starting station monitoring... (Press Ctrl+C to exit)", style="bold yellow")
-    start_monitoring()
+    publisher = None
+    if args.status_socket or args.status_osc:
+        publisher = StatusPublisher(
+            args.status_socket or None, parse_osc_target(args.status_osc) if args.status_osc else None, "/stationmonitor"
+        )
+    try:
+        start_monitoring(args.ingest, args.history_db, publisher)
+    finally:
+        if publisher is not None:
+            publisher.close()
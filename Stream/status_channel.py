@@ -0,0 +1,245 @@
+import os
+import json
+import socket
+import struct
+import logging
+import threading
+
+# ----------------------------
+# Default configuration
+SEND_BUFFER_BYTES = 256 * 1024  # Per subscriber; a subscriber that falls this far behind skips updates
+# ----------------------------
+
+
+def flatten(data, prefix=""):
+    """
+    Flattens nested dicts into {"a/b/c": value} pairs (lists and other values are leaves).
+    """
+    items = {}
+    for key, value in data.items():
+        path = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            items.update(flatten(value, path))
+        else:
+            items[path] = value
+    return items
+
+
+def diff(old, new, path=()):
+    """
+    The changes from dict `old` to dict `new`.
+
+    Returns:
+        tuple: (changed, removed): the changed or added keys with their new value
+        (nested dicts are diffed recursively), and the key paths that are gone.
+    """
+    changed, removed = {}, []
+    for key, value in new.items():
+        before = old.get(key)
+        if isinstance(value, dict) and isinstance(before, dict):
+            sub_changed, sub_removed = diff(before, value, path + (key,))
+            if sub_changed:
+                changed[key] = sub_changed
+            removed += sub_removed
+        elif key not in old or value != before:
+            changed[key] = value
+    removed += [list(path + (key,)) for key in old if key not in new]
+    return changed, removed
+
+
+def apply_delta(state, changed, removed=()):
+    """Applies a diff() result to `state` in place."""
+    for key, value in changed.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            apply_delta(state[key], value)
+        else:
+            state[key] = value
+    for path in removed:
+        parent = state
+        for key in path[:-1]:
+            parent = parent.get(key, {})
+        parent.pop(path[-1], None)
+    return state
+
+
+def osc_string(text):
+    data = text.encode("utf-8") + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+
+def osc_message(address, *values):
+    """
+    Encodes one OSC message with int, float or string arguments.
+    """
+    tags, args = ",", b""
+    for value in values:
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, int) and -2**31 <= value < 2**31:
+            tags, args = tags + "i", args + struct.pack(">i", value)
+        elif isinstance(value, (int, float)):
+            tags, args = tags + "f", args + struct.pack(">f", value)
+        else:
+            tags, args = tags + "s", args + osc_string(str(value))
+    return osc_string(address) + osc_string(tags) + args
+
+
+def parse_osc_target(value):
+    """Turns "HOST:PORT" (or just "PORT") into a (host, port) tuple."""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def socket_in_use(socket_path):
+    """True if something is listening on the Unix socket `socket_path`."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False  # A file left over by a process that is gone (or no file at all)
+    finally:
+        probe.close()
+
+
+class StatusPublisher:
+    """
+    Pushes a status dict to local subscribers as it changes.
+
+    Subscribers connect to a Unix socket and receive newline-delimited JSON: the
+    full status first ({"full": ...}), then only what changed ({"delta": ...,
+    "removed": [key paths]}, see diff()). With `osc` set, every changed value is
+    also sent as an OSC message (UDP) to `osc_prefix`/<key>/<subkey>, e.g. for
+    [udpreceive] in Max.
+
+    Sending never blocks the caller and never leaves a line half-written: when a
+    subscriber's buffer is full, the rest of the line is kept and sent first
+    once there is room again. The updates it missed meanwhile are replaced by
+    one full status.
+    If another process is already publishing on `socket_path`, the socket is left
+    to it and only OSC (if set) is sent.
+
+    Args:
+        socket_path (str): Unix socket to listen on (None for OSC only).
+        osc (tuple): (host, port) to send OSC messages to, or None.
+        osc_prefix (str): Address prefix of the OSC messages.
+    """
+
+    def __init__(self, socket_path=None, osc=None, osc_prefix="/status"):
+        self.socket_path = socket_path
+        self.osc = osc
+        self.osc_prefix = osc_prefix.rstrip("/")
+        self.state = {}
+        self.subscribers = []
+        self.lock = threading.Lock()  # Guards state and subscribers between publish() and new connections
+        self.server = None
+        self.osc_socket = None
+        if osc is not None:
+            self.osc_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if socket_path:
+            if not hasattr(socket, "AF_UNIX"):
+                logging.warning("⚠️ Unix sockets are not available on this system, status push disabled")
+                return
+            if os.path.exists(socket_path):
+                if socket_in_use(socket_path):
+                    logging.error(f"❌ {socket_path} is in use by another running process, status push disabled "
+                                  f"(choose another path with --status-socket)")
+                    return
+                os.unlink(socket_path)  # Left over from a previous run
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(socket_path)
+            self.server.listen()
+            threading.Thread(target=self.accept_loop, daemon=True).start()
+            logging.info(f"📣 Status pushed on {socket_path}")
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return  # Closed
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+            conn.setblocking(False)
+            subscriber = {'conn': conn, 'rest': b"", 'stale': False}  # Unsent end of a line, missed updates
+            with self.lock:
+                if self.send(subscriber, {'full': self.state}):
+                    self.subscribers.append(subscriber)
+
+    def send(self, subscriber, message=None):
+        """
+        Sends a message line to one subscriber, after the rest of its previous
+        line. If there is no room, the message is skipped and the subscriber is
+        marked stale: its next line is the full status instead of a delta.
+
+        Returns:
+            bool: False if the subscriber is gone (its socket is closed).
+        """
+        conn = subscriber['conn']
+        try:
+            if subscriber['rest']:
+                subscriber['rest'] = subscriber['rest'][conn.send(subscriber['rest']):]
+                if subscriber['rest']:
+                    subscriber['stale'] = subscriber['stale'] or message is not None
+                    return True
+            if subscriber['stale']:
+                message = {'full': self.state}
+            if message is None:
+                return True
+            line = (json.dumps(message, default=str) + "\n").encode("utf-8")
+            subscriber['rest'] = line[conn.send(line):]
+            subscriber['stale'] = False
+            return True
+        except BlockingIOError:  # Its buffer is full
+            subscriber['stale'] = subscriber['stale'] or message is not None
+            return True
+        except OSError:
+            conn.close()
+            return False
+
+    def publish(self, status):
+        """Sends what changed since the last call (and what earlier calls could not send)."""
+        with self.lock:
+            delta, removed = diff(self.state, status)
+            message = None
+            if delta or removed:
+                self.state = status
+                message = {'delta': delta, 'removed': removed}
+            self.subscribers = [subscriber for subscriber in self.subscribers if self.send(subscriber, message)]
+        if message is None:
+            return
+        if self.osc_socket is not None:
+            for path, value in flatten(delta).items():
+                if value is None or isinstance(value, list):
+                    continue
+                try:
+                    self.osc_socket.sendto(osc_message(f"{self.osc_prefix}/{path}", value), self.osc)
+                except OSError as e:
+                    logging.debug(f"OSC send failed: {e}")
+
+    def close(self):
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber['conn'].close()
+            self.subscribers = []
+        if self.server is not None:
+            self.server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def subscribe(socket_path):
+    """
+    Connects to a StatusPublisher and yields the full, current status after every update.
+    Returns when the publisher goes away.
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(socket_path)
+    state = {}
+    with conn, conn.makefile("r", encoding="utf-8") as lines:
+        for line in lines:
+            message = json.loads(line)
+            if 'full' in message:
+                state = message['full']
+            else:
+                apply_delta(state, message['delta'], message['removed'])
+            yield state
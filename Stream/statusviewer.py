@@ -2,35 +2,91 @@ import json
 import time
 import os
 import argparse
+import itertools
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+from status_channel import flatten, subscribe
 
 REFRESH_INTERVAL = 1  # Sekunden
+RECONNECT_INTERVAL = 2  # Seconds between attempts to reach the status socket
+STATUS_SOCKET = "status.sock"
 
-def clear():
-    os.system("cls" if os.name == "nt" else "clear")
+console = Console()
 
-def show_json(filename):
+def render(data, source):
+    """
+    Builds a table of all values, nested ones as "a/b/c" keys.
+    """
+    table = Table(title=f"📄 {source}", show_header=False, box=None)
+    table.add_column("Key", style="cyan")
+    table.add_column("Value")
+    for key, value in flatten(data).items():
+        table.add_row(key, str(value))
+    return table
+
+def read_json(filename, last_mtime=None):
+    """
+    Reads the file if it changed since last_mtime. Returns (data or None, modification time).
+    """
     try:
+        mtime = os.stat(filename).st_mtime_ns
+        if mtime == last_mtime:
+            return None, last_mtime
         with open(filename, "r") as f:
-            data = json.load(f)
-        clear()
-        print(f"📄 {filename} (updated every {REFRESH_INTERVAL}s)")
-        print("-" * 50)
-        for key, value in data.items():
-            print(f"{key:30}: {value}")
-        print("-" * 50)
+            return json.load(f), mtime
     except FileNotFoundError:
-        print(f"⏳ Waiting for {filename} ...")
+        return {'waiting for': filename}, None
     except json.JSONDecodeError:
-        print(f"⚠️  Invalid JSON format in {filename}")
+        return {'invalid JSON format in': filename}, None
+
+def connect(socket_path):
+    """
+    Subscribes to the status socket. Returns the updates, or None if nobody is
+    listening (no socket, or one left over from a stopped player).
+    """
+    if not os.path.exists(socket_path):
+        return None
+    updates = subscribe(socket_path)
+    try:
+        first = next(updates)
+    except (OSError, ValueError, StopIteration):  # ValueError: a line cut off when the publisher stopped
+        return None
+    return itertools.chain([first], updates)
+
+def view(live, filename, socket_path=None):
+    """
+    Redraws on every update pushed through the socket. Without a publisher, shows
+    the JSON file whenever it changes and keeps trying the socket.
+    """
+    mtime = None
+    last_attempt = 0.0
+    while True:
+        if socket_path and time.time() - last_attempt >= RECONNECT_INTERVAL:
+            last_attempt = time.time()
+            updates = connect(socket_path)
+            if updates is not None:
+                try:
+                    for state in updates:
+                        live.update(render(state, f"{socket_path} (live)"))
+                except (OSError, ValueError):
+                    pass
+                mtime = None  # Publisher gone: show the file again
+                continue
+        data, mtime = read_json(filename, mtime)
+        if data is not None:
+            live.update(render(data, f"{filename} (checked every {REFRESH_INTERVAL}s)"))
+        time.sleep(REFRESH_INTERVAL)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Live viewer for a JSON file")
-    parser.add_argument("filename", nargs="?", default="status.json", help="Path to JSON file (default: status.json)")
+    parser = argparse.ArgumentParser(description="Live viewer for the status of streamplayer3.py or stationmonitor1.3.py")
+    parser.add_argument("filename", nargs="?", default="status.json", help="Path to JSON file, used if there is no status socket (default: status.json)")
+    parser.add_argument("--socket", type=str, default=STATUS_SOCKET, help="Status socket to subscribe to (default: status.sock, station_monitor.sock for the monitor)")
+    parser.add_argument("--file", action="store_true", help="Watch the JSON file even if the socket exists")
     args = parser.parse_args()
 
     try:
-        while True:
-            show_json(args.filename)
-            time.sleep(REFRESH_INTERVAL)
+        with Live(render({}, "⏳ Waiting for status ..."), console=console, refresh_per_second=4) as live:
+            view(live, args.filename, None if args.file else args.socket)
     except KeyboardInterrupt:
         print("\n🛑 Viewer exited.")
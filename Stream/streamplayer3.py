@@ -6,13 +6,29 @@ import queue
 import threading
 import argparse
 import json
+import atexit
 import logging
+from collections import deque
 from datetime import datetime, timezone
 import numpy as np
-import soundfile as sf # for writing audio files
-import sounddevice as sd # for streaming audio
-from obspy.clients.seedlink.easyseedlink import EasySeedLinkClient
-import resampy # for resampling
+from lazy_import import LazyModule
+from gain import GAIN_MODES, DEFAULT_GAIN_MODE
+from dsp import BlockProcessor, parse_chain, warm_up, DEFAULT_CHAIN, DEFAULT_BANDPASS, DEFAULT_RESAMPLER, WARMUP_SAMPLE_RATES
+from dsp_pool import DspPool
+from latency import LatencyController, DEFAULT_JITTER_PERCENTILE, DEFAULT_MARGIN_SECONDS
+from metrics import Metrics, serve_metrics
+from status_channel import StatusPublisher, parse_osc_target
+from features import FeatureExtractor, feature_loop, DEFAULT_FEATURE_INTERVAL_SECONDS
+from timeshift import TimeShiftRenderer, DEFAULT_SPEED
+from jitter import JitterBuffer, DEFAULT_JITTER_WINDOW_SECONDS, DEFAULT_MAX_FILL_SECONDS
+from obspy import UTCDateTime
+from seedlink_pool import start_shared_clients, matches_selector
+from seedlink_async import start_async_ingest
+from replay import load_traces, replay_traces
+from block_archive import SegmentArchiveWriter, DEFAULT_SEGMENT_SECONDS, DEFAULT_MAX_SEGMENTS
+from ringbuffer import AudioRingBuffer, MultiChannelRingBuffer, UnderrunConcealer, MultiChannelConcealer, UNDERRUN_STRATEGIES
+
+sf = LazyModule("soundfile")  # for writing audio files (sounddevice is imported where the device is opened)
 
 # ----------------------------
 # Default configuration
@@ -23,9 +39,24 @@ DEFAULT_MAX_WAV_FILES = 100
 DEFAULT_MIN_QUEUE_SECONDS = 30.0
 DEFAULT_DEVICE_NAME = "BlackHole 64ch"
 DEFAULT_TAPER_MS = 0  # Taper duration in milliseconds
+DEFAULT_MODE = "wav"  # "wav" (round-trip through wav_blocks/) or "direct" (in-memory)
+DEFAULT_INGEST = "threads"  # "threads" (one thread per server) or "asyncio" (one event loop)
+DEFAULT_UNDERRUN = "silence"  # What to play while the ring buffer is empty
+DEFAULT_GAIN = DEFAULT_GAIN_MODE  # Per-stream normalization, see gain.py
+DEFAULT_LATENCY = "adaptive"  # "adaptive" (measured arrival jitter) or "fixed" (--block-delay, --min-queue-seconds)
+DEFAULT_PACE = "realtime"  # Replay pacing: "realtime" or "fast"
+DEFAULT_SINK_FILE = "replay.wav"  # Output file of --sink file
+ESTIMATED_BLOCK_SECONDS = 10.0  # Typical length of one SeedLink record (~200 samples @ 20 Hz)
+MAX_BUFFER_SECONDS = 600.0  # Upper limit of --buffer-seconds (100 MB per channel at 44.1 kHz)
 STATIONS_FILE = "stations.json"
 WAV_DIR = "wav_blocks"
+ARCHIVE_DIR = "archive"  # Segment archives, one subdirectory per station
 LOG_FILE = "stream.log"
+STATUS_FILE = "status.json"
+STATUS_SOCKET = "status.sock"  # Unix socket that pushes status changes to statusviewer.py
+STATUS_HEARTBEAT_SECONDS = 10  # Rewrite the status file at least this often (uptime)
+QUEUE_EWMA_SECONDS = 60.0  # Time constant of the smoothed queue duration
+TIMESHIFT_LEAD_SECONDS = 2.0  # Time-shift mode renders the next pass when this little audio is left
 # ----------------------------
 
 def setup_logging(log_file=LOG_FILE):
@@ -49,12 +80,16 @@ def setup_logging(log_file=LOG_FILE):
 logger = setup_logging()
 
 # Global variables
-audio_queue = queue.Queue()
-current_block = None
-block_offset = 0
-global_max = 1.0
-stream_gap_duration = {'total': 0.0}
+audio_ring = None  # AudioRingBuffer (or MultiChannelRingBuffer), created in start() once the sizes are known
+concealer = None  # UnderrunConcealer (MultiChannelConcealer for multi-station playback), created in start()
+channel_map = None  # Output channel per station (multi-station mode only)
+channel_slice = None  # The same as a slice, if the stations sit on consecutive channels
+mix_staging = None  # Preallocated (frames x stations) buffer for non-consecutive channel maps
+wav_index = None  # WavBlockIndex of wav_blocks/, created in start()
+stream_gap_duration = {'frames': 0, 'events': 0}  # Counted in the audio callback
 block_counter = {'count': 0, 'saved_total': 0}
+callback_status = {'flags': 0, 'last': None}  # PortAudio status flags seen in the callback (logged by the status thread)
+metrics = None  # Metrics (per-stage timers), created in start() with --metrics
 
 def load_stations_json(stations_file=STATIONS_FILE):
     """
@@ -70,6 +105,16 @@ def load_stations_json(stations_file=STATIONS_FILE):
         logging.error(f"Error decoding JSON in {stations_file}: {e}")
         sys.exit(1)
 
+def write_json_atomic(path, data):
+    """
+    Writes JSON to a temporary file next to `path` and renames it into place,
+    so readers (statusviewer.py) never see a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 def delete_all_wav_files(wav_dir=WAV_DIR):
     """
     Deletes all .wav files in the specified directory.
@@ -87,93 +132,285 @@ def delete_all_wav_files(wav_dir=WAV_DIR):
     except Exception as e:
         logging.error(f"Error deleting WAV files: {e}")
 
-def enforce_max_wav_files(limit, wav_dir=WAV_DIR):
+class WavBlockIndex:
     """
-    Enforces a limit on the number of .wav files in the directory.
+    In-process index of the .wav blocks in the output directory, oldest first.
+
+    Blocks are numbered in the order they are saved. Writers add each file as they
+    save it and the oldest files are evicted once there are more than `limit`, so
+    neither retention, counting nor the playback loader has to scan the directory.
+    The directory is only scanned once, at startup.
     """
-    try:
-        wav_files = sorted(glob.glob(os.path.join(wav_dir, "*.wav")), key=os.path.getmtime)
-    except FileNotFoundError:
-        logging.warning(f"WAV directory not found: {wav_dir}")
-        return
 
-    while len(wav_files) > limit:
+    def __init__(self, limit, wav_dir=WAV_DIR):
+        self.limit = limit
+        self.wav_dir = wav_dir
+        self.paths = {}  # Block number -> file path
+        self.first = 0  # Oldest block number still indexed
+        self.next = 0  # Number of the next block to be added
+        self.lock = threading.Lock()
+
+    def scan(self):
+        """Indexes the .wav files already in the directory, oldest first."""
         try:
-            os.remove(wav_files[0])
-            logging.info(f"♻️  Deleted oldest file: {os.path.basename(wav_files[0])}")
-            wav_files.pop(0)
-        except OSError as e:
-            logging.warning(f"Could not delete file: {e}")
-            break
+            existing = sorted(glob.glob(os.path.join(self.wav_dir, "*.wav")), key=os.path.getmtime)
+        except FileNotFoundError:
+            logging.warning(f"WAV directory not found: {self.wav_dir}")
+            return
+        for filepath in existing:
+            self.add(filepath)
+
+    def add(self, filepath):
+        """
+        Adds a newly saved file and deletes the oldest files beyond the limit.
 
-def apply_taper(data, sample_rate, taper_ms):
+        Returns:
+            int: The block number of the file.
+        """
+        with self.lock:
+            number = self.next
+            self.paths[number] = filepath
+            self.next += 1
+            evicted = []
+            while self.next - self.first > self.limit:
+                evicted.append(self.paths.pop(self.first))
+                self.first += 1
+        for old in evicted:
+            try:
+                os.remove(old)
+                logging.info(f"♻️  Deleted oldest file: {os.path.basename(old)}")
+            except OSError as e:
+                logging.warning(f"Could not delete file: {e}")
+        return number
+
+    def get(self, number):
+        """Returns the path of a block, or None if it is not (or no longer) indexed."""
+        return self.paths.get(number)
+
+    def __len__(self):
+        return self.next - self.first
+
+class BlockBuffer:
     """
-    Applies a Hann taper to the beginning and end of the data.
+    A bounded in-memory FIFO of float32 blocks, used in direct mode to hand
+    blocks from the SeedLink thread to the playback loader without touching disk.
+    When full, the oldest block is dropped (like the WAV retention limit does).
     """
-    if taper_ms <= 0:
-        return data
-    taper_len = int(sample_rate * taper_ms / 1000)
-    if taper_len == 0 or taper_len * 2 >= len(data):
-        logging.warning(f"Taper length ({taper_len} samples) too long or zero, skipping taper.")
-        return data
 
-    taper_window = np.hanning(taper_len * 2)
-    fade_in = taper_window[:taper_len]
-    fade_out = taper_window[taper_len:]
+    def __init__(self, maxlen):
+        self.blocks = deque()
+        self.maxlen = max(1, maxlen)
+        self.received = 0
+        self.dropped = 0
+        self.closed = False  # Set when no more blocks will arrive (end of a replay)
+        self.cond = threading.Condition()
+
+    def put(self, data):
+        with self.cond:
+            if len(self.blocks) >= self.maxlen:
+                self.blocks.popleft()
+                self.dropped += 1
+                logging.warning("♻️  In-memory block buffer full, dropped oldest block")
+            self.blocks.append(data)
+            self.received += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the oldest block, or None if nothing arrived within timeout."""
+        with self.cond:
+            if not self.blocks:
+                self.cond.wait(timeout)
+            if not self.blocks:
+                return None
+            return self.blocks.popleft()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
 
-    tapered_data = data.copy()
-    tapered_data[:taper_len] *= fade_in
-    tapered_data[-taper_len:] *= fade_out
-    return tapered_data
+    def __len__(self):
+        return len(self.blocks)
 
-class WavDumpClient(EasySeedLinkClient):
+def archive_writer(archive_queue, archive_wav=True, segment_dir=None, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                   max_segments=DEFAULT_MAX_SEGMENTS, wav_dir=WAV_DIR):
     """
-    A SeedLink client that saves received data as .wav files.
+    Writes blocks from the archive queue to .wav files and/or segment archives.
+    Used in direct mode so that archiving happens off the hot path.
+
+    Args:
+        archive_queue (queue.Queue): (station id, WAV prefix, counter, data, sample rate, start time, gap) items.
+        archive_wav (bool): Write one .wav file per block to wav_dir.
+        segment_dir (str): If set, append the blocks to segment_dir/<station id>/.
     """
+    segment_writers = {}
+    while True:
+        sid, prefix, counter, data, samplerate, starttime, gap = archive_queue.get()
+        if archive_wav:
+            ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+            filepath = os.path.join(wav_dir, f"block_{prefix}{counter:04d}_{ts}.wav")
+            try:
+                sf.write(filepath, data, samplerate=samplerate, subtype='FLOAT')
+                block_counter['saved_total'] += 1
+                wav_index.add(filepath)
+            except Exception as e:
+                logging.error(f"Error writing WAV archive file: {e}")
+        if segment_dir is not None:
+            try:
+                writer = segment_writers.get(sid)
+                if writer is None:
+                    writer = segment_writers[sid] = SegmentArchiveWriter(
+                        os.path.join(segment_dir, sid), samplerate, segment_seconds, max_segments
+                    )
+                writer.append(data, starttime, gap)
+            except Exception as e:
+                logging.error(f"Error writing segment archive of station {sid}: {e}")
 
-    def __init__(self, server, network, station, channel, target_fs, max_wav_files, block_delay, taper_ms):
-        super().__init__(server)
-        self.select_stream(network, station, channel)
+class WavDumpClient:
+    """
+    Consumes the SeedLink data of one station and saves it as .wav files.
+    Its on_data is registered on the shared connection of the station's server.
+    If a block buffer is given (direct mode), blocks are handed over in memory
+    instead and only optionally archived through the archive queue.
+    """
+
+    def __init__(self, target_fs, max_wav_files, block_delay, taper_ms,
+                 block_buffer=None, archive_queue=None, resampler=DEFAULT_RESAMPLER, archive_prefix="", station_id="",
+                 gain=DEFAULT_GAIN, chain=DEFAULT_CHAIN, bandpass=DEFAULT_BANDPASS,
+                 jitter_window=DEFAULT_JITTER_WINDOW_SECONDS, max_fill=DEFAULT_MAX_FILL_SECONDS, latency=None,
+                 dsp_pool=None, features=None, timeshift=None):
         self.file_counter = 0
         self.target_fs = target_fs
         self.max_wav_files = max_wav_files
         self.block_delay = block_delay
         self.taper_ms = taper_ms
+        self.block_buffer = block_buffer
+        self.archive_queue = archive_queue
+        self.archive_prefix = archive_prefix
+        self.station_id = station_id
+        self.block_start = None  # UTC time of the first output sample of the current block
+        self.dsp_pool = dsp_pool
+        if dsp_pool is None:
+            self.processor = BlockProcessor(target_fs, parse_chain(chain), gain, taper_ms, bandpass, resampler, metrics)
+        else:
+            self.lane = dsp_pool.lane()  # All streams of the station go to one worker, in order
+        self.jitter_window = jitter_window
+        self.max_fill = max_fill
+        self.jitter = {}  # trace.id -> JitterBuffer
+        self.block_gap = False  # The current block is silence in place of missing data
+        self.latency = latency  # LatencyController of the station (adaptive latency only)
+        self.features = features  # FeatureExtractor shared by all stations, if enabled
+        self.timeshift = timeshift  # TimeShiftRenderer shared by all stations (time-shift mode only)
 
     def on_data(self, trace):
         """
-        Processes received data blocks, resamples them, applies a taper,
-        and saves them as .wav files.
+        Receives one record and passes it through the stream's jitter buffer, which
+        puts records in time order, drops duplicates and overlaps, and fills gaps.
         """
-        global global_max
-        global block_counter
-
-        data = trace.data.astype(np.float32)
+        t0 = time.perf_counter_ns() if metrics is not None else 0
+        if self.latency is not None:
+            self.latency.observe(trace)
+        if self.jitter_window <= 0:
+            if metrics is not None:
+                metrics.record("receive", t0)
+            self.process_block(trace.id, trace.stats.sampling_rate, trace.stats.starttime, trace.data)
+            return
         fs_in = trace.stats.sampling_rate
+        jb = self.jitter.get(trace.id)
+        if jb is None or jb.sample_rate != fs_in:
+            jb = self.jitter[trace.id] = JitterBuffer(fs_in, self.jitter_window, self.max_fill)
+        if self.latency is not None:
+            jb.limit_window(self.latency.hold_s)  # Holding a hole longer than the buffer lasts would underrun
+        segments = jb.push(trace.stats.starttime, trace.data)
+        if metrics is not None:
+            metrics.record("receive", t0)
+        self.process_segments(trace.id, jb, segments)
 
-        absmax = np.max(np.abs(data))
-        if absmax > global_max:
-            global_max = absmax
+    def flush(self):
+        """Processes all records still held back by the jitter buffers (end of a replay)."""
+        for key, jb in self.jitter.items():
+            self.process_segments(key, jb, jb.flush())
 
-        if global_max > 0:
-            data /= global_max
-
-        # Resample to target_fs
-        if fs_in != self.target_fs:
-            try:
-                data = resampy.resample(data, fs_in, self.target_fs)
-            except Exception as e:
-                logging.error(f"Resampling failed: {e}")
-                return
+    def process_segments(self, key, jb, segments):
+        for start, samples, kind in segments:
+            starttime = UTCDateTime(ns=int(round(start * 1e9 / jb.sample_rate)))
+            if kind == "gap":
+                logging.warning(f"🕳️ {key}: {len(samples) / jb.sample_rate:.2f}s of data missing at {starttime}, filled with silence")
+            elif kind == "resync":
+                logging.warning(f"⏭️ {key}: gap too long to fill or time jumped back, continuing at {starttime}")
+            self.process_block(key, jb.sample_rate, starttime, samples, gap=kind == "gap")
 
-        # Apply the taper
-        data = apply_taper(data, self.target_fs, self.taper_ms)
+    def process_block(self, key, fs_in, starttime, samples, gap=False):
+        """
+        Processes one block of a stream: runs the processing chain (detrend,
+        band-pass, gain, taper) at the native rate, resamples the result once,
+        and saves it as a .wav file. Gap blocks are silence and skip the chain.
+        With a DSP pool, the processing runs in a worker process and deliver()
+        is called from the pool's result thread. In time-shift mode, the raw
+        block only goes into the station's history.
+        """
+        if self.features is not None:
+            self.features.push(self.station_id, fs_in, np.zeros(len(samples)) if gap else samples)
+        if self.timeshift is not None:
+            self.timeshift.push(self.station_id, key, fs_in, starttime, samples, gap)
+            return
+        if self.dsp_pool is not None:
+            self.dsp_pool.submit(
+                self.lane, key, fs_in, starttime, samples, gap,
+                lambda data, block_start: self.deliver(data, block_start, gap, len(samples), fs_in),
+            )
+            return
+        try:
+            data, block_start = self.processor.process(key, fs_in, starttime, samples, gap)
+        except Exception as e:
+            logging.error(f"Processing failed: {e}")
+            return
+        self.deliver(data, block_start, gap, len(samples), fs_in)
 
+    def deliver(self, data, block_start, gap, n_in, fs_in):
+        """
+        Hands a processed block to playback (direct mode) or saves it as a .wav file.
+        """
+        self.block_start = block_start
+        self.block_gap = gap
         logging.info(
-            f"📱 Received block with {len(trace.data)} samples @ {fs_in} Hz "
+            f"📱 Received block with {n_in} samples @ {fs_in} Hz "
             f"→ {len(data)} samples @ {self.target_fs} Hz"
         )
 
+        t0 = time.perf_counter_ns() if metrics is not None else 0
+        if self.block_buffer is not None:
+            self.hand_over(data)
+        else:
+            self.write_wav(data)
+        if metrics is not None:
+            metrics.record("enqueue", t0)
+
+    def hand_over(self, data):
+        """
+        Direct mode: passes the block to playback in memory and, if enabled,
+        queues a copy for the archive writer without waiting for it.
+        """
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        self.block_buffer.put(data)
+        if self.archive_queue is not None:
+            try:
+                self.archive_queue.put_nowait(
+                    (self.station_id, self.archive_prefix, self.file_counter, data, self.target_fs,
+                     self.block_start, True if self.block_gap else None)
+                )
+            except queue.Full:
+                logging.warning("⚠️ Archive queue full, block not archived")
+        self.file_counter += 1
+        if self.file_counter == self.block_delay:
+            logging.info(
+                f"✅ {self.block_delay} blocks have been buffered and are ready for playback."
+            )
+
+    def write_wav(self, data):
+        """
+        Saves a processed block as a .wav file for the playback loader.
+        """
         ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
         fname = f"block_{self.file_counter:04d}_{ts}.wav"
         filepath = os.path.join(WAV_DIR, fname)
@@ -186,7 +423,7 @@ class WavDumpClient(EasySeedLinkClient):
             self.file_counter += 1
             block_counter['saved_total'] += 1
 
-            enforce_max_wav_files(self.max_wav_files)
+            wav_index.add(filepath)
 
             if self.file_counter == self.block_delay:
                 logging.info(
@@ -195,217 +432,776 @@ class WavDumpClient(EasySeedLinkClient):
         except Exception as e:
             logging.error(f"Error writing WAV file: {e}")
 
-def playback_loader(block_delay, wav_dir=WAV_DIR):
+def queue_block(data, latency, channel=None):
     """
-    Loads .wav files from a directory and adds them to the audio queue.
-    This function has been revised to avoid race conditions and
-    handle deleted files more robustly.
+    Writes one block into the audio queue. With adaptive latency, the block is
+    first resized (or dropped) by the latency controller, and after running dry
+    the queue is filled up to the controller's current target before it plays
+    again (mono), or the station resumes that far ahead (multi-station).
     """
-    played = set()
+    t0 = time.perf_counter_ns() if metrics is not None else 0
+    if latency is not None:
+        lead = int(latency.target_s * latency.sample_rate)
+        audio_ring.set_lead(lead) if channel is None else audio_ring.set_lead(lead, channel)
+        queued = audio_ring.available() if channel is None else audio_ring.available(channel)
+        data = latency.adjust(data, queued / latency.sample_rate)
+        if data is None:
+            logging.warning(f"⏩ {latency.queue_s:.0f}s queued, far above the {latency.target_s:.0f}s target: block dropped")
+            return
+    if channel is None:
+        audio_ring.write_all(data)
+    else:
+        audio_ring.write_all(data, channel)
+    if metrics is not None:
+        metrics.record("ring_write", t0)
+
+def playback_loader(block_delay, latency=None):
+    """
+    Loads .wav files in the order they were saved and adds them to the audio queue.
+    It follows the block index with a cursor (the number of the next block to load),
+    so it needs no directory scans and no growing set of played files.
+    """
+    cursor = 0
     while True:
-        wav_files = sorted(glob.glob(os.path.join(wav_dir, "*.wav")), key=os.path.getmtime)
-        # logging.debug(f"Current WAV files: {wav_files}") #debug
-        if len(wav_files) >= block_delay:
-            for filepath in wav_files:
-                if filepath not in played:
-                    if os.path.exists(filepath):
-                        logging.info(f"📥 Queueing block: {os.path.basename(filepath)}")
-                        try:
-                            data, _ = sf.read(filepath, dtype='float32')
-                            audio_queue.put(data)
-                            played.add(filepath)
-                        except Exception as e:
-                            logging.warning(f"Error reading {filepath}: {e}")
-                    else:
-                        logging.warning(f"File {filepath} was deleted before being loaded.")
-                    break
+        if len(wav_index) >= block_delay:
+            while cursor < wav_index.next:
+                if cursor < wav_index.first:
+                    logging.warning(f"{wav_index.first - cursor} block(s) were deleted before being loaded.")
+                    cursor = wav_index.first
+                    continue
+                filepath = wav_index.get(cursor)
+                cursor += 1
+                if filepath is None:
+                    continue
+                logging.info(f"📥 Queueing block: {os.path.basename(filepath)}")
+                try:
+                    data, _ = sf.read(filepath, dtype='float32')
+                    queue_block(data, latency)
+                except Exception as e:
+                    logging.warning(f"Error reading {filepath}: {e}")
         else:
             logging.info("⏳ Waiting for more blocks...")
         time.sleep(0.1)
 
+def direct_playback_loader(block_buffer, block_delay, channel=None, latency=None):
+    """
+    Direct mode counterpart of playback_loader: waits until block_delay blocks
+    have been received, then moves blocks from memory into the audio queue
+    (into the given channel in multi-station mode).
+    """
+    while block_buffer.received < block_delay and not block_buffer.closed:
+        logging.info("⏳ Waiting for more blocks...")
+        time.sleep(1)
+    while True:
+        data = block_buffer.get(timeout=1.0)
+        if data is None and block_buffer.closed:
+            return
+        if data is not None:
+            logging.info(f"📥 Queueing in-memory block ({len(data)} samples)")
+            queue_block(data, latency, channel)
+
+def timeshift_playback_loader(renderer, sid, channel=None, source_done=None):
+    """
+    Time-shift mode counterpart of direct_playback_loader: plays the newest part of
+    the station's history at --speed, pass after pass. Each pass is requested once
+    the previous one has almost been played, and comes from the renderer's cache
+    unless enough new data has arrived. For replays, waits until all data is in
+    and plays a single pass.
+    """
+    if source_done is not None:
+        source_done.wait()
+    while True:
+        queued = audio_ring.available() if channel is None else audio_ring.available(channel)
+        if queued > TIMESHIFT_LEAD_SECONDS * renderer.target_fs:
+            time.sleep(0.1)
+            continue
+        audio = renderer.render(sid)
+        if audio is None or len(audio) == 0:
+            if source_done is not None:
+                return
+            time.sleep(1)
+            continue
+        logging.info(f"🕰️ {sid}: queueing {len(audio) / renderer.target_fs:.1f}s of audio ({renderer.speed:g}x)")
+        queue_block(audio, None, channel)
+        if source_done is not None:
+            return
+
 def audio_callback(outdata, frames, time_info, status):
     """
     Callback function for the audio stream.
+    Copies straight from the ring buffer into outdata without allocating.
+    On underrun it never waits: the missing frames are concealed and counted.
+    It never logs; status flags are counted and reported by the status thread.
     """
-    global current_block, block_offset
     global stream_gap_duration
 
+    t0 = time.perf_counter_ns() if metrics is not None else 0
     if status:
-        logging.warning(f"⚠️ Audio stream status: {status}")
-    output = np.zeros((frames, 1), dtype=np.float32)
-    i = 0
+        callback_status['flags'] += 1
+        callback_status['last'] = status
 
-    while i < frames:
-        if current_block is None or block_offset >= len(current_block):
-            try:
-                current_block = audio_queue.get_nowait()
-                block_offset = 0
-            except queue.Empty:
-                start_gap = time.time()
-                while audio_queue.empty():
-                    time.sleep(0.01)
-                stream_gap_duration['total'] += time.time() - start_gap
-                logging.warning("⚠️ Audio queue underrun!")
-                output[i:] = 0.0
-                break
-
-        remaining = len(current_block) - block_offset
-        length = min(frames - i, remaining)
-        output[i:i+length, 0] = current_block[block_offset:block_offset+length]
-        i += length
-        block_offset += length
-    outdata[:] = output
+    n = audio_ring.read_into(outdata)
+    if n < frames:
+        if not concealer.in_gap:
+            stream_gap_duration['events'] += 1
+        stream_gap_duration['frames'] += frames - n
+    concealer.process(outdata, n)
+    if metrics is not None:
+        metrics.callback_done(t0, frames)
+
+def mixer_callback(outdata, frames, time_info, status):
+    """
+    Callback function for multi-station playback.
+    Reads all stations with one (frames x stations) copy from the shared ring
+    buffer and places them on their output channels; unmapped channels are silent.
+    Stations that run out of data are concealed separately (--underrun) and
+    their missing frames are counted like the gaps of single-stream playback
+    (one event per gap and station).
+    """
+    global mix_staging, stream_gap_duration
+
+    t0 = time.perf_counter_ns() if metrics is not None else 0
+    if status:
+        callback_status['flags'] += 1
+        callback_status['last'] = status
+
+    if channel_slice is not None:
+        stations = outdata[:, channel_slice]
+        audio_ring.read_into(stations)
+        stream_gap_duration['events'] += concealer.process(stations, audio_ring.short)
+        outdata[:, :channel_slice.start] = 0.0
+        outdata[:, channel_slice.stop:] = 0.0
+    else:
+        if frames > len(mix_staging):
+            mix_staging = np.zeros((frames, audio_ring.channels), dtype=np.float32)
+        staging = mix_staging[:frames]
+        audio_ring.read_into(staging)
+        stream_gap_duration['events'] += concealer.process(staging, audio_ring.short)
+        outdata.fill(0.0)
+        outdata[:, channel_map] = staging
+    stream_gap_duration['frames'] += int(audio_ring.short.sum())
+    if metrics is not None:
+        metrics.callback_done(t0, frames)
+
+def offline_sink(callback, channels, args, producing, finished):
+    """
+    Drives the audio callback without a sound device, for replays and profiling.
+    The output is discarded (--sink null) or written to a WAV file (--sink file).
+    It runs in real time, or as fast as the data arrives for --pace fast replays.
+    """
+    out = np.zeros((args.blocksize, channels), dtype=np.float32)
+    period = args.blocksize / args.target_fs
+    paced = not (args.replay and args.pace == "fast")
+    sink_file = None
+    if args.sink == "file":
+        sink_file = sf.SoundFile(args.sink_file, "w", samplerate=args.target_fs, channels=channels, subtype="FLOAT")
+        logging.info(f"💾 Writing output to {args.sink_file}")
+    next_time = time.monotonic()
+    try:
+        while not finished():
+            if not paced and audio_ring.min_available() < args.blocksize and producing():
+                time.sleep(0.001)  # No device clock to keep up with, so wait for data instead of concealing
+                continue
+            callback(out, args.blocksize, None, None)
+            if sink_file is not None:
+                sink_file.write(out)
+            if paced:
+                next_time += period
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        if sink_file is not None:
+            sink_file.close()
+
+def warm_up_playback(args, dsp_config, dsp_pool=None, sample_rates=WARMUP_SAMPLE_RATES, timeshift=None):
+    """
+    Does the slow one-time work before connecting, so that it cannot hold up the
+    first blocks: imports the audio modules this run will use and warms up the
+    processing chain and resampler for the expected sample rates (dsp.warm_up).
+    With DSP workers, waits for them to finish their own warm-up instead.
+    In time-shift mode, warms up the renderer.
+    """
+    t0 = time.perf_counter()
+    if args.sink == "device":
+        import sounddevice  # Loads PortAudio now instead of when playback starts
+    if args.mode == "wav" or args.archive_wav or args.sink == "file":
+        sf.load()
+    if sample_rates:
+        if dsp_pool is not None:
+            if not dsp_pool.wait_ready():
+                logging.error("Cannot process without the DSP workers, try without --dsp-workers")
+                sys.exit(1)
+        else:
+            warm_up(dsp_config, sample_rates)
+    if timeshift is not None and args.warmup:
+        timeshift.warm_up()
+    rates = f" ({', '.join(f'{fs:g}' for fs in sample_rates)} Hz)" if sample_rates else ""
+    logging.info(f"🔥 Warm-up took {time.perf_counter() - t0:.2f}s{rates}")
+
+def ring_capacity_frames(args):
+    """
+    Sizes the playback ring buffer (per channel): --buffer-seconds, or by default
+    room for the startup queue twice over, or for it plus a few blocks, whichever
+    is larger. Never more than MAX_BUFFER_SECONDS. Producers wait while it is full.
+    """
+    seconds = args.buffer_seconds
+    if seconds is None:
+        seconds = max(2 * args.min_queue_seconds, args.min_queue_seconds + 4 * ESTIMATED_BLOCK_SECONDS)
+    if seconds > MAX_BUFFER_SECONDS:
+        logging.warning(f"⚠️ Playback buffer limited to {MAX_BUFFER_SECONDS:g}s")
+        seconds = MAX_BUFFER_SECONDS
+    return int(seconds * args.target_fs)
 
 def queue_duration_seconds(target_fs):
     """Calculates the current duration of the audio queue in seconds."""
-    return sum(len(x) for x in list(audio_queue.queue)) / target_fs
+    return audio_ring.available() / target_fs
 
-def start(args, station):
+def start(args, stations, out_channels=None, traces=None):
     """
     Starts the entire streaming and playback process.
+
+    Args:
+        args: Parsed command line arguments.
+        stations (dict): Station ID -> station configuration, in playback order.
+        out_channels (list): 0-based output channel per station for multi-station
+            playback, or None to play a single station in mono.
+        traces (list): Traces to replay instead of connecting to SeedLink (--replay).
     """
     start_time = time.time()
     global block_counter
+    global audio_ring, concealer
+    global channel_map, channel_slice, mix_staging
+    global wav_index
+    global metrics
+    multi = out_channels is not None
     queue_empty_duration = {'total': 0.0}
 
     def update_status():
         """
         A thread that periodically writes the application status to a JSON file.
+        The file is only rewritten when a value changed (or every few seconds for
+        the uptime), and the queue averages are kept in O(1). Changes are also
+        pushed to the subscribers of the status socket and to OSC, if enabled.
         """
-        queue_durations = []
+        queue_sum = 0.0
+        queue_samples = 0
+        queue_ewma = None
+        alpha = 1.0 - np.exp(-1.0 / QUEUE_EWMA_SECONDS)  # One update per second
+        last_status = None
+        last_write = 0.0
+        underrun_events = 0
+        status_flags = 0
         logging.info("📊 Status thread started")
         while True:
-            elapsed = int(time.time() - start_time)
+            if stream_gap_duration['events'] > underrun_events:
+                underrun_events = stream_gap_duration['events']
+                logging.warning(f"⚠️ Audio queue underrun! ({underrun_events} so far, concealed with '{args.underrun}')")
+            if callback_status['flags'] > status_flags:
+                status_flags = callback_status['flags']
+                logging.warning(f"⚠️ Audio stream status: {callback_status['last']} ({status_flags} callbacks with status flags so far)")
+            queue_duration = queue_duration_seconds(args.target_fs)
+            queue_sum += queue_duration
+            queue_samples += 1
+            queue_ewma = queue_duration if queue_ewma is None else queue_ewma + alpha * (queue_duration - queue_ewma)
+            status = {
+                'queue_duration_sec': round(queue_duration, 2),
+                'queue_duration_avg_sec': round(queue_sum / queue_samples, 2),
+                'queue_duration_ewma_sec': round(queue_ewma, 2),
+                'block_count': block_counter['count'],
+                'block_saved_total': block_counter['saved_total'],
+                'queue_empty_time_total_sec': round(queue_empty_duration['total'], 2),
+                'stream_gap_total_sec': round(stream_gap_duration['frames'] / args.target_fs, 2),
+                'stream_gap_events': stream_gap_duration['events'],
+                **({'stations': station_status()} if multi else {}),
+                'timeline': timeline_status(),
+                **({'latency': {sid: latency.status() for sid, latency in latencies.items()}} if latencies else {}),
+                **({'metrics': metrics.summary()} if metrics is not None else {}),
+                **({'features': features.latest} if features is not None else {}),
+                **({'timeshift': timeshift.status()} if timeshift is not None else {}),
+            }
+            now = time.time()
+            elapsed = int(now - start_time)
             days, rem = divmod(elapsed, 86400)
             hours, rem = divmod(rem, 3600)
             minutes, seconds = divmod(rem, 60)
             uptime_str = f"{days:02}:{hours:02}:{minutes:02}:{seconds:02}"
-            queue_duration = queue_duration_seconds(args.target_fs)
-            queue_durations.append(queue_duration)
-            avg_queue_duration = sum(queue_durations) / len(queue_durations) if queue_durations else 0.0
-            try:
-                with open("status.json", "w", encoding="utf-8") as f:
-                    json.dump(
-                        {
-                            'args': vars(args),
-                            'uptime': uptime_str,
-                            'queue_duration_sec': round(queue_duration, 2),
-                            'queue_duration_avg_sec': round(avg_queue_duration, 2),
-                            'block_count': block_counter['count'],
-                            'block_saved_total': block_counter['saved_total'],
-                            'queue_empty_time_total_sec': round(queue_empty_duration['total'], 2),
-                            'stream_gap_total_sec': round(stream_gap_duration['total'], 2),
-                        },
-                        f,
-                        indent=2,
-                    )
-                time.sleep(1)
-            except Exception as e:
-                logging.error(f"❌ Could not write status.json: {e}")
+            if publisher is not None:
+                try:
+                    publisher.publish({'args': vars(args), 'uptime': uptime_str, **status})
+                except Exception as e:
+                    logging.error(f"❌ Could not push the status: {e}")
+            if status != last_status or now - last_write >= STATUS_HEARTBEAT_SECONDS:
+                try:
+                    write_json_atomic(STATUS_FILE, {'args': vars(args), 'uptime': uptime_str, **status})
+                    last_status = status
+                    last_write = now
+                except Exception as e:
+                    logging.error(f"❌ Could not write {STATUS_FILE}: {e}")
+            time.sleep(1)
+
+    def station_status():
+        """
+        Per-station buffer and gap figures for multi-station mode.
+        """
+        return {
+            sid: {
+                'output_channel': int(out_channels[i]) + 1,
+                'queue_duration_sec': round(audio_ring.available(i) / args.target_fs, 2),
+                'stream_gap_total_sec': round(int(audio_ring.gap_frames[i]) / args.target_fs, 2),
+            }
+            for i, sid in enumerate(stations)
+        }
+
+    def timeline_status():
+        """
+        Jitter buffer counters per station (duplicates, overlaps, reordered records, gaps).
+        """
+        status = {}
+        for sid, client in clients.items():
+            totals = {}
+            gap_sec = 0.0
+            for jb in list(client.jitter.values()):
+                for name, value in jb.stats.items():
+                    totals[name] = totals.get(name, 0) + value
+                gap_sec += jb.stats['gap_samples'] / jb.sample_rate
+            if totals:
+                totals['gap_sec'] = round(gap_sec, 2)
+            status[sid] = totals
+        return status
 
     def track_queue_empty():
         """
         A thread that measures the time the audio queue is empty.
         """
-        while queue_duration_seconds(args.target_fs) < args.min_queue_seconds:
+        while queue_duration_seconds(args.target_fs) < min_queue_seconds():
             time.sleep(0.1)
         while True:
-            if audio_queue.empty():
+            if audio_ring.available() == 0:
                 start_empty = time.time()
-                while audio_queue.empty():
+                while audio_ring.available() == 0:
                     time.sleep(0.1)
                 queue_empty_duration['total'] += time.time() - start_empty
             time.sleep(1)
 
     def block_count_monitor():
         """
-        A thread that counts the number of WAV files in the output directory.
+        A thread that counts the number of buffered blocks
+        (WAV files in the output directory, or in-memory blocks in direct mode).
         """
         while True:
-            wav_files = glob.glob(os.path.join(WAV_DIR, "*.wav"))
-            block_counter['count'] = len(wav_files)
+            if block_buffers:
+                block_counter['count'] = sum(len(b) for b in block_buffers)
+            else:
+                block_counter['count'] = len(wav_index)
             time.sleep(2)
 
+    if args.metrics or args.metrics_port:
+        metrics = Metrics(args.target_fs, callback_status)
+        if args.metrics_port:
+            serve_metrics(metrics, args.metrics_port)
+
+    dsp_config = {
+        'target_fs': args.target_fs, 'stages': parse_chain(args.chain), 'gain': args.gain,
+        'taper_ms': args.taper, 'bandpass': tuple(args.bandpass), 'resampler': args.resampler,
+    }
+    # Replays know their sample rates, live streams only once the first record arrives
+    if traces is not None:
+        sample_rates = sorted({trace.stats.sampling_rate for trace in traces})
+    else:
+        sample_rates = args.warmup_rates
+    if not args.warmup:
+        sample_rates = []
+
+    timeshift = None
+    if args.timeshift:
+        # Blocks only go into the history; the chain, DSP workers and block path are not used
+        timeshift = TimeShiftRenderer(args.target_fs, args.timeshift * 3600, args.speed)
+        sample_rates = []
+        logging.info(f"🕰️ Time-shift playback: the last {args.timeshift:g} h at {args.speed:g}x, rendered from memory")
+        if args.dsp_workers > 0 or args.archive_wav or args.archive_segments:
+            logging.warning("⚠️ --dsp-workers and the archive options have no effect in time-shift mode")
+
+    dsp_pool = None
+    if args.dsp_workers > 0 and timeshift is None:
+        # Started before the SeedLink threads; the workers get their own copy of the chain settings
+        dsp_pool = DspPool(args.dsp_workers, dsp_config, metrics=metrics, warmup_rates=sample_rates)
+        atexit.register(dsp_pool.close)
+
+    features = None
+    if args.features or args.features_osc:
+        features = FeatureExtractor()
+        threading.Thread(
+            target=feature_loop,
+            args=(features, parse_osc_target(args.features_osc) if args.features_osc else None, args.features_interval),
+            daemon=True,
+        ).start()
+
     delete_all_wav_files()
+    wav_index = WavBlockIndex(args.max_wav_files)
+    wav_index.scan()
 
-    # Start the threads
-    threading.Thread(
-        target=lambda: WavDumpClient(
-            server=station["server"],
-            network=station["network"],
-            station=station["station"],
-            channel=station["channel"],
+    if multi:
+        audio_ring = MultiChannelRingBuffer(
+            ring_capacity_frames(args),
+            len(stations),
+            lead=int((TIMESHIFT_LEAD_SECONDS if timeshift is not None else args.min_queue_seconds) * args.target_fs),
+        )
+        channel_map = np.asarray(out_channels, dtype=np.intp)
+        if np.array_equal(channel_map, np.arange(channel_map[0], channel_map[0] + len(channel_map))):
+            channel_slice = slice(int(channel_map[0]), int(channel_map[0]) + len(channel_map))
+        mix_staging = np.zeros((max(args.blocksize, 1), len(stations)), dtype=np.float32)
+        concealer = MultiChannelConcealer(args.underrun, len(stations), args.target_fs)
+    else:
+        audio_ring = AudioRingBuffer(ring_capacity_frames(args))
+        concealer = UnderrunConcealer(args.underrun, audio_ring.channels, args.target_fs)
+    logging.info(f"🔁 Playback ring buffer: {audio_ring.capacity / args.target_fs:.0f}s x {audio_ring.channels} channel(s)")
+    if (multi or traces is not None or timeshift is not None) and args.mode != "direct":
+        logging.info("🧩 Multi-station playback and replays always use the in-memory (direct) block path")
+        args.mode = "direct"
+
+    block_buffers = []
+    archive_queue = None
+    if args.mode == "direct" and timeshift is None:
+        block_buffers = [BlockBuffer(max(args.max_wav_files, args.block_delay)) for _ in stations]
+        if args.archive_wav or args.archive_segments:
+            archive_queue = queue.Queue(maxsize=max(args.max_wav_files, 1))
+            threading.Thread(
+                target=lambda: archive_writer(
+                    archive_queue, args.archive_wav, ARCHIVE_DIR if args.archive_segments else None,
+                    args.segment_minutes * 60, args.max_segments,
+                ),
+                daemon=True,
+            ).start()
+
+    if args.latency == "adaptive" and traces is not None:
+        logging.info("🧩 Replays use fixed latency (arrival times say nothing about the network)")
+        args.latency = "fixed"
+    if args.latency == "adaptive" and timeshift is not None:
+        logging.info("🧩 Time-shift playback does not follow the network, latency is fixed")
+        args.latency = "fixed"
+    latencies = {}
+    if args.latency == "adaptive":
+        latencies = {
+            sid: LatencyController(
+                args.target_fs, args.jitter_percentile, args.latency_margin, initial_target_s=args.min_queue_seconds
+            )
+            for sid in stations
+        }
+    block_delay = 1 if latencies else args.block_delay
+
+    warm_up_playback(args, dsp_config, dsp_pool, sample_rates, timeshift)
+
+    # Start the threads (one SeedLink connection per server, shared by its stations)
+    clients = {}
+    for i, sid in enumerate(stations):
+        clients[sid] = WavDumpClient(
             target_fs=args.target_fs,
             max_wav_files=args.max_wav_files,
-            block_delay=args.block_delay,
+            block_delay=block_delay,
             taper_ms=args.taper,
-        ).run(),
-        daemon=True,
-    ).start()
+            block_buffer=block_buffers[i] if block_buffers else None,
+            archive_queue=archive_queue,
+            resampler=args.resampler,
+            archive_prefix=f"{sid}_" if multi else "",
+            station_id=sid,
+            gain=args.gain,
+            chain=args.chain,
+            bandpass=tuple(args.bandpass),
+            jitter_window=args.jitter_window,
+            max_fill=args.max_fill,
+            latency=latencies.get(sid),
+            dsp_pool=dsp_pool,
+            features=features,
+            timeshift=timeshift,
+        )
+    callbacks = {sid: client.on_data for sid, client in clients.items()}
+    source_done = threading.Event()
+    if traces is not None:
+        def replay_source():
+            """
+            A thread that feeds the replayed traces to the station consumers, then closes their buffers.
+            The buffers are closed even if the replay fails, so that playback ends instead of waiting.
+            """
+            try:
+                by_trace_id = {}
+                for trace in traces:
+                    if trace.id not in by_trace_id:
+                        for sid, conf in stations.items():
+                            if matches_selector(trace.stats, conf["network"], conf["station"], conf["channel"]):
+                                by_trace_id[trace.id] = callbacks[sid]
+                                break
+                count = replay_traces(traces, by_trace_id, args.pace)
+                logging.info(f"🏁 Replay finished after {count} traces")
+                for client in clients.values():
+                    client.flush()
+                if dsp_pool is not None:
+                    dsp_pool.join()
+            except Exception as e:
+                logging.error(f"❌ Replay failed: {e}")
+            finally:
+                for block_buffer in block_buffers:
+                    block_buffer.close()
+                source_done.set()
 
-    threading.Thread(
-        target=lambda: playback_loader(args.block_delay),
-        daemon=True,
-    ).start()
+        threading.Thread(target=replay_source, daemon=True).start()
+    elif args.ingest == "asyncio":
+        start_async_ingest(stations, callbacks)
+    else:
+        start_shared_clients(stations, callbacks)
 
+    loaders = []
+    if timeshift is not None:
+        for i, sid in enumerate(stations):
+            loader = threading.Thread(
+                target=timeshift_playback_loader,
+                args=(timeshift, sid, i if multi else None, source_done if traces is not None else None),
+                daemon=True,
+            )
+            loader.start()
+            loaders.append(loader)
+    elif block_buffers:
+        for i, (sid, block_buffer) in enumerate(zip(stations, block_buffers)):
+            loader = threading.Thread(
+                target=lambda block_buffer=block_buffer, i=i, sid=sid: direct_playback_loader(
+                    block_buffer, block_delay, i if multi else None, latencies.get(sid)
+                ),
+                daemon=True,
+            )
+            loader.start()
+            loaders.append(loader)
+    else:
+        threading.Thread(
+            target=lambda: playback_loader(block_delay, next(iter(latencies.values()), None)),
+            daemon=True,
+        ).start()
+
+    def min_queue_seconds():
+        """The queue needed to start playback: fixed, or the largest target latency."""
+        if latencies:
+            return max(latency.target_s for latency in latencies.values())
+        if timeshift is not None:
+            return min(args.min_queue_seconds, TIMESHIFT_LEAD_SECONDS)  # Passes are rendered just in time
+        return args.min_queue_seconds
+
+    publisher = None
+    if args.status_socket or args.status_osc:
+        publisher = StatusPublisher(
+            args.status_socket or None, parse_osc_target(args.status_osc) if args.status_osc else None, "/streamplayer"
+        )
+        atexit.register(publisher.close)
     threading.Thread(target=update_status, daemon=True).start()
     threading.Thread(target=track_queue_empty, daemon=True).start()
     threading.Thread(target=block_count_monitor, daemon=True).start()
 
-    logging.info(f"⏳ Waiting for {args.min_queue_seconds}s of audio in queue...")
-    while queue_duration_seconds(args.target_fs) < args.min_queue_seconds:
+    def producing():
+        """True while blocks may still arrive (always for live streams)."""
+        return not source_done.is_set() or any(loader.is_alive() for loader in loaders)
+
+    def finished():
+        """True once a replay has been played out completely."""
+        return not producing() and audio_ring.available() == 0
+
+    if latencies:
+        logging.info("⏳ Waiting for the target latency to be buffered...")
+    else:
+        logging.info(f"⏳ Waiting for {min_queue_seconds()}s of audio in queue...")
+    while queue_duration_seconds(args.target_fs) < min_queue_seconds() and not source_done.is_set():
         time.sleep(0.1)
     logging.info("✅ Audio queue filled with minimum required duration. Starting playback...")
 
+    out_channel_count = int(channel_map.max()) + 1 if multi else 1
+    callback = mixer_callback if multi else audio_callback
     try:
-        with sd.OutputStream(
-            samplerate=args.target_fs,
-            channels=1,
-            callback=audio_callback,
-            blocksize=args.blocksize,
-            dtype='float32',
-            device=args.device,
-        ):
-            while True:
-                time.sleep(0.1)
-    except sd.PortAudioError as e:
-        logging.error(f"Error during audio playback: {e}")
-        sys.exit(1)
+        if args.sink == "device":
+            import sounddevice as sd  # Only device output needs PortAudio
+            try:
+                with sd.OutputStream(
+                    samplerate=args.target_fs,
+                    channels=out_channel_count,
+                    callback=callback,
+                    blocksize=args.blocksize,
+                    dtype='float32',
+                    device=args.device,
+                ):
+                    while not finished():
+                        time.sleep(0.1)
+            except sd.PortAudioError as e:
+                logging.error(f"Error during audio playback: {e}")
+                sys.exit(1)
+        else:
+            offline_sink(callback, out_channel_count, args, producing, finished)
+        logging.info(f"✅ Playback finished after {time.time() - start_time:.1f}s")
     except KeyboardInterrupt:
         logging.info("🛑 Stopped by user.")
     except Exception as e:
         logging.error(f"Unhandled error: {e}")
         sys.exit(1)
 
+def parse_station_ids(value, all_stations):
+    """
+    Turns "01", "01,02,05", "all" or "best:N" into a list of station IDs from
+    stations.json. "best:N" picks the N healthiest stations of the last week from
+    the history recorded by stationmonitor1.3.py.
+    """
+    if value.strip().lower() == "all":
+        return list(all_stations)
+    if value.strip().lower().startswith("best"):
+        from health_store import HealthStore, HEALTH_DB, DEFAULT_BEST_DAYS
+        try:
+            n = int(value.split(":", 1)[1]) if ":" in value else 1
+        except ValueError:
+            logging.error(f"Invalid station selection '{value}' (expected best:N)")
+            sys.exit(1)
+        if not os.path.exists(HEALTH_DB):
+            logging.error(f"No station health history ({HEALTH_DB}), run stationmonitor1.3.py first")
+            sys.exit(1)
+        station_ids = HealthStore(HEALTH_DB).best_stations(n, DEFAULT_BEST_DAYS, candidates=all_stations)
+        if not station_ids:
+            logging.error(f"No station with recorded health in the last {DEFAULT_BEST_DAYS:g} days")
+            sys.exit(1)
+        logging.info(f"🏆 Healthiest stations: {', '.join(station_ids)}")
+        return station_ids
+    station_ids = [sid.strip() for sid in value.split(",") if sid.strip()]
+    for sid in station_ids:
+        if sid not in all_stations:
+            logging.error(f"Station ID '{sid}' not found in {STATIONS_FILE}")
+            sys.exit(1)
+    return station_ids
+
+def parse_channel_map(value, station_ids):
+    """
+    Turns a channel map like "01:1,02:5" (1-based output channels) into a list of
+    0-based output channels, one per station ID. Without a map the stations are
+    placed on consecutive channels starting at channel 1.
+    """
+    if not value:
+        return list(range(len(station_ids)))
+    mapping = {}
+    for item in value.split(","):
+        try:
+            sid, ch = item.split(":")
+            mapping[sid.strip()] = int(ch) - 1
+        except ValueError:
+            logging.error(f"Invalid channel map entry '{item}' (expected STATION_ID:CHANNEL)")
+            sys.exit(1)
+    missing = [sid for sid in station_ids if sid not in mapping]
+    if missing:
+        logging.error(f"No output channel mapped for station ID(s): {', '.join(missing)}")
+        sys.exit(1)
+    out_channels = [mapping[sid] for sid in station_ids]
+    if min(out_channels) < 0 or len(set(out_channels)) != len(out_channels):
+        logging.error("Output channels in the channel map must be >= 1 and unique")
+        sys.exit(1)
+    return out_channels
+
+def replay_stations(traces, all_stations, station_ids=None):
+    """
+    Works out which streams to play from a replay: the given stations from
+    stations.json, or otherwise every stream found in the files (keyed by trace.id).
+    """
+    if station_ids:
+        return {sid: all_stations[sid] for sid in station_ids}
+    stations = {}
+    for trace in traces:
+        if trace.id not in stations:
+            stats = trace.stats
+            stations[trace.id] = {"server": "replay", "network": stats.network,
+                                  "station": stats.station, "channel": stats.channel}
+    return stations
+
 def main():
     """
     Main function of the script.
     """
     parser = argparse.ArgumentParser(description="Stream SeedLink data and play as audio")
-    parser.add_argument("--station-id", type=str, required=True, help="Station ID from stations.json (e.g. 01)")
-    parser.add_argument("--block-delay", type=int, default=DEFAULT_BLOCK_DELAY, help="Number of blocks to buffer before playback")
+    parser.add_argument("--station-id", type=str, default=None, help="Station ID from stations.json (e.g. 01), a comma-separated list (e.g. 01,02,05), 'all', or 'best:N' for the N healthiest stations of the last week")
+    parser.add_argument("--block-delay", type=int, default=None, help=f"Number of blocks to buffer before playback, with --latency fixed (default: {DEFAULT_BLOCK_DELAY})")
     parser.add_argument("--target-fs", type=int, default=DEFAULT_TARGET_FS, help="Target sampling rate for audio")
     parser.add_argument("--blocksize", type=int, default=DEFAULT_BLOCKSIZE, help="Audio block size for playback")
     parser.add_argument("--max-wav-files", type=int, default=DEFAULT_MAX_WAV_FILES, help="Maximum number of .wav files to keep")
     parser.add_argument("--min-queue-seconds", type=float, default=DEFAULT_MIN_QUEUE_SECONDS, help="Minimum audio queue duration before playback starts")
+    parser.add_argument("--buffer-seconds", type=float, default=None, help=f"Size of the playback buffer per channel in seconds (default: twice --min-queue-seconds or it plus {4 * ESTIMATED_BLOCK_SECONDS:g}s, at most {MAX_BUFFER_SECONDS:g}s)")
     parser.add_argument("--device", type=str, default=DEFAULT_DEVICE_NAME, help="Name of the audio output device")
     parser.add_argument("--taper", type=int, default=DEFAULT_TAPER_MS, help="Taper duration in milliseconds (0 for no taper)")
+    parser.add_argument("--mode", choices=["wav", "direct"], default=DEFAULT_MODE, help="'wav' passes blocks through wav_blocks/, 'direct' hands them to playback in memory")
+    parser.add_argument("--resampler", choices=["streaming", "resampy"], default=DEFAULT_RESAMPLER, help="'streaming' keeps filter state across blocks, 'resampy' resamples each block on its own")
+    parser.add_argument("--ingest", choices=["threads", "asyncio"], default=DEFAULT_INGEST, help="'threads' runs one blocking SeedLink client thread per server, 'asyncio' runs all sessions in one event loop with reconnect backoff")
+    parser.add_argument("--gain", choices=GAIN_MODES, default=DEFAULT_GAIN, help="Normalization: decaying peak, RMS AGC, rolling percentile, or the largest value ever seen ('max')")
+    parser.add_argument("--chain", type=str, default=DEFAULT_CHAIN, help="Processing stages at the native rate, in order, from detrend,bandpass,gain,taper")
+    parser.add_argument("--bandpass", type=float, nargs=2, default=list(DEFAULT_BANDPASS), metavar=("FMIN", "FMAX"), help="Corner frequencies (Hz) of the bandpass stage")
+    parser.add_argument("--latency", choices=["adaptive", "fixed"], default=DEFAULT_LATENCY, help="'adaptive' buffers just enough for the measured arrival jitter, 'fixed' uses --block-delay and --min-queue-seconds")
+    parser.add_argument("--jitter-percentile", type=float, default=DEFAULT_JITTER_PERCENTILE, help="Arrival jitter percentile covered by the adaptive buffer")
+    parser.add_argument("--latency-margin", type=float, default=DEFAULT_MARGIN_SECONDS, help="Seconds added to the adaptive target latency")
+    parser.add_argument("--jitter-window", type=float, default=DEFAULT_JITTER_WINDOW_SECONDS, help="Seconds of data to wait for late or missing records before declaring a gap (0 = pass records through as they arrive)")
+    parser.add_argument("--max-fill", type=float, default=DEFAULT_MAX_FILL_SECONDS, help="Gaps up to this many seconds are filled with silence, longer ones are skipped")
+    parser.add_argument("--underrun", choices=UNDERRUN_STRATEGIES, default=DEFAULT_UNDERRUN, help="What to play when the audio buffer runs empty")
+    parser.add_argument("--channel-map", type=str, default=None, help="Output channel per station, e.g. 01:1,02:5 (default: consecutive channels from 1)")
+    parser.add_argument("--replay", nargs="+", default=None, help="Replay archived miniSEED files (paths or glob patterns) instead of connecting to SeedLink")
+    parser.add_argument("--pace", choices=["realtime", "fast"], default=DEFAULT_PACE, help="Replay pacing: as recorded, or as fast as possible")
+    parser.add_argument("--sink", choices=["device", "null", "file"], default=None, help="Audio output: sound device, discard, or WAV file (default: device, or null for replays)")
+    parser.add_argument("--sink-file", type=str, default=DEFAULT_SINK_FILE, help="Output file for --sink file")
+    parser.add_argument("--dsp-workers", type=int, default=0, help="Run the processing chain and resampling in this many worker processes (0 = in the SeedLink threads)")
+    parser.add_argument("--warmup-rates", type=float, nargs="+", default=list(WARMUP_SAMPLE_RATES), metavar="HZ", help="Native sample rates to warm up the processing chain and resampler for before connecting (replays use the rates of their files)")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the warm-up; the first block of each stream then pays for it")
+    parser.add_argument("--timeshift", type=float, default=None, metavar="HOURS", help="Time-shift playback: keep this many hours of each station at its native rate and play them, over and over, --speed times faster")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED, help="Speed factor of time-shift playback (60 = 1 hour in 1 minute)")
+    parser.add_argument("--status-socket", type=str, default=STATUS_SOCKET, help="Unix socket that pushes status changes to statusviewer.py ('' to disable)")
+    parser.add_argument("--status-osc", type=str, default=None, metavar="HOST:PORT", help="Also send every status change as OSC messages (/streamplayer/...) over UDP, e.g. to [udpreceive] in Max")
+    parser.add_argument("--features", action="store_true", help="Compute control features (RMS, STA/LTA, dominant frequency, peak) per station at the native rate and add them to the status")
+    parser.add_argument("--features-osc", type=str, default=None, metavar="HOST:PORT", help="Send the features as OSC messages /features/<station id> over UDP (implies --features)")
+    parser.add_argument("--features-interval", type=float, default=DEFAULT_FEATURE_INTERVAL_SECONDS, help="Seconds between feature updates")
+    parser.add_argument("--metrics", action="store_true", help="Time every processing stage and the audio callback, and add the figures to status.json")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Also serve the figures for Prometheus on http://127.0.0.1:PORT/metrics (implies --metrics)")
+    parser.add_argument("--archive-wav", action="store_true", help="In direct mode, also write blocks to wav_blocks/ in a background thread")
+    parser.add_argument("--archive-segments", action="store_true", help="In direct mode, also append blocks to float32 segment files in archive/<station id>/")
+    parser.add_argument("--segment-minutes", type=float, default=DEFAULT_SEGMENT_SECONDS / 60, help="Audio per segment file of the segment archive (float32: 10.6 MB per minute at 44.1 kHz)")
+    parser.add_argument("--max-segments", type=int, default=DEFAULT_MAX_SEGMENTS, help="Segment files kept per station (0 = keep all); the archive takes up to this times the size of one segment per station")
 
     args = parser.parse_args()
-    all_stations = load_stations_json()
-
-    if args.station_id not in all_stations:
-        logging.error(f"Station ID '{args.station_id}' not found in {STATIONS_FILE}")
-        sys.exit(1)
+    if args.block_delay is None:
+        args.block_delay = DEFAULT_BLOCK_DELAY
+    elif args.latency == "adaptive" and not args.replay and not args.timeshift:  # Those always use fixed latency
+        logging.warning("⚠️ --block-delay has no effect with adaptive latency, add --latency fixed to use it")
+    if args.sink is None:
+        args.sink = "null" if args.replay else "device"
+    if args.station_id is None and not args.replay:
+        parser.error("--station-id is required unless --replay is used")
+    try:
+        parse_chain(args.chain)
+    except ValueError as e:
+        parser.error(str(e))
+    all_stations = load_stations_json() if args.station_id else {}
 
-    station_conf = all_stations[args.station_id]
+    station_ids = parse_station_ids(args.station_id, all_stations) if args.station_id else []
+    traces = None
+    if args.replay:
+        traces = load_traces(args.replay)
+        if not traces:
+            logging.error("No readable miniSEED data to replay")
+            sys.exit(1)
+        logging.info(f"📼 Loaded {len(traces)} traces to replay ({args.pace})")
+        stations = replay_stations(traces, all_stations, station_ids)
+        station_ids = list(stations)
+    else:
+        stations = {sid: all_stations[sid] for sid in station_ids}
+    out_channels = None
+    if len(station_ids) > 1 or args.channel_map:
+        out_channels = parse_channel_map(args.channel_map, station_ids)
 
-    logging.info(f"🎮 Starting stream for station ID {args.station_id}")
-    logging.info(f"  🌍 Server: {station_conf['server']}")
-    logging.info(f"  📱 Stream: {station_conf['network']}.{station_conf['station']}.{station_conf['channel']}")
+    for i, sid in enumerate(station_ids):
+        station_conf = stations[sid]
+        logging.info(f"🎮 Starting stream for station ID {sid}")
+        logging.info(f"  🌍 Server: {station_conf['server']}")
+        logging.info(f"  📱 Stream: {station_conf['network']}.{station_conf['station']}.{station_conf['channel']}")
+        if out_channels is not None:
+            logging.info(f"  🔈 Output channel: {out_channels[i] + 1}")
     logging.info(f"  🎷 Device: {args.device}")
+    archives = [name for name, enabled in (("WAV", args.archive_wav), ("segment", args.archive_segments)) if enabled]
+    logging.info(f"  ⏱️ Latency: {args.latency}")
+    logging.info(f"  🧩 Mode: {args.mode}{' (+ ' + ' and '.join(archives) + ' archive)' if archives else ''}")
 
-    start(args, station_conf)
+    start(args, stations, out_channels, traces)
 
 if __name__ == "__main__":
     main()
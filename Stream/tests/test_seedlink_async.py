@@ -0,0 +1,70 @@
+import asyncio
+import numpy as np
+from obspy import Trace, UTCDateTime
+from fake_seedlink import FakeSeedLinkServer
+from replay import load_records
+from seedlink_async import AsyncSeedLinkEngine
+
+SAMPLES = 3000
+
+
+def make_records(tmp_path):
+    """Writes one synthetic GE.KBU..BHZ trace to miniSEED and returns its SeedLink records."""
+    trace = Trace(np.arange(SAMPLES, dtype=np.int32), header={
+        'network': "GE", 'station': "KBU", 'channel': "BHZ", 'sampling_rate': 20.0,
+        'starttime': UTCDateTime(2026, 1, 1),
+    })
+    path = tmp_path / "kbu.mseed"
+    trace.write(str(path), format="MSEED", reclen=512)
+    return load_records([str(path)])
+
+
+def receive(records, selectors):
+    """
+    Serves `records` with the fake server and runs the async engine on `selectors`
+    until every record of the first selector has arrived.
+
+    Returns:
+        tuple: (traces of the first selector, engine status of the server)
+    """
+    async def main():
+        server = await FakeSeedLinkServer(records).start()
+        address = f"127.0.0.1:{server.port}"
+        engine = AsyncSeedLinkEngine(backoff_initial=0.1, net_timeout=5)
+        streams = [engine.subscribe(address, *selector) for selector in selectors]
+        run = asyncio.create_task(engine.run())
+        traces = []
+        try:
+            async def collect():
+                async for trace in streams[0]:
+                    traces.append(trace)
+                    if len(traces) == len(records):
+                        return
+            await asyncio.wait_for(collect(), 10)
+        finally:
+            engine.stop()
+            await run
+            await server.close()
+        return traces, engine.status[address]
+
+    return asyncio.run(main())
+
+
+def test_receives_all_records_in_order(tmp_path):
+    records = make_records(tmp_path)
+    traces, status = receive(records, [("GE", "KBU", "BHZ")])
+
+    assert len(traces) == len(records) > 1
+    assert {trace.id for trace in traces} == {"GE.KBU..BHZ"}
+    assert np.array_equal(np.concatenate([trace.data for trace in traces]), np.arange(SAMPLES))
+    assert status['packets'] == len(records)
+    assert status['reconnects'] == 0
+
+
+def test_rejected_station_keeps_session_alive(tmp_path):
+    records = make_records(tmp_path)
+    traces, status = receive(records, [("GE", "KBU", "BHZ"), ("XX", "NONE", "BHZ")])
+
+    assert len(traces) == len(records)
+    assert status['rejected'] == ["XX.NONE"]
+    assert status['reconnects'] == 0
@@ -0,0 +1,58 @@
+import json
+import socket
+from status_channel import StatusPublisher, apply_delta, subscribe
+
+
+def test_running_publisher_keeps_its_socket(tmp_path):
+    path = str(tmp_path / "status.sock")
+    first = StatusPublisher(path)
+    first.publish({'state': "playing"})
+    second = StatusPublisher(path)
+    try:
+        assert second.server is None
+        assert next(subscribe(path)) == {'state': "playing"}
+    finally:
+        second.close()
+        first.close()
+
+
+def test_stale_socket_file_is_replaced(tmp_path):
+    path = str(tmp_path / "status.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()  # The file stays, with nobody listening
+    publisher = StatusPublisher(path)
+    try:
+        assert publisher.server is not None
+    finally:
+        publisher.close()
+
+
+def test_slow_subscriber_gets_whole_lines_and_catches_up(tmp_path):
+    path = str(tmp_path / "status.sock")
+    publisher = StatusPublisher(path)
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    conn.connect(path)
+    try:
+        conn.settimeout(1)
+        assert conn.recv(4096) == b'{"full": {}}\n'  # Subscribed
+        for i in range(200):  # Far more than fits into the socket buffers while nobody reads
+            publisher.publish({'i': i, 'payload': f"{i:05d}" * 4000})
+        state, data = {}, b""
+        while state.get('i') != 199:
+            chunk = conn.recv(65536)
+            assert chunk
+            data += chunk
+            *lines, data = data.split(b"\n")
+            for line in lines:
+                message = json.loads(line)
+                if 'full' in message:
+                    state = message['full']
+                else:
+                    apply_delta(state, message['delta'], message['removed'])
+            publisher.publish({'i': 199, 'payload': f"{199:05d}" * 4000})  # Unchanged: only sends what is left
+        assert state['payload'] == f"{199:05d}" * 4000
+    finally:
+        conn.close()
+        publisher.close()
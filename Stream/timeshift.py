@@ -0,0 +1,194 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from dsp import Taper, signal
+from resampler import resample_ratio
+
+# ----------------------------
+# Default configuration
+DEFAULT_SPEED = 60.0  # 1 hour of data in 1 minute
+DEFAULT_MAX_STALE_SECONDS = 10.0  # A cached render is reused until this much newer data has arrived
+DEFAULT_CACHE_ENTRIES = 8  # Renders kept (one per station, window length and speed)
+HIGHPASS_HZ = 20.0  # Audio below this is inaudible; removed before normalizing so it takes no headroom
+PEAK_LEVEL = 0.9  # Peak amplitude of a render
+FADE_MS = 50  # Fade-in and fade-out of every render, so that passes join without clicks
+# ----------------------------
+
+
+class StationHistory:
+    """
+    Rolling native-rate history of one stream: a float32 ring of `seconds`
+    seconds, indexed by absolute sample number, with missing data stored as NaN.
+    At 20 Hz, 24 hours take 7 MB.
+    """
+
+    def __init__(self, sample_rate, seconds):
+        self.sample_rate = sample_rate
+        self.capacity = max(int(seconds * sample_rate), 1)
+        self.data = np.full(self.capacity, np.nan, dtype=np.float32)
+        self.end = None  # Absolute sample number after the newest sample
+        self.count = 0  # Samples held (up to capacity)
+        self.lock = threading.Lock()  # Held only to copy samples in or out
+
+    def append(self, starttime, samples, gap=False):
+        """
+        Adds a block. Overlaps with what is already held are dropped, holes before
+        the block (and gap blocks) are stored as NaN.
+        """
+        start = int(round(starttime.ns * self.sample_rate / 1e9))
+        values = np.full(len(samples), np.nan, dtype=np.float32) if gap else np.asarray(samples, dtype=np.float32)
+        if len(values) > self.capacity:
+            start += len(values) - self.capacity
+            values = values[-self.capacity:]
+        with self.lock:
+            if self.end is not None:
+                if start < self.end:
+                    values = values[self.end - start:]
+                    start = self.end
+                elif start > self.end:
+                    missing = min(start - self.end, self.capacity)
+                    self.write(start - missing, np.full(missing, np.nan, dtype=np.float32))
+            self.write(start, values)
+
+    def write(self, start, values):
+        n = len(values)
+        if n == 0:
+            return
+        pos = start % self.capacity
+        first = min(n, self.capacity - pos)
+        self.data[pos:pos + first] = values[:first]
+        self.data[:n - first] = values[first:]
+        self.end = start + n
+        self.count = min(self.count + n, self.capacity)
+
+    def latest(self, seconds):
+        """
+        Returns:
+            np.ndarray: A copy of the newest `seconds` of samples (less if not yet held).
+        """
+        with self.lock:
+            n = min(int(seconds * self.sample_rate), self.count)
+            if n == 0:
+                return np.zeros(0, dtype=np.float32)
+            pos = (self.end - n) % self.capacity
+            first = min(n, self.capacity - pos)
+            return np.concatenate((self.data[pos:pos + first], self.data[:n - first]))
+
+    @property
+    def seconds(self):
+        return self.count / self.sample_rate
+
+
+class TimeShiftRenderer:
+    """
+    Time-compressed playback: keeps the native-rate history of every station and
+    renders "the last `seconds` at `speed` times real time" as audio on demand.
+
+    A render is one vectorized polyphase resample of the whole window from
+    fs * speed to the output rate, so at speed 60 the 0.02-10 Hz band of a 20 Hz
+    channel becomes 1-600 Hz. Offset and the part that would end up below
+    HIGHPASS_HZ are filtered out at the native rate first, and the result is
+    normalized to PEAK_LEVEL. Renders are cached per (station, seconds, speed) and
+    served again until `max_stale_s` of newer data has arrived.
+
+    Args:
+        target_fs (int): Output sample rate.
+        seconds (float): Default window, and the history kept per station.
+        speed (float): Default speed factor.
+        max_stale_s (float): Newer data (in native seconds) a cached render may miss.
+        cache_entries (int): Renders kept.
+    """
+
+    def __init__(self, target_fs, seconds, speed=DEFAULT_SPEED, max_stale_s=DEFAULT_MAX_STALE_SECONDS,
+                 cache_entries=DEFAULT_CACHE_ENTRIES):
+        self.target_fs = target_fs
+        self.seconds = seconds
+        self.speed = speed
+        self.max_stale_s = max_stale_s
+        self.cache_entries = cache_entries
+        self.histories = {}  # Station ID -> StationHistory
+        self.stream_keys = {}  # Station ID -> the one stream recorded for it
+        self.cache = OrderedDict()  # (station ID, seconds, speed) -> (history end, audio)
+        self.cache_lock = threading.Lock()
+        self.stats = {}  # Station ID -> counters
+
+    def push(self, sid, key, fs, starttime, samples, gap=False):
+        """Adds a block of stream `key` to the history of station `sid`."""
+        recorded = self.stream_keys.setdefault(sid, key)
+        if key != recorded:
+            return  # A wildcard selection matched several streams; only the first one is kept
+        history = self.histories.get(sid)
+        if history is None or history.sample_rate != fs:
+            history = self.histories[sid] = StationHistory(fs, self.seconds)
+            self.stats[sid] = {'renders': 0, 'cache_hits': 0, 'last_render_ms': None, 'audio_sec': 0.0}
+            logging.info(f"🕰️ {sid}: keeping {self.seconds / 3600:g} h of {key} @ {fs:g} Hz for time-shift playback")
+        history.append(starttime, samples, gap)
+
+    def render(self, sid, seconds=None, speed=None):
+        """
+        Returns:
+            np.ndarray: float32 audio at target_fs of the newest `seconds` of the
+            station's history played at `speed`, or None while there is no data.
+        """
+        seconds = self.seconds if seconds is None else seconds
+        speed = self.speed if speed is None else speed
+        history = self.histories.get(sid)
+        if history is None or history.count == 0:
+            return None
+        key = (sid, seconds, speed)
+        end = history.end
+        with self.cache_lock:
+            cached = self.cache.get(key)
+            if cached is not None and (end - cached[0]) / history.sample_rate < self.max_stale_s:
+                self.cache.move_to_end(key)
+                self.stats[sid]['cache_hits'] += 1
+                return cached[1]
+
+        t0 = time.perf_counter()
+        audio = self.render_array(history.latest(seconds), history.sample_rate, speed)
+        with self.cache_lock:
+            self.cache[key] = (end, audio)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        stats = self.stats[sid]
+        stats['renders'] += 1
+        stats['last_render_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+        stats['audio_sec'] = round(len(audio) / self.target_fs, 2)
+        return audio
+
+    def render_array(self, samples, fs, speed):
+        """Turns native-rate samples (NaN for missing data) into audio played `speed` times faster."""
+        valid = ~np.isnan(samples)
+        x = np.zeros(len(samples), dtype=np.float64)
+        if valid.any():
+            x[valid] = samples[valid] - samples[valid].mean()
+        cutoff = HIGHPASS_HZ / speed  # In native Hz
+        if 0 < cutoff < fs / 2 and len(x) > 100:
+            sos = signal.butter(2, cutoff, btype="highpass", fs=fs, output="sos")
+            x = signal.sosfiltfilt(sos, x)
+            x[~valid] = 0.0
+        up, down = resample_ratio(fs * speed, self.target_fs)
+        audio = signal.resample_poly(x, up, down).astype(np.float32)
+        peak = np.abs(audio).max() if len(audio) else 0.0
+        if peak > 0:
+            audio *= PEAK_LEVEL / peak
+        return Taper(self.target_fs, FADE_MS).process(audio)
+
+    def warm_up(self):
+        """Loads scipy and runs one small render, before the first real one is due."""
+        t0 = time.perf_counter()
+        self.render_array(np.random.default_rng(0).standard_normal(1000).astype(np.float32), 20.0, self.speed)
+        return time.perf_counter() - t0
+
+    def status(self):
+        return {
+            sid: {
+                'history_sec': round(history.seconds, 1),
+                'speed': self.speed,
+                **self.stats[sid],
+            }
+            for sid, history in list(self.histories.items())
+        }